@@ -0,0 +1,84 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from activity.models import ActivityRecord
+from teams.models import Team
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = ("Compare moving activity records for a team's videos one record "
+            "at a time vs. with the bulk move code.  All changes are rolled "
+            "back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('from_team', help='slug of the team to move from')
+        parser.add_argument('to_team', help='slug of the team to move to')
+        parser.add_argument('-c', '--count', default=100, type=int,
+                            help='Number of videos to move')
+
+    def handle(self, **options):
+        try:
+            from_team = Team.objects.get(slug=options['from_team'])
+            to_team = Team.objects.get(slug=options['to_team'])
+        except Team.DoesNotExist:
+            raise CommandError('Team not found')
+        video_ids = list(from_team.teamvideo_set
+                         .order_by('-id')
+                         .values_list('video_id', flat=True)
+                         [:options['count']])
+        record_count = (ActivityRecord.objects
+                        .filter(video_id__in=video_ids, copied_from=None,
+                                private_to_team=False)
+                        .count())
+        self.stdout.write('videos: {}, records: {}\n'.format(
+            len(video_ids), record_count))
+
+        def per_record():
+            for record in ActivityRecord.objects.filter(
+                    video_id__in=video_ids, copied_from=None,
+                    private_to_team=False):
+                record.move_to_team(to_team)
+
+        def bulk():
+            ActivityRecord.objects.move_videos_records_to_team(video_ids,
+                                                               to_team)
+
+        for label, func in [('per-record', per_record), ('bulk', bulk)]:
+            elapsed, queries = self.run_and_rollback(func)
+            self.stdout.write('{}: {:.3f}s, {} queries\n'.format(
+                label, elapsed, queries))
+
+    def run_and_rollback(self, func):
+        try:
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as context:
+                    start = time.time()
+                    func()
+                    elapsed = time.time() - start
+                raise Rollback()
+        except Rollback:
+            pass
+        return elapsed, len(context)
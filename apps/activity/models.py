@@ -18,9 +18,11 @@
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.urls import reverse
+from django.db import connection
 from django.db import models
 from django.db import transaction
 from django.db.models import Q
+from django.db.models.query import ModelIterable
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from django.utils.translation import ugettext_lazy as _
@@ -30,6 +32,7 @@ from auth.models import CustomUser as User
 from codefield import CodeField, Code
 from comments.models import Comment
 from mysqltweaks import query
+from subtitles.models import SubtitleLanguage
 from teams.models import Team, TeamVisibility, VideoVisibility
 from teams.permissions import can_view_activity
 from teams.permissions_const import (ROLE_OWNER, ROLE_ADMIN, ROLE_MANAGER,
@@ -39,6 +42,7 @@ from utils import translation
 from utils.text import fmt
 from videos.models import Video
 
+import collections
 import json
 import logging
 logger = logging.getLogger(__name__)
@@ -895,7 +899,81 @@ activity_choices = [
     VideoMovedToTeam, VideoMovedFromTeam, TeamSettingsChanged, SubtitleLanguageChanged,
 ]
 
+def load_related_objects(records):
+    """Fetch related data for a page of ActivityRecords in bulk
+
+    Rendering a record usually means calling get_related_obj() and
+    get_language_url(), which would normally run a couple queries per
+    record.  This function fetches the related objects with one query per
+    related model and the SubtitleLanguages with one query total, then caches
+    the results on the records.
+    """
+    ids_by_model = collections.defaultdict(set)
+    for record in records:
+        model = record.type_obj.related_model
+        if model is not None and record.related_obj_id is not None:
+            ids_by_model[model].add(record.related_obj_id)
+    objects_by_model = {
+        model: model.objects.select_related().in_bulk(ids)
+        for model, ids in ids_by_model.items()
+    }
+    for record in records:
+        model = record.type_obj.related_model
+        if model is None or record.related_obj_id is None:
+            continue
+        obj = objects_by_model[model].get(record.related_obj_id)
+        if obj is None:
+            logger.warn("Missing related object for activity record: "
+                        "{}".format(record.related_obj_id))
+        record._related_obj_cache = obj
+    _load_subtitle_languages(records)
+
+def _load_subtitle_languages(records):
+    records = [r for r in records if r.video_id and r.language_code]
+    if not records:
+        return
+    languages = {
+        (l.video_id, l.language_code): l
+        for l in SubtitleLanguage.objects.filter(
+            video_id__in=set(r.video_id for r in records),
+            language_code__in=set(r.language_code for r in records))
+    }
+    for record in records:
+        language = languages.get((record.video_id, record.language_code))
+        if language is not None:
+            language.video = record.video
+        # This is the cache that Video.subtitle_language() uses.  Caching
+        # None for missing languages matches what it does.
+        record.video._language_fetcher.cache[record.language_code] = language
+
 class ActivityQuerySet(query.QuerySet):
+    def __init__(self, *args, **kwargs):
+        super(ActivityQuerySet, self).__init__(*args, **kwargs)
+        self._load_related_objects = False
+
+    def _clone(self, *args, **kwargs):
+        clone = super(ActivityQuerySet, self)._clone(*args, **kwargs)
+        clone._load_related_objects = self._load_related_objects
+        return clone
+
+    def _fetch_all(self):
+        needs_fetch = self._result_cache is None
+        super(ActivityQuerySet, self)._fetch_all()
+        if (needs_fetch and self._load_related_objects and
+                self._iterable_class is ModelIterable):
+            load_related_objects(self._result_cache)
+
+    def with_related_objects(self):
+        """Fetch related data in bulk when the queryset is evaluated
+
+        This is meant for activity listings.  It calls
+        load_related_objects() on the results, so that each page of records
+        is rendered with a fixed number of queries.
+        """
+        clone = self._clone()
+        clone._load_related_objects = True
+        return clone
+
     def original(self):
         # For some reason, using copied_from__isnull=True results in an extra
         # join.  So we need a custom WHERE clause
@@ -1092,10 +1170,78 @@ class ActivityManager(models.Manager):
                                       team=to_team,
                                       private_to_team=True)
 
+    def create_for_videos_moved(self, moves, user, to_team):
+        """Create video-moved records for a bulk move
+
+        Args:
+            moves: list of (video, from_team_id) tuples
+            user: user who moved the videos
+            to_team: team the videos were moved to
+        """
+        now = dates.now()
+        records = []
+        for video, from_team_id in moves:
+            common = dict(video=video, user=user, created=now,
+                          private_to_team=True,
+                          video_language_code=video.primary_audio_language_code)
+            if from_team_id is not None:
+                records.append(ActivityRecord(
+                    type='video-moved-from-team', team_id=from_team_id,
+                    related_obj_id=to_team.id, **common))
+            records.append(ActivityRecord(
+                type='video-moved-to-team', team=to_team,
+                related_obj_id=from_team_id, **common))
+        self.bulk_create(records)
+
     def move_video_records_to_team(self, video, team):
-        for record in self.filter(video=video, copied_from=None,
-                                  private_to_team=False):
-            record.move_to_team(team)
+        self.move_videos_records_to_team([video.id], team)
+
+    MOVE_CHUNK_SIZE = 500
+
+    def move_videos_records_to_team(self, video_ids, team):
+        """Move the activity records for a group of videos to a new team
+
+        This has the same effect as calling ActivityRecord.move_to_team() for
+        each original, non-private record of the videos, but it works on
+        chunks of videos with a few set-based statements rather than several
+        statements per record.
+        """
+        team_id = team.id if team is not None else None
+        video_ids = list(video_ids)
+        for i in xrange(0, len(video_ids), self.MOVE_CHUNK_SIZE):
+            chunk = video_ids[i:i+self.MOVE_CHUNK_SIZE]
+            with transaction.atomic():
+                self._move_records_chunk(chunk, team_id)
+
+    def _move_records_chunk(self, video_ids, team_id):
+        # Make copies of the records for their current team
+        fields = ', '.join(ActivityRecord.MOVE_COPY_FIELDS)
+        sql = ('INSERT INTO activity_activityrecord '
+               '({fields}, copied_from_id, private_to_team) '
+               'SELECT {fields}, id, %s '
+               'FROM activity_activityrecord '
+               'WHERE video_id IN ({video_ids}) '
+               'AND copied_from_id IS NULL '
+               'AND private_to_team = %s '
+               'AND team_id IS NOT NULL').format(
+                   fields=fields,
+                   video_ids=', '.join('%s' for video_id in video_ids))
+        params = [False] + video_ids + [False]
+        if team_id is not None:
+            # We would just delete these copies below
+            sql += ' AND team_id <> %s'
+            params.append(team_id)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+        # Move the records to the new team
+        (self.filter(video_id__in=video_ids, private_to_team=False)
+         .original()
+         .update(team=team_id))
+        # Delete any old copies on the new team
+        if team_id is not None:
+            (self.filter(video_id__in=video_ids, team_id=team_id,
+                         copied_from__isnull=False)
+             .delete())
 
 class ActivityRecord(models.Model):
     type = CodeField(choices=activity_choices)
@@ -1174,11 +1320,16 @@ class ActivityRecord(models.Model):
                 ActivityRecord.objects.filter(copied_from=self,
                                               team_id=new_team.id).delete()
 
+    # Fields to copy in make_copy() and
+    # ActivityManager.move_videos_records_to_team()
+    MOVE_COPY_FIELDS = [
+        'type', 'user_id', 'team_id', 'video_id', 'video_language_code',
+        'language_code', 'related_obj_id', 'created',
+    ]
+
     def make_copy(self):
         copy = ActivityRecord(copied_from=self)
-        fields = ['type', 'user_id', 'team_id', 'video_id', 'language_code',
-                  'related_obj_id', 'created', ]
-        for name in fields:
+        for name in self.MOVE_COPY_FIELDS:
             setattr(copy, name, getattr(self, name))
         copy.save()
         return copy
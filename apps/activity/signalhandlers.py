@@ -101,6 +101,13 @@ def on_video_moved_from_team_to_team(user, destination_team, old_team, video, **
     ActivityRecord.objects.create_for_video_moved(video, user, from_team=old_team, to_team=destination_team)
     ActivityRecord.objects.move_video_records_to_team(video, destination_team)
 
+@receiver(teams.signals.videos_moved_from_team_to_team)
+def on_videos_moved_from_team_to_team(sender, user, moves, **kwargs):
+    ActivityRecord.objects.create_for_videos_moved(
+        [(tv.video, old_team.id) for tv, old_team in moves], user, sender)
+    ActivityRecord.objects.move_videos_records_to_team(
+        [tv.video_id for tv, old_team in moves], sender)
+
 @receiver(teams.signals.team_settings_changed)
 def on_team_settings_changed(sender, user, changed_settings, **kwargs):
     ActivityRecord.objects.create_for_team_settings_changed(sender, user,
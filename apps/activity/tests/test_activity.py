@@ -17,11 +17,15 @@
 # http://www.gnu.org/licenses/agpl-3.0.html.
 
 from django.contrib.auth.models import AnonymousUser
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-from activity.models import ActivityRecord
+from activity.models import ActivityRecord, URLEdit
 from comments.models import Comment
 from subtitles import pipeline
+from teams import bulk_actions
 from teams.models import TeamVisibility, VideoVisibility
 from teams.permissions_const import *
 from utils import dates
@@ -284,6 +288,66 @@ class TeamVideoActivityTest(TestCase):
         team_video.remove(UserFactory())
         self.check_copies(record, None, [first_team])
 
+    def test_bulk_move(self):
+        team_videos = [TeamVideoFactory() for i in range(3)]
+        clear_activity()
+        records = [
+            ActivityRecord.objects.create_for_video_added(tv.video)
+            for tv in team_videos
+        ]
+        old_teams = [tv.team for tv in team_videos]
+        second_team = TeamFactory()
+        bulk_actions.move_videos(team_videos, second_team)
+        for record, old_team in zip(records, old_teams):
+            self.check_copies(record, second_team, [old_team])
+
+    def test_bulk_move_back(self):
+        team_video = TeamVideoFactory()
+        first_team = team_video.team
+        clear_activity()
+        record = ActivityRecord.objects.create_for_video_added(
+            team_video.video)
+        second_team = TeamFactory()
+        bulk_actions.move_videos([team_video], second_team)
+        bulk_actions.move_videos([team_video], first_team)
+        self.check_copies(record, first_team, [second_team])
+
+    def test_bulk_move_same_as_per_record(self):
+        # The bulk code should result in the same records as calling
+        # move_to_team() for each record
+        def record_data(video):
+            return sorted(
+                ActivityRecord.objects.filter(video=video)
+                .values_list('type', 'team_id', 'user_id',
+                             'video_language_code', 'copied_from__type'))
+        first_team = TeamFactory()
+        second_team = TeamFactory()
+        video1 = TeamVideoFactory(team=first_team).video
+        video2 = TeamVideoFactory(team=first_team).video
+        for video in (video1, video2):
+            ActivityRecord.objects.create_for_video_added(video)
+            ActivityRecord.objects.create_for_comment(
+                video, CommentFactory(content_object=video))
+        for record in ActivityRecord.objects.filter(
+                video=video1, copied_from=None, private_to_team=False):
+            record.move_to_team(second_team)
+        ActivityRecord.objects.move_videos_records_to_team([video2.id],
+                                                           second_team)
+        assert_equal(record_data(video1), record_data(video2))
+
+    def test_bulk_move_creates_moved_records(self):
+        team_1 = TeamFactory()
+        team_2 = TeamFactory()
+        team_video = TeamVideoFactory(team=team_1)
+        clear_activity()
+        bulk_actions.move_videos([team_video], team_2)
+        record_from = ActivityRecord.objects.get(type='video-moved-from-team')
+        assert_equal(record_from.team, team_1)
+        assert_equal(record_from.get_related_obj(), team_2)
+        record_to = ActivityRecord.objects.get(type='video-moved-to-team')
+        assert_equal(record_to.team, team_2)
+        assert_equal(record_to.get_related_obj(), team_1)
+
     def test_private_to_team_disables_copies(self):
         video = VideoFactory()
         team_video = TeamVideoFactory(video=video)
@@ -415,3 +479,89 @@ class TestViewableByUser(TestCase):
             self.video,
             self.public_team_video,
         ])
+
+def add_listing_records(video, team, user):
+    """Create one record of each type that has related data to fetch."""
+    pipeline.add_subtitles(video, 'en', SubtitleSetFactory(), author=user)
+    language = video.subtitle_language('en')
+    Comment.objects.create(content_object=language, user=user,
+                           content='Foo')
+    ActivityRecord.objects.create_for_subtitle_language_changed(
+        user, language, 'fr')
+    ActivityRecord.objects.create_for_video_url_deleted(
+        video.get_primary_videourl_obj(), user)
+    ActivityRecord.objects.create_for_video_deleted(video, user)
+    ActivityRecord.objects.create_for_team_settings_changed(
+        team, user, {'is_visible': True})
+
+class LoadRelatedObjectsTest(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.team = TeamFactory(admin=self.user)
+        self.video = TeamVideoFactory(team=self.team).video
+        add_listing_records(self.video, self.team, self.user)
+
+    def test_load_related_objects(self):
+        records = list(ActivityRecord.objects.for_team(self.team))
+        correct_related_objs = [r.get_related_obj() for r in records]
+        correct_language_urls = [r.get_language_url() for r in records]
+        records = list(ActivityRecord.objects.for_team(self.team)
+                       .with_related_objects())
+        with self.assertNumQueries(0):
+            assert_equal([r.get_related_obj() for r in records],
+                         correct_related_objs)
+            assert_equal([r.get_language_url() for r in records],
+                         correct_language_urls)
+
+    def test_missing_related_object(self):
+        URLEdit.objects.all().delete()
+        records = list(ActivityRecord.objects.for_team(self.team)
+                       .with_related_objects())
+        record = [r for r in records if r.type == 'video-url-deleted'][0]
+        with self.assertNumQueries(0):
+            assert_equal(record.get_related_obj(), None)
+
+    def test_only_loads_for_model_instances(self):
+        # values() querysets shouldn't try to load anything
+        assert_items_equal(
+            ActivityRecord.objects.for_team(self.team)
+            .with_related_objects().values_list('id', flat=True),
+            ActivityRecord.objects.for_team(self.team)
+            .values_list('id', flat=True))
+
+class ActivityListingQueryCountTest(TestCase):
+    # Activity listings should run a fixed number of queries, no matter how
+    # many records there are on the page
+    def setUp(self):
+        self.user = UserFactory()
+        self.team = TeamFactory(admin=self.user)
+        self.video = TeamVideoFactory(team=self.team).video
+        self.client.login(username=self.user.username, password='password')
+
+    def count_queries(self, url):
+        # Make one request to warm up the caches, then count the queries for
+        # the next one
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        assert_equal(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def check_query_count(self, url):
+        add_listing_records(self.video, self.team, self.user)
+        query_count = self.count_queries(url)
+        add_listing_records(self.video, self.team, self.user)
+        add_listing_records(self.video, self.team, self.user)
+        assert_equal(self.count_queries(url), query_count)
+
+    def test_team_activity(self):
+        self.check_query_count(reverse('teams:activity',
+                                       args=(self.team.slug,)))
+
+    def test_video_activity(self):
+        self.check_query_count(reverse('videos:activity',
+                                       args=(self.video.video_id,)))
+
+    def test_user_activity(self):
+        self.check_query_count(reverse('profiles:profile',
+                                       args=(self.user.username,)))
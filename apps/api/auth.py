@@ -17,12 +17,26 @@
 
 from __future__ import absolute_import
 
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework import authentication
 from rest_framework import exceptions
 from auth.models import AmaraApiKey
 from auth.models import CustomUser as User
 
 class TokenAuthentication(authentication.BaseAuthentication):
+    """Authenticate using the X-API-USERNAME and X-API-KEY headers
+
+    Successful authentications get cached for API_AUTH_CACHE_TIMEOUT seconds,
+    keyed by a hash of the username and key.  The cache stores the user id
+    and active flag, then we load the user from its CacheGroup.  This means
+    that in the common case, authentication doesn't need any DB queries.
+
+    AmaraApiKey deletes the cache entry when the key changes.  Saving the
+    user invalidates its CacheGroup, so we also compare the username and
+    is_active flag with the loaded user to catch users being renamed or
+    deactivated.
+    """
     def authenticate(self, request):
         username = request.META.get('HTTP_X_API_USERNAME')
         api_key = request.META.get('HTTP_X_API_KEY')
@@ -33,15 +47,40 @@ class TokenAuthentication(authentication.BaseAuthentication):
         if not username:
             return None
 
+        cache_key = AmaraApiKey.auth_cache_key(username, api_key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            user = self.get_cached_user(cached, username)
+            if user is not None:
+                return (user, None)
+            cache.delete(cache_key)
+
         try:
             user = User.objects.get(username=username)
         except User.DoesNotExist:
             raise exceptions.AuthenticationFailed('No such user')
 
-        if not user.is_active:
-            raise exceptions.AuthenticationFailed('User disabled')
-
         if not AmaraApiKey.objects.filter(user=user, key=api_key).exists():
             raise exceptions.AuthenticationFailed('Invalid API Key')
 
+        cache.set(cache_key, (user.id, user.is_active),
+                  settings.API_AUTH_CACHE_TIMEOUT)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User disabled')
         return (user, None)
+
+    def get_cached_user(self, cached, username):
+        """Get the user for a cached authentication
+
+        Returns None if the cached value is stale.
+        """
+        user_id, is_active = cached
+        try:
+            user = User.cache.get_instance(user_id)
+        except User.DoesNotExist:
+            return None
+        if user.username != username or user.is_active != is_active:
+            return None
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User disabled')
+        return user
@@ -22,16 +22,125 @@ method to use offset/limit based pagination instead of page based pagination.
 
 This will get much simpler  once we switch to django-rest-framework 3.1 which
 has built-in support for this.
+
+Views can also opt-in to keyset (cursor) pagination by setting the
+cursor_ordering attribute to a list of fields that uniquely order the results
+(for example ['-created', '-id']).  Clients then pass the cursor query param
+(an empty value for the first page) and follow the next link.  Instead of
+using OFFSET, each page filters on the ordering fields of the last row from the
+previous page, so deep pages are as fast as the first one.  We also skip
+calculating the total count unless the client passes count=true.
 """
 
 from collections import OrderedDict
+import base64
+import json
+import operator
 
+from django.db.models import Q
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 class AmaraPagination(pagination.LimitOffsetPagination):
     default_limit = 20
     max_limit = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_ordering = getattr(view, 'cursor_ordering', None)
+        self.use_cursor = bool(
+            self.cursor_ordering and
+            self.cursor_query_param in request.query_params and
+            # sliced querysets can't be filtered, use offset pagination for
+            # those
+            queryset.query.can_filter())
+        if self.use_cursor:
+            return self.paginate_queryset_by_cursor(queryset, request)
+        else:
+            return super(AmaraPagination, self).paginate_queryset(
+                queryset, request, view)
+
+    def paginate_queryset_by_cursor(self, queryset, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = None
+        if request.query_params.get(self.count_query_param) == 'true':
+            self.count = queryset.count()
+        else:
+            self.count = None
+        queryset = queryset.order_by(*self.cursor_ordering)
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            queryset = queryset.filter(self.cursor_filter(queryset, cursor))
+        results = list(queryset[:self.limit + 1])
+        if len(results) > self.limit:
+            results = results[:self.limit]
+            self.next_cursor = self.encode_cursor(queryset, results[-1])
+        else:
+            self.next_cursor = None
+        return results
+
+    def parse_ordering(self):
+        return [
+            (field[1:], True) if field.startswith('-') else (field, False)
+            for field in self.cursor_ordering
+        ]
+
+    def encode_cursor(self, queryset, obj):
+        values = [
+            queryset.model._meta.get_field(name).value_to_string(obj)
+            for name, descending in self.parse_ordering()
+        ]
+        return base64.urlsafe_b64encode(json.dumps(values))
+
+    def decode_cursor(self, queryset, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+            ordering = self.parse_ordering()
+            if len(values) != len(ordering):
+                raise ValueError()
+            return [
+                (name, descending,
+                 queryset.model._meta.get_field(name).to_python(value))
+                for (name, descending), value in zip(ordering, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def cursor_filter(self, queryset, cursor):
+        """Build a Q object that selects rows after the cursor position
+
+        For an ordering of (a, b) this is equivalent to:
+            (a > cursor_a) OR (a = cursor_a AND b > cursor_b)
+        with the comparisons flipped for descending fields.
+        """
+        parts = []
+        equal_q = Q()
+        for name, descending, value in self.decode_cursor(queryset, cursor):
+            lookup = '{}__{}'.format(name, 'lt' if descending else 'gt')
+            parts.append(equal_q & Q(**{lookup: value}))
+            equal_q &= Q(**{name: value})
+        return reduce(operator.or_, parts)
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super(AmaraPagination, self).get_next_link()
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.next_cursor)
+
+    def get_previous_link(self):
+        if not self.use_cursor:
+            return super(AmaraPagination, self).get_previous_link()
+        # Cursor pagination only goes forward
+        return None
 
     def get_paginated_response(self, data):
         return Response(OrderedDict([
@@ -19,7 +19,9 @@ from __future__ import absolute_import
 from datetime import datetime, timedelta
 import time
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from nose.tools import *
 from rest_framework import status
 from rest_framework.reverse import reverse
@@ -31,6 +33,7 @@ from subtitles import pipeline
 from utils.test_utils import *
 from utils.factories import *
 from activity.models import ActivityRecord
+from activity.tests.test_activity import add_listing_records
 
 class ActivityTest(TestCase):
     def setUp(self):
@@ -412,3 +415,39 @@ class LegacyActivityTestCase(TestCase):
         url = self.filtered_list_url({'video': self.video.video_id})
         response = self.client.get(url)
         assert_equal(response.status_code, status.HTTP_403_FORBIDDEN)
+
+class ActivityQueryCountTest(TestCase):
+    # The activity endpoints should run a fixed number of queries, no matter
+    # how many records are in the response
+    def setUp(self):
+        self.user = UserFactory()
+        self.team = TeamFactory(admin=self.user)
+        self.video = TeamVideoFactory(team=self.team).video
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def count_queries(self, url):
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        assert_equal(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def check_query_count(self, url):
+        add_listing_records(self.video, self.team, self.user)
+        query_count = self.count_queries(url)
+        add_listing_records(self.video, self.team, self.user)
+        add_listing_records(self.video, self.team, self.user)
+        assert_equal(self.count_queries(url), query_count)
+
+    def test_video_activity(self):
+        self.check_query_count(reverse('api:video-activity',
+                                       args=(self.video.video_id,)))
+
+    def test_team_activity(self):
+        self.check_query_count(reverse('api:team-activity',
+                                       args=(self.team.slug,)))
+
+    def test_user_activity(self):
+        self.check_query_count(reverse('api:user-activity',
+                                       args=(self.user.username,)))
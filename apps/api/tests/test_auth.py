@@ -23,6 +23,7 @@ from nose.tools import *
 from rest_framework.exceptions import AuthenticationFailed
 
 from api.auth import TokenAuthentication
+from auth.models import AmaraApiKey
 from utils.factories import *
 
 class TestAPIAuth(TestCase):
@@ -49,3 +50,73 @@ class TestAPIAuth(TestCase):
     def test_no_token(self):
         request = self.make_request(None, None)
         assert_equal(self.auth.authenticate(request), None)
+
+    def test_disabled_user(self):
+        self.user.is_active = False
+        self.user.save()
+        request = self.make_request(self.user.username, self.api_key)
+        with assert_raises(AuthenticationFailed):
+            self.auth.authenticate(request)
+
+class TestAPIAuthCache(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.api_key = self.user.get_api_key()
+        self.auth = TokenAuthentication()
+
+    def authenticate(self, username=None, key=None):
+        request = HttpRequest()
+        request.META['HTTP_X_API_USERNAME'] = username or self.user.username
+        request.META['HTTP_X_API_KEY'] = key or self.api_key
+        return self.auth.authenticate(request)
+
+    def test_cached_auth_doesnt_query_db(self):
+        self.authenticate()
+        self.authenticate()
+        with self.assertNumQueries(0):
+            assert_equal(self.authenticate(), (self.user, None))
+
+    def test_new_key_invalidates(self):
+        self.authenticate()
+        self.user.api_key.generate_new_key()
+        with assert_raises(AuthenticationFailed):
+            self.authenticate()
+        assert_equal(self.authenticate(key=self.user.api_key.key),
+                     (self.user, None))
+
+    def test_deleted_key_invalidates(self):
+        self.authenticate()
+        self.user.api_key.delete()
+        with assert_raises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deactivate_invalidates(self):
+        self.authenticate()
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with assert_raises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_reactivate(self):
+        self.user.is_active = False
+        self.user.save()
+        with assert_raises(AuthenticationFailed):
+            self.authenticate()
+        self.user.is_active = True
+        self.user.save()
+        assert_equal(self.authenticate(), (self.user, None))
+
+    def test_rename_invalidates(self):
+        old_username = self.user.username
+        self.authenticate()
+        self.user.username = 'new-username'
+        self.user.save()
+        with assert_raises(AuthenticationFailed):
+            self.authenticate(username=old_username)
+        assert_equal(self.authenticate(), (self.user, None))
+
+    def test_cache_key_doesnt_contain_api_key(self):
+        cache_key = AmaraApiKey.auth_cache_key(self.user.username,
+                                               self.api_key)
+        assert_false(self.api_key in cache_key)
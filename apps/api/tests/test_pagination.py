@@ -0,0 +1,83 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Affero General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Affero General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program.  If not, see http://www.gnu.org/licenses/agpl-3.0.html.
+
+from __future__ import absolute_import
+from datetime import datetime
+
+from django.test import TestCase
+from nose.tools import *
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from activity.models import ActivityRecord
+from utils.factories import *
+
+class CursorPaginationTest(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.team = TeamFactory(admin=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        videos = [VideoFactory(team=self.team) for i in range(5)]
+        ActivityRecord.objects.all().delete()
+        # Give pairs of records the same created time, so that the id is
+        # needed to break ties.
+        for i, video in enumerate(videos):
+            record = ActivityRecord.objects.create_for_video_added(video)
+            ActivityRecord.objects.filter(id=record.id).update(
+                created=datetime(2018, 1, 1, i // 2))
+        self.url = reverse('api:team-activity', args=(self.team.slug,))
+
+    def test_walk_pages(self):
+        pages = []
+        url = self.url + '?cursor=&limit=2'
+        while url:
+            response = self.client.get(url)
+            assert_equal(response.status_code, status.HTTP_200_OK)
+            meta = response.data['meta']
+            assert_equal(meta['previous'], None)
+            assert_equal(meta['offset'], None)
+            assert_equal(meta['total_count'], None)
+            pages.append([obj['date'] for obj in response.data['objects']])
+            url = meta['next']
+        assert_equal([len(page) for page in pages], [2, 2, 1])
+
+    def test_no_duplicates_or_gaps(self):
+        pages = []
+        url = self.url + '?cursor=&limit=2'
+        while url:
+            response = self.client.get(url)
+            pages.extend(response.data['objects'])
+            url = response.data['meta']['next']
+        offset_response = self.client.get(self.url + '?limit=5')
+        assert_equal(pages, offset_response.data['objects'])
+
+    def test_count(self):
+        response = self.client.get(self.url + '?cursor=&count=true')
+        assert_equal(response.data['meta']['total_count'], 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url + '?cursor=bogus')
+        assert_equal(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_offset_mode_unchanged(self):
+        response = self.client.get(self.url + '?limit=2')
+        meta = response.data['meta']
+        assert_equal(meta['offset'], 0)
+        assert_equal(meta['total_count'], 5)
+        assert_true('offset=2' in meta['next'])
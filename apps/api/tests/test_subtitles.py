@@ -565,6 +565,14 @@ class SubtitlesViewTest(TestCase):
         assert_equal(response.content,
                      babelsubs.to(self.version.get_subtitles(), 'dfxp'))
 
+    def test_raw_format_etag(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='text/srt')
+        etag = response['ETag']
+        response = self.client.get(self.url, HTTP_ACCEPT='text/srt',
+                                   HTTP_IF_NONE_MATCH=etag)
+        assert_equal(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        assert_equal(response['ETag'], etag)
+
     def run_get_object(self, **query_params):
         view = SubtitlesView()
         view.kwargs = {
@@ -314,6 +314,7 @@ from api.views.apiswitcher import APISwitcherMixin
 from videos.models import Video
 from subtitles import compat
 from subtitles import pipeline
+from subtitles import rendercache
 from subtitles import workflows
 from subtitles.models import (SubtitleLanguage, SubtitleVersion,
                               ORIGIN_UPLOAD, ORIGIN_WEB_EDITOR, ORIGIN_API)
@@ -566,9 +567,14 @@ class SubtitleLanguageViewSet(mixins.CreateModelMixin,
         }
 
 class SubtitleRenderer(renderers.BaseRenderer):
-    """Render SubtitleSets using babelsubs."""
+    """Render SubtitleVersions and SubtitleSets using babelsubs.
+
+    SubtitleVersions are rendered through the subtitle render cache.
+    """
     def render(self, data, media_type=None, renderer_context=None):
-        if isinstance(data, SubtitleSet):
+        if isinstance(data, SubtitleVersion):
+            return rendercache.render(data, self.format)
+        elif isinstance(data, SubtitleSet):
             return babelsubs.to(data, self.format)
         else:
             # Fall back to JSON renderer for other responses.  This handles
@@ -608,8 +614,7 @@ class SubtitlesField(serializers.CharField):
         super(SubtitlesField, self).__init__(*args, **kwargs)
 
     def get_attribute(self, version):
-        return babelsubs.to(version.get_subtitles(),
-                            self.context['sub_format'])
+        return rendercache.render(version, self.context['sub_format'])
 
     def to_representation(self, value):
         if self.context['sub_format'] == 'json':
@@ -853,7 +858,14 @@ class SubtitlesView(generics.CreateAPIView):
         # serializer and return the subtitles instead
         if isinstance(request.accepted_renderer, SubtitleRenderer):
             if user_can_access_subtitles_format(request.user, request.accepted_renderer.format):
-                return Response(version.get_subtitles())
+                # Versions are immutable, so we can use a strong ETag and
+                # skip rendering entirely if the client has the subtitles.
+                etag = rendercache.etag(version,
+                                        request.accepted_renderer.format)
+                if rendercache.not_modified(request, etag):
+                    return Response(status=status.HTTP_304_NOT_MODIFIED,
+                                    headers={'ETag': etag})
+                return Response(version, headers={'ETag': etag})
             else:
                 raise PermissionDenied()
         serializer = self.get_serializer(version)
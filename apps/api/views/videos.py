@@ -591,6 +591,7 @@ class VideoViewSet(mixins.CreateModelMixin,
     permission_classes = (IsAuthenticatedOrReadOnly,)
     filter_backends = (filters.OrderingFilter,)
     ordering_fields = ('title', 'created')
+    cursor_ordering = ['-id']
 
     def get_serializer_context(self):
         return {
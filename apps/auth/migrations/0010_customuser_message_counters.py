@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('amara_auth', '0009_auto_20181129_0617'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='new_message_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='latest_message_id',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -194,6 +194,9 @@ class CustomUser(BaseUser, secureid.SecureIDMixin):
     # user has a message newer than that message.
     last_hidden_message_id = models.PositiveIntegerField(blank=True,
                                                          default=0)
+    # Denormalized message counters, maintained by messages.counters
+    new_message_count = models.PositiveIntegerField(default=0, editable=False)
+    latest_message_id = models.PositiveIntegerField(default=0, editable=False)
     playback_mode = models.IntegerField(
         choices=PLAYBACK_MODE_CHOICES, default=PLAYBACK_MODE_STANDARD)
     created_by = models.ForeignKey('self', null=True, blank=True,
@@ -207,6 +210,10 @@ class CustomUser(BaseUser, secureid.SecureIDMixin):
 
     cache = ModelCacheManager(default_cache_pattern='user')
 
+    # Fields that get updated with UPDATE queries.  save() leaves these alone
+    # so that it doesn't overwrite them with stale values.
+    COUNTER_FIELDS = ['new_message_count', 'latest_message_id']
+
     # Fields that constitute a user's profile, things like names, bios, etc.
     # When these change we emit the user_profile_changed signal.
     PROFILE_FIELDS = [
@@ -357,7 +364,20 @@ class CustomUser(BaseUser, secureid.SecureIDMixin):
         send_email_confirmation = kwargs.pop('send_email_confirmation', True)
         if self.pk:
             self.check_profile_changed()
+        if (not self._state.adding and not args and
+                not kwargs.get('force_insert') and
+                'update_fields' not in kwargs):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+                and f.attname not in deferred
+            ]
         super(CustomUser, self).save(*args, **kwargs)
+        # Make sure cached instances (for example from
+        # AmaraAuthenticationMiddleware or api.auth) see the changes,
+        # especially is_active getting unset.
+        self.cache.invalidate()
         self.start_tracking_profile_fields()
 
         if send_confirmation and send_email_confirmation:
@@ -381,9 +401,11 @@ class CustomUser(BaseUser, secureid.SecureIDMixin):
             raise ValidationError("usernames can't contain the '$' character")
 
     def set_last_hidden_message_id(self, request, message_id):
+        from messages import counters
         if message_id != self.last_hidden_message_id:
             self.last_hidden_message_id = message_id
             self.save()
+            counters.recalculate([self.id])
             # cycle the session key to bust the varnish cache
             request.session.cycle_key()
 
@@ -397,11 +419,9 @@ class CustomUser(BaseUser, secureid.SecureIDMixin):
           - Have come in after the last time the user hide that message,
             or viewed their inbox
 
+        This is a denormalized counter, see messages.counters.
         """
-        from messages.models import Message
-        qs = (Message.objects.for_user(self)
-              .filter(read=False, id__gt=self.last_hidden_message_id))
-        return qs.count()
+        return self.new_message_count
 
     def last_message_id(self):
         """
@@ -409,12 +429,7 @@ class CustomUser(BaseUser, secureid.SecureIDMixin):
 
         Returns: message id, or 0 if there are no messages
         """
-        from messages.models import Message
-        qs = Message.objects.for_user(self).order_by('-id')[:1]
-        if qs:
-            return qs[0].id
-        else:
-            return 0
+        return self.latest_message_id
 
     def tutorial_was_shown(self):
         CustomUser.objects.filter(pk=self.id).update(show_tutorial=False)
@@ -1000,6 +1015,29 @@ class AmaraApiKey(models.Model):
             self.save()
         return self.key
 
+    @staticmethod
+    def auth_cache_key(username, key):
+        """Cache key for api.auth.TokenAuthentication
+
+        We hash the username and key, so that the key itself doesn't get
+        stored in the cache.
+        """
+        data = u'{}\0{}'.format(username, key).encode('utf-8')
+        return 'api-auth:{}'.format(hashlib.sha1(data).hexdigest())
+
+    def save(self, *args, **kwargs):
+        old_key = None
+        if self.pk:
+            old_key = (AmaraApiKey.objects.filter(pk=self.pk)
+                       .values_list('key', flat=True).first())
+        super(AmaraApiKey, self).save(*args, **kwargs)
+        if old_key is not None and old_key != self.key:
+            cache.delete(self.auth_cache_key(self.user.username, old_key))
+
+    def delete(self, *args, **kwargs):
+        cache.delete(self.auth_cache_key(self.user.username, self.key))
+        super(AmaraApiKey, self).delete(*args, **kwargs)
+
 class SentMessageDateManager(models.Manager):
     def sent_message(self, user):
         self.create(user=user, created=dates.now())
@@ -118,6 +118,19 @@ Z         def:bar          *invalid*
     version key.  This way the version key changes for each deploy, which will
     invalidate all values.
 
+.. _cache-local-cache:
+
+Local cache
+^^^^^^^^^^^
+
+If settings.CACHE_GROUP_LOCAL_CACHE_SIZE is set, CacheGroups with a cache
+pattern also store the values that they fetch in an in-process LRU cache (see
+:mod:`caching.localcache`).  If all the keys for a get_many() call are in the
+local cache, then we don't need to contact redis at all.  Local values are
+stored together with the version they were fetched for, and invalidate()
+publishes a message that tells other processes to drop their local copy of
+the group.  We count local cache hits and misses for each cache pattern.
+
 .. _cache-race-condition-prevention:
 
 Race condition prevention
@@ -166,6 +179,7 @@ from django.conf import settings
 from django.core.cache import cache
 
 from utils import codes
+from caching import localcache
 from caching.utils import get_or_calc, get_or_calc_many
 
 def get_commit_id():
@@ -247,6 +261,10 @@ class CacheGroup(object):
         else:
             self._cache_pattern_keys = None
         self.cache_pattern = cache_pattern
+        if cache_pattern:
+            self.local_cache = localcache.get_local_cache()
+        else:
+            self.local_cache = None
         self.current_version = None
         if invalidate_on_deploy:
             self.version_key = 'version:{0}'.format(get_commit_id())
@@ -258,6 +276,7 @@ class CacheGroup(object):
         """Invalidate all values in this CacheGroup."""
         self.current_version = codes.make_code()
         self.cache_wrapper.set(self.version_key, self.current_version)
+        localcache.publish_invalidation(self.prefix)
 
     def ensure_version(self):
         if self.current_version is not None:
@@ -286,6 +305,12 @@ class CacheGroup(object):
         """
         if self.cache_pattern:
             _cache_pattern_memory[self.cache_pattern].update(keys)
+        if self.local_cache is not None:
+            result = self._get_many_from_local_cache(keys)
+            if result is not None:
+                localcache.record_hit(self.cache_pattern)
+                return result
+            localcache.record_miss(self.cache_pattern)
         keys_to_fetch = set(keys)
         if self.current_version is None:
             keys_to_fetch.add(self.version_key)
@@ -306,12 +331,45 @@ class CacheGroup(object):
             version, value = self._unpack_cache_value(cache_value)
             if version == self.current_version:
                 result[key] = value
+        self._update_local_cache(get_many_result)
         return result
 
+    def _get_many_from_local_cache(self, keys):
+        """Try to handle get_many() with the local cache
+
+        Returns None unless we have local values for all keys.
+        """
+        entry = self.local_cache.get(self.prefix)
+        if entry is None:
+            return None
+        if (self.current_version is not None and
+                entry.version != self.current_version):
+            return None
+        if any(key not in entry.values for key in keys):
+            return None
+        self.current_version = entry.version
+        return dict((key, self._unpack_cache_value(entry.get_value(key))[1])
+                    for key in keys)
+
+    def _update_local_cache(self, packed_values):
+        """Store packed values in the local cache
+
+        We only store values that match our current version, that way all
+        values in the local entry are valid for the entry's version.
+        """
+        if self.local_cache is None or self.current_version is None:
+            return
+        self.local_cache.update(self.prefix, self.current_version, dict(
+            (key, value) for key, value in packed_values.items()
+            if key != self.version_key and
+            self._unpack_cache_value(value)[0] == self.current_version))
+
     def set(self, key, value, timeout=None):
         """Set a value in the cache """
         self.ensure_version()
-        self.cache_wrapper.set(key, self._pack_cache_value(value), timeout)
+        packed_value = self._pack_cache_value(value)
+        self.cache_wrapper.set(key, packed_value, timeout)
+        self._update_local_cache({key: packed_value})
 
     def set_many(self, values, timeout=None):
         """Set multiple values in the cache """
@@ -321,6 +379,7 @@ class CacheGroup(object):
             for key, value in values.items()
         )
         self.cache_wrapper.set_many(values_to_set, timeout)
+        self._update_local_cache(values_to_set)
 
     def get_or_calc(self, key, work_func):
         """See utils.get_or_calc """
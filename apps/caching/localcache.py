@@ -0,0 +1,255 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+"""caching.localcache -- In-process cache for CacheGroups
+
+LocalCache keeps recently used CacheGroup data in process memory, so that
+pages for hot videos, teams and users can be rendered without a redis round
+trip.  Each entry stores a group's version along with the packed values that
+we've fetched/set for that version.  Entries are dropped when:
+
+  - They're older than settings.CACHE_GROUP_LOCAL_CACHE_TTL
+  - There are more than settings.CACHE_GROUP_LOCAL_CACHE_SIZE entries (the
+    least recently used group gets dropped)
+  - Any process invalidates the group.  CacheGroup.invalidate() publishes the
+    group prefix to INVALIDATION_CHANNEL and we drop those groups before each
+    lookup.
+
+Pub/sub messages can be delayed, so a process may see stale values for a
+short time after an invalidation.  The TTL puts an upper bound on that.
+
+We also count local cache hits/misses for each cache pattern.  The counts are
+kept in memory and added to a redis hash every STATS_FLUSH_INTERVAL seconds.
+Use get_stats() (or the cache_group_stats command) to read them.
+"""
+
+from __future__ import absolute_import
+import collections
+import cPickle as pickle
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+import redis
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'cachegroup-invalidate'
+STATS_KEY = 'cachegroup-local-stats'
+STATS_FLUSH_INTERVAL = 60
+
+def _redis():
+    return get_redis_connection('default')
+
+class LocalCacheEntry(object):
+    def __init__(self, version, expires):
+        self.version = version
+        self.expires = expires
+        self.values = {}
+
+    def get_value(self, key):
+        value = self.values[key]
+        if isinstance(value, basestring):
+            return value
+        else:
+            # Non-string values get pickled so that callers that mutate
+            # their value don't change it for everyone else.
+            return pickle.loads(value.data)
+
+    def set_value(self, key, value):
+        if not isinstance(value, basestring):
+            value = _Pickled(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        self.values[key] = value
+
+class _Pickled(object):
+    __slots__ = ('data',)
+    def __init__(self, data):
+        self.data = data
+
+class LocalCache(object):
+    """LRU cache of CacheGroup data
+
+    Args:
+        max_size: max number of groups to store
+        ttl: max time to keep a group, in seconds
+    """
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self._pubsub = None
+
+    def get(self, prefix):
+        """Get the LocalCacheEntry for a group
+
+        Returns None if we don't have an entry for the group.
+        """
+        with self._lock:
+            self._process_invalidations()
+            entry = self._entries.pop(prefix, None)
+            if entry is None or entry.expires < time.time():
+                return None
+            # Re-insert the entry to mark it as recently used
+            self._entries[prefix] = entry
+            return entry
+
+    def update(self, prefix, version, values):
+        """Store values for a group
+
+        If our entry has a different version, then we replace it with a new
+        entry.
+
+        Args:
+            prefix: CacheGroup prefix
+            version: version that the values are for
+            values: dict mapping keys to packed values
+        """
+        with self._lock:
+            self._process_invalidations()
+            entry = self._entries.pop(prefix, None)
+            if entry is None or entry.version != version:
+                entry = LocalCacheEntry(version, time.time() + self.ttl)
+            for key, value in values.items():
+                entry.set_value(key, value)
+            self._entries[prefix] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, prefix):
+        with self._lock:
+            self._entries.pop(prefix, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _process_invalidations(self):
+        try:
+            if self._pubsub is None:
+                self._subscribe()
+            while True:
+                message = self._pubsub.get_message()
+                if message is None:
+                    break
+                if message['type'] == 'message':
+                    self._entries.pop(message['data'], None)
+        except redis.RedisError:
+            logger.warn("Error reading cache group invalidations",
+                        exc_info=True)
+            # We may have missed some invalidations, so the only safe thing
+            # to do is drop everything.
+            self._pubsub = None
+            self._entries.clear()
+
+    def _subscribe(self):
+        pubsub = _redis().pubsub()
+        pubsub.subscribe(INVALIDATION_CHANNEL)
+        self._pubsub = pubsub
+        # Any entries stored before now could have missed invalidations
+        self._entries.clear()
+
+_local_cache = None
+
+def get_local_cache():
+    """Get the LocalCache for this process
+
+    Returns None if the local cache is disabled.
+    """
+    global _local_cache
+    max_size = settings.CACHE_GROUP_LOCAL_CACHE_SIZE
+    ttl = settings.CACHE_GROUP_LOCAL_CACHE_TTL
+    if not max_size:
+        return None
+    if (_local_cache is None or _local_cache.max_size != max_size or
+            _local_cache.ttl != ttl):
+        _local_cache = LocalCache(max_size, ttl)
+    return _local_cache
+
+def publish_invalidation(prefix):
+    """Tell all processes to drop their local entry for a group."""
+    local_cache = get_local_cache()
+    if local_cache is None:
+        return
+    local_cache.discard(prefix)
+    try:
+        _redis().publish(INVALIDATION_CHANNEL, prefix)
+    except redis.RedisError:
+        logger.warn("Error publishing cache group invalidation",
+                    exc_info=True)
+
+# Stats
+_stats = collections.Counter()
+_stats_lock = threading.Lock()
+_last_stats_flush = time.time()
+
+def record_hit(cache_pattern):
+    _record(cache_pattern, 'hits')
+
+def record_miss(cache_pattern):
+    _record(cache_pattern, 'misses')
+
+def _record(cache_pattern, name):
+    global _last_stats_flush
+    with _stats_lock:
+        _stats['{}:{}'.format(cache_pattern, name)] += 1
+        if time.time() < _last_stats_flush + STATS_FLUSH_INTERVAL:
+            return
+        counts = dict(_stats)
+        _stats.clear()
+        _last_stats_flush = time.time()
+    _flush_stats(counts)
+
+def _flush_stats(counts):
+    try:
+        pipe = _redis().pipeline()
+        for field, count in counts.items():
+            pipe.hincrby(STATS_KEY, field, count)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warn("Error saving cache group stats", exc_info=True)
+
+def flush_stats():
+    """Save the stats for this process to redis now."""
+    global _last_stats_flush
+    with _stats_lock:
+        counts = dict(_stats)
+        _stats.clear()
+        _last_stats_flush = time.time()
+    if counts:
+        _flush_stats(counts)
+
+def get_stats():
+    """Get the hit/miss counts for all processes
+
+    Returns:
+        dict mapping cache patterns to {'hits': n, 'misses': n} dicts
+    """
+    stats = collections.defaultdict(lambda: {'hits': 0, 'misses': 0})
+    for field, count in _redis().hgetall(STATS_KEY).items():
+        cache_pattern, name = field.rsplit(':', 1)
+        stats[cache_pattern][name] = int(count)
+    return dict(stats)
+
+def reset_stats():
+    _redis().delete(STATS_KEY)
@@ -0,0 +1,43 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from django.core.management.base import BaseCommand
+
+from caching import localcache
+
+class Command(BaseCommand):
+    help = ("Print local cache hits/misses for each cache pattern.  Each hit "
+            "is a CacheGroup.get_many() call that didn't need to contact "
+            "redis.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Reset the counters after printing them')
+
+    def handle(self, **options):
+        stats = localcache.get_stats()
+        if not stats:
+            self.stdout.write('No stats recorded\n')
+        for cache_pattern, counts in sorted(stats.items()):
+            total = counts['hits'] + counts['misses']
+            self.stdout.write('{}: {} hits, {} misses ({:.1f}% hit rate)\n'
+                              .format(cache_pattern, counts['hits'],
+                                      counts['misses'],
+                                      100.0 * counts['hits'] / max(total, 1)))
+        if options['reset']:
+            localcache.reset_stats()
@@ -0,0 +1,165 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from __future__ import absolute_import
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.utils import override_settings
+from nose.tools import *
+import mock
+
+from caching import localcache
+from caching.cachegroup import CacheGroup
+
+def make_cache_group(prefix='cache-group-prefix'):
+    return CacheGroup(prefix, cache_pattern='foo',
+                      invalidate_on_deploy=False)
+
+class LocalCacheTest(TestCase):
+    def setUp(self):
+        self.local_cache = localcache.LocalCache(max_size=2, ttl=60)
+        self.mock_redis = mock.Mock()
+        self.mock_redis.pubsub.return_value.get_message.return_value = None
+        patcher = mock.patch('caching.localcache._redis',
+                             return_value=self.mock_redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get(self):
+        self.local_cache.update('a', 'v1', {'key': 'v1:value'})
+        entry = self.local_cache.get('a')
+        assert_equal(entry.version, 'v1')
+        assert_equal(entry.get_value('key'), 'v1:value')
+        assert_equal(self.local_cache.get('b'), None)
+
+    def test_update_with_new_version(self):
+        self.local_cache.update('a', 'v1', {'key': 'v1:value'})
+        self.local_cache.update('a', 'v2', {'key2': 'v2:value'})
+        entry = self.local_cache.get('a')
+        assert_equal(entry.version, 'v2')
+        assert_equal(entry.values.keys(), ['key2'])
+
+    def test_non_string_values_are_copied(self):
+        self.local_cache.update('a', 'v1', {'key': ('v1', [1, 2])})
+        self.local_cache.get('a').get_value('key')[1].append(3)
+        assert_equal(self.local_cache.get('a').get_value('key'),
+                     ('v1', [1, 2]))
+
+    def test_lru(self):
+        self.local_cache.update('a', 'v1', {})
+        self.local_cache.update('b', 'v1', {})
+        # Use a, which makes b the least recently used entry
+        self.local_cache.get('a')
+        self.local_cache.update('c', 'v1', {})
+        assert_not_equal(self.local_cache.get('a'), None)
+        assert_equal(self.local_cache.get('b'), None)
+        assert_not_equal(self.local_cache.get('c'), None)
+
+    def test_ttl(self):
+        with mock.patch('time.time') as mock_time:
+            mock_time.return_value = 1000
+            self.local_cache.update('a', 'v1', {})
+            mock_time.return_value = 1059
+            assert_not_equal(self.local_cache.get('a'), None)
+            mock_time.return_value = 1061
+            assert_equal(self.local_cache.get('a'), None)
+
+    def test_invalidation_message(self):
+        self.local_cache.update('a', 'v1', {})
+        self.local_cache.update('b', 'v1', {})
+        pubsub = self.mock_redis.pubsub.return_value
+        pubsub.get_message.side_effect = [
+            {'type': 'message', 'data': 'a'},
+            None,
+            None,
+        ]
+        assert_equal(self.local_cache.get('a'), None)
+        assert_not_equal(self.local_cache.get('b'), None)
+        assert_equal(pubsub.subscribe.call_args,
+                     mock.call(localcache.INVALIDATION_CHANNEL))
+
+@override_settings(CACHE_GROUP_LOCAL_CACHE_SIZE=100)
+class CacheGroupLocalCacheTest(TestCase):
+    def setUp(self):
+        self.mock_redis = mock.Mock()
+        self.mock_redis.pubsub.return_value.get_message.return_value = None
+        patcher = mock.patch('caching.localcache._redis',
+                             return_value=self.mock_redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('caching.localcache._record')
+        self.mock_record = patcher.start()
+        self.addCleanup(patcher.stop)
+        localcache.get_local_cache().clear()
+
+    def test_get_from_local_cache(self):
+        make_cache_group().set('key', 'value')
+        # Clear redis, we should still be able to fetch the value from the
+        # local cache
+        cache.clear()
+        assert_equal(make_cache_group().get('key'), 'value')
+        assert_equal(self.mock_record.call_args, mock.call('foo', 'hits'))
+
+    def test_fetched_values_are_stored(self):
+        make_cache_group().set('key', 'value')
+        localcache.get_local_cache().clear()
+        assert_equal(make_cache_group().get('key'), 'value')
+        assert_equal(self.mock_record.call_args, mock.call('foo', 'misses'))
+        cache.clear()
+        assert_equal(make_cache_group().get('key'), 'value')
+        assert_equal(self.mock_record.call_args, mock.call('foo', 'hits'))
+
+    def test_missing_key(self):
+        # If any keys are missing from the local cache, we should fetch them
+        # all from redis
+        make_cache_group().set('key', 'value')
+        assert_equal(make_cache_group().get_many(['key', 'key2']), {
+            'key': 'value',
+        })
+        assert_equal(self.mock_record.call_args, mock.call('foo', 'misses'))
+
+    def test_invalidate(self):
+        make_cache_group().set('key', 'value')
+        make_cache_group().invalidate()
+        assert_equal(make_cache_group().get('key'), None)
+        assert_equal(self.mock_redis.publish.call_args,
+                     mock.call(localcache.INVALIDATION_CHANNEL,
+                               'cache-group-prefix'))
+
+    def test_no_cache_pattern(self):
+        # CacheGroups without a cache pattern don't use the local cache
+        cache_group = CacheGroup('cache-group-prefix',
+                                 invalidate_on_deploy=False)
+        cache_group.set('key', 'value')
+        assert_equal(len(localcache.get_local_cache()), 0)
+
+class LocalCacheStatsTest(TestCase):
+    def setUp(self):
+        localcache.reset_stats()
+
+    def test_stats(self):
+        localcache.record_hit('foo')
+        localcache.record_hit('foo')
+        localcache.record_miss('foo')
+        localcache.record_miss('bar')
+        localcache.flush_stats()
+        assert_equal(localcache.get_stats(), {
+            'foo': {'hits': 2, 'misses': 1},
+            'bar': {'hits': 0, 'misses': 1},
+        })
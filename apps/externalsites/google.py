@@ -21,6 +21,7 @@
 from collections import namedtuple
 from email.mime.multipart import MIMEMultipart, MIMEBase
 from lxml import etree
+import hashlib
 import json
 import logging
 import urllib
@@ -30,6 +31,7 @@ import time
 
 from django.conf import settings
 from django.utils.translation import ugettext as _
+from django_redis import get_redis_connection
 import jwt
 import requests
 import pafy, isodate
@@ -59,6 +61,14 @@ OpenIDProfile = namedtuple('OpenIDProfile',
 DRIVE_URL_PATTERN = re.compile(r'/d/(.*?)/')
 
 YOUTUBE_TITLE_MAX_LENGTH = 100
+# Max number of ids that we can pass to the videos.list API
+VIDEOS_LIST_MAX_IDS = 50
+
+# Refresh cached access tokens this many seconds before they expire
+ACCESS_TOKEN_EXPIRE_MARGIN = 300
+# How long to wait for another process to refresh an access token
+ACCESS_TOKEN_LOCK_WAIT = 10
+ACCESS_TOKEN_LOCK_TIMEOUT = 30
 
 logger = logging.getLogger(__name__)
 
@@ -174,9 +184,75 @@ def handle_callback(request, redirect_uri):
     )
 
 def get_new_access_token(refresh_token):
+    return _refresh_access_token(refresh_token)[0]
+
+def _refresh_access_token(refresh_token):
+    """Get a new access token
+
+    Returns:
+        (access_token, expires_in) tuple
+    """
     response = _oauth_token_post(grant_type='refresh_token',
                                  refresh_token=refresh_token)
-    return response.json()['access_token']
+    response_data = response.json()
+    return response_data['access_token'], response_data.get('expires_in')
+
+def get_access_token(account_key, refresh_token):
+    """Get an access token for an account, using a cached one if possible
+
+    Access tokens are valid for an hour, so there's no need to get a new one
+    for each API call.  We store them in redis until they are
+    ACCESS_TOKEN_EXPIRE_MARGIN seconds from expiring.  A lock ensures that
+    only one process refreshes the token for an account at once.
+
+    Args:
+        account_key: unique string to identify the account
+        refresh_token: OAuth refresh token for the account
+    """
+    redis = get_redis_connection('storage')
+    key = _access_token_key(account_key, refresh_token)
+    access_token = redis.get(key)
+    if access_token is not None:
+        return access_token
+
+    lock_key = key + '-lock'
+    locked = _acquire_access_token_lock(redis, lock_key)
+    try:
+        if locked:
+            # Check if another process refreshed the token while we were
+            # waiting for the lock
+            access_token = redis.get(key)
+            if access_token is not None:
+                return access_token
+        access_token, expires_in = _refresh_access_token(refresh_token)
+        if expires_in and expires_in > ACCESS_TOKEN_EXPIRE_MARGIN:
+            redis.setex(key, int(expires_in) - ACCESS_TOKEN_EXPIRE_MARGIN,
+                        access_token)
+        return access_token
+    finally:
+        if locked:
+            redis.delete(lock_key)
+
+def clear_access_token(account_key, refresh_token):
+    """Remove an access token stored by get_access_token()."""
+    get_redis_connection('storage').delete(
+        _access_token_key(account_key, refresh_token))
+
+def _access_token_key(account_key, refresh_token):
+    # Include the refresh token in the key so that re-linking an account
+    # doesn't use the old access token.
+    return 'google-access-token-{}-{}'.format(
+        account_key, hashlib.sha1(refresh_token).hexdigest()[:16])
+
+def _acquire_access_token_lock(redis, lock_key):
+    end_time = time.time() + ACCESS_TOKEN_LOCK_WAIT
+    while True:
+        if redis.set(lock_key, 1, nx=True, ex=ACCESS_TOKEN_LOCK_TIMEOUT):
+            return True
+        if time.time() >= end_time:
+            # Give up and refresh the token without the lock
+            return False
+        time.sleep(0.1)
 
 def revoke_auth_token(refresh_token):
     requests.get('https://accounts.google.com/o/oauth2/revoke',
@@ -448,17 +524,64 @@ def get_video_info(video_id, accounts=[]):
 def _get_video_info(video_id, access_token=None):
     response = video_get(access_token, video_id, ['snippet', 'contentDetails'])
     try:
-        response_data = response.json()
-        snippet = response_data['items'][0]['snippet']
-        content_details = response_data['items'][0]['contentDetails']
-        return VideoInfo(snippet['channelId'],
-                         snippet['title'],
-                         snippet['description'],
-                         isodate.parse_duration(content_details['duration']).total_seconds(),
-                         snippet['thumbnails']['high']['url'])
+        return _parse_video_info(response.json()['items'][0])
     except StandardError, e:
         raise APIError("get_video_info: Unexpected content: %s" % e)
 
+def _parse_video_info(item):
+    snippet = item['snippet']
+    content_details = item['contentDetails']
+    return VideoInfo(snippet['channelId'],
+                     snippet['title'],
+                     snippet['description'],
+                     isodate.parse_duration(content_details['duration']).total_seconds(),
+                     snippet['thumbnails']['high']['url'])
+
+def get_video_infos(video_ids, accounts=[]):
+    """Get VideoInfo for multiple videos
+
+    This works like get_video_info(), but fetches up to
+    VIDEOS_LIST_MAX_IDS videos with each API request.
+
+    Returns:
+        dict mapping video ids to VideoInfo objects.  Videos that we couldn't
+        get the info for are left out.
+    """
+    video_ids = list(video_ids)
+    infos = {}
+    for i in range(0, len(video_ids), VIDEOS_LIST_MAX_IDS):
+        chunk = video_ids[i:i+VIDEOS_LIST_MAX_IDS]
+        infos.update(_get_video_info_chunk(chunk, accounts))
+    return infos
+
+def _get_video_info_chunk(video_ids, accounts):
+    for account in accounts:
+        try:
+            access_token = get_new_access_token(account.oauth_refresh_token)
+            return _get_video_infos(video_ids, access_token)
+        except Exception, e:
+            pass
+    try:
+        return _get_video_infos(video_ids)
+    except APIError as e:
+        logger.error("Youtube API Error: %s", e)
+        return {}
+
+def _get_video_infos(video_ids, access_token=None):
+    response = video_get(access_token, ','.join(video_ids),
+                         ['snippet', 'contentDetails'])
+    infos = {}
+    try:
+        items = response.json()['items']
+    except StandardError, e:
+        raise APIError("get_video_infos: Unexpected content: %s" % e)
+    for item in items:
+        try:
+            infos[item['id']] = _parse_video_info(item)
+        except StandardError, e:
+            logger.warn("get_video_infos: Unexpected content: %s", e)
+    return infos
+
 
 def get_direct_url_to_audio(video_id):
     """
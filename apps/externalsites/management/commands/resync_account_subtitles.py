@@ -0,0 +1,46 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from django.core.management.base import BaseCommand, CommandError
+
+from externalsites import tasks
+from externalsites.models import get_account
+
+class Command(BaseCommand):
+    help = u'Schedule a resync of all subtitles for an external account'
+
+    def add_arguments(self, parser):
+        parser.add_argument('account_type',
+                            help='Account type code (for example Y or V)')
+        parser.add_argument('account_id', type=int)
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue from where the last run stopped')
+
+    def handle(self, *args, **options):
+        try:
+            account = get_account(options['account_type'],
+                                  options['account_id'])
+        except KeyError:
+            raise CommandError(u'Unknown account type: {}'.format(
+                options['account_type']))
+        if account is None:
+            raise CommandError(u'Account not found')
+        tasks.update_all_subtitles.delay(options['account_type'],
+                                         options['account_id'],
+                                         resume=options['resume'])
+        self.stdout.write(u'Resync scheduled\n')
@@ -37,6 +37,7 @@ from teams.models import Team, TeamVideo
 from utils.text import fmt
 from videos.models import Video, VideoUrl, VideoFeed
 from videos.permissions import can_user_resync_own_video
+from videos.types.youtube import YoutubeVideoType
 import videos.models
 import videos.tasks
 
@@ -730,19 +731,32 @@ class YouTubeAccount(ExternalAccount):
         Subclasses must implement this method.
         """
         if self.sync_subtitles:
-            access_token = google.get_new_access_token(self.oauth_refresh_token)
-            syncing.youtube.update_subtitles(video_url.videoid, access_token,
+            syncing.youtube.update_subtitles(video_url.videoid,
+                                             self.get_access_token(),
                                              version,
                                              self.enable_language_mapping,
                                              self.sync_metadata)
 
     def do_delete_subtitles(self, video_url, language):
-        access_token = google.get_new_access_token(self.oauth_refresh_token)
-        syncing.youtube.delete_subtitles(video_url.videoid, access_token,
+        syncing.youtube.delete_subtitles(video_url.videoid,
+                                         self.get_access_token(),
                                          language.language_code,
                                          self.enable_language_mapping)
 
+    def get_access_token(self):
+        """Get an OAuth access token for this account
+
+        Access tokens are cached, see google.get_access_token().
+        """
+        return google.get_access_token(self.access_token_key(),
+                                       self.oauth_refresh_token)
+
+    def access_token_key(self):
+        return 'youtube-account-{}'.format(self.id)
+
     def delete(self):
+        google.clear_access_token(self.access_token_key(),
+                                  self.oauth_refresh_token)
         google.revoke_auth_token(self.oauth_refresh_token)
         super(YouTubeAccount, self).delete()
 
@@ -756,27 +770,56 @@ class YouTubeAccount(ExternalAccount):
         video_ids = google.get_uploaded_video_ids(self.channel_id)
         if not video_ids:
             return
-        for video_id in video_ids:
-            if video_id == self.last_import_video_id:
-                break
-            video_url = 'http://youtube.com/watch?v={}'.format(video_id)
-            if self.type == ExternalAccount.TYPE_USER:
+        if self.last_import_video_id in video_ids:
+            video_ids = video_ids[:video_ids.index(self.last_import_video_id)]
+        if self.type == ExternalAccount.TYPE_USER:
+            user, team = self.user, None
+        else:
+            user, team = None, self.import_team
+        video_types = self._new_video_types(video_ids, team)
+        YoutubeVideoType.prefetch_video_info(video_types, user, team)
+        for vt in video_types:
+            if team is None:
                 try:
-                    Video.add(video_url, self.user)
+                    Video.add(vt, user)
                 except Video.DuplicateUrlError:
                     continue
-            elif self.import_team:
+            else:
                 def add_to_team(video, video_url):
                     TeamVideo.objects.create(video=video,
-                                             team=self.import_team,
+                                             team=team,
                                              added_by=self.user)
                 try:
-                    Video.add(video_url, None, add_to_team, self.import_team)
+                    Video.add(vt, None, add_to_team, team)
                 except Video.DuplicateUrlError:
                     continue
 
-        self.last_import_video_id = video_ids[0]
-        self.save()
+        if video_ids:
+            self.last_import_video_id = video_ids[0]
+            self.save()
+
+    def _new_video_types(self, video_ids, team):
+        """Get YoutubeVideoTypes for the videos that we need to add
+
+        This checks for existing URLs with a single query, rather than
+        letting Video.add() try to create each one.
+        """
+        video_types = [
+            YoutubeVideoType(YoutubeVideoType.url_from_id(video_id))
+            for video_id in video_ids
+        ]
+        existing = set(VideoUrl.objects
+                       .filter(url_hash__in=[
+                           videos.models.url_hash(vt.convert_to_video_url())
+                           for vt in video_types
+                       ], team_id=team.id if team else 0,
+                           type=YoutubeVideoType.abbreviation)
+                       .values_list('url_hash', flat=True))
+        return [
+            vt for vt in video_types
+            if videos.models.url_hash(vt.convert_to_video_url())
+            not in existing
+        ]
 
     def imports_to_owner_team(self):
         return (self.type == self.TYPE_TEAM and 
@@ -19,9 +19,12 @@
 """externalsites.syncing.youtube -- Sync subtitles to/from Youtube"""
 
 from __future__ import absolute_import
+import contextlib
+import json
 
 from django.conf import settings
 from django.utils import translation
+from django_redis import get_redis_connection
 import babelsubs
 import unilangs
 
@@ -53,12 +56,91 @@ def convert_language_code(lc, enable_language_mapping):
 def _format_subs_for_youtube(subtitle_set):
     return babelsubs.to(subtitle_set, 'vtt').encode('utf-8')
 
+# How long to remember the captions for a video during a sync run
+CAPTION_MEMO_TIMEOUT = 60 * 60
+# Hash field that marks that we've fetched the captions for a video
+CAPTION_MEMO_FETCHED = '!fetched'
+
+_caption_memo_run = None
+
+@contextlib.contextmanager
+def caption_list_memo(sync_run):
+    """Share captions_list() results between the jobs of a sync run
+
+    update_all_subtitles() schedules an update_video_subtitles() job for each
+    video.  Inside this context manager, we store the captions for each video
+    in redis, so that we only need to call captions_list() once per video.  We keep the stored captions up to date as we insert and
+    delete them.
+
+    Args:
+        sync_run: unique id for the sync run, or None to disable the memo
+    """
+    global _caption_memo_run
+    old_sync_run = _caption_memo_run
+    _caption_memo_run = sync_run
+    try:
+        yield
+    finally:
+        _caption_memo_run = old_sync_run
+
+def _caption_memo_key(video_id):
+    return 'youtube-captions-{}-{}'.format(_caption_memo_run, video_id)
+
+def _captions_list(access_token, video_id):
+    """Get (caption_id, language_code) tuples for a video."""
+    if _caption_memo_run is None:
+        return [
+            (caption_id, language_code)
+            for caption_id, language_code, name
+            in google.captions_list(access_token, video_id)
+        ]
+    redis = get_redis_connection('storage')
+    key = _caption_memo_key(video_id)
+    memo = redis.hgetall(key)
+    if not memo:
+        memo = {
+            caption_id: language_code
+            for caption_id, language_code, name
+            in google.captions_list(access_token, video_id)
+        }
+        memo[CAPTION_MEMO_FETCHED] = ''
+        pipe = redis.pipeline()
+        pipe.hmset(key, memo)
+        pipe.expire(key, CAPTION_MEMO_TIMEOUT)
+        pipe.execute()
+    return [
+        (caption_id, language_code)
+        for caption_id, language_code in memo.items()
+        if caption_id != CAPTION_MEMO_FETCHED
+    ]
+
+def _remember_inserted_caption(video_id, language_code, response_content):
+    if _caption_memo_run is None:
+        return
+    redis = get_redis_connection('storage')
+    key = _caption_memo_key(video_id)
+    try:
+        caption_id = json.loads(response_content)['id']
+    except (ValueError, TypeError, KeyError):
+        # Forget the captions so that the next job fetches them again
+        redis.delete(key)
+    else:
+        if redis.exists(key):
+            redis.hset(key, caption_id, language_code)
+
+def _forget_deleted_caption(video_id, caption_id):
+    if _caption_memo_run is None:
+        return
+    get_redis_connection('storage').hdel(_caption_memo_key(video_id),
+                                         caption_id)
+
 def find_existing_caption_id(access_token, video_id, language_code,
                              enable_language_mapping):
 
     caption_id_map = {
-        caption_info[1].lower(): caption_info[0]
-        for caption_info in google.captions_list(access_token, video_id)
+        caption_language_code.lower(): caption_id
+        for caption_id, caption_language_code
+        in _captions_list(access_token, video_id)
     }
 
     # regardless of enable_language_mapping, try the unmapped language first
@@ -94,8 +176,9 @@ def update_subtitles(video_id, access_token, subtitle_version,
         google.captions_update(access_token, caption_id, 'text/vtt', content)
     else:
         language_code = convert_language_code(language_code, enable_language_mapping)
-        google.captions_insert(access_token, video_id, language_code,
-                               'text/vtt', content)
+        response_content = google.captions_insert(
+            access_token, video_id, language_code, 'text/vtt', content)
+        _remember_inserted_caption(video_id, language_code, response_content)
 
     sync_metadata(video_id, access_token, subtitle_version,
                     enable_language_mapping, account_syncs_metadata)
@@ -134,6 +217,7 @@ def delete_subtitles(video_id, access_token, language_code,
                                           enable_language_mapping)
     if caption_id:
         google.captions_delete(access_token, caption_id)
+        _forget_deleted_caption(video_id, caption_id)
 
 def should_add_credit_to_subtitles(subtitle_version, subs):
     if len(subs) == 0 or not subs.fully_synced:
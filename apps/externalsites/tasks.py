@@ -17,18 +17,22 @@
 # http://www.gnu.org/licenses/agpl-3.0.html.
 
 import logging
+import uuid
 
 from django.core.exceptions import ObjectDoesNotExist
+from django_redis import get_redis_connection
 
 from externalsites import credit
 from externalsites import google
 from externalsites import subfetch
 from externalsites.models import (get_account, get_sync_account, SyncHistory,
                                   YouTubeAccount, VimeoSyncAccount)
+from externalsites.syncing import youtube
 from subtitles.models import SubtitleLanguage, SubtitleVersion
-from videos.models import VideoUrl
+from videos.models import Video, VideoUrl
 from auth.models import CustomUser as User
 from teams.models import Team
+from utils import jobprogress
 from utils.taskqueue import job
 logger = logging.getLogger(__name__)
 
@@ -86,9 +90,30 @@ def delete_subtitles(account_type, account_id, video_url_id, lang_id):
 
     account.delete_subtitles(video_url, language)
 
-@job
-def update_all_subtitles(account_type, account_id):
-    """Update all subtitles for a given account."""
+# Number of videos to handle at once in update_all_subtitles()
+RESYNC_CHUNK_SIZE = 200
+# How long to remember where an update_all_subtitles() run got to
+RESYNC_CURSOR_TIMEOUT = 60 * 60 * 24 * 7
+
+def resync_progress_key(account_type, account_id):
+    """jobprogress key for update_all_subtitles()"""
+    return 'update-all-subtitles-{}-{}'.format(account_type, account_id)
+
+def _resync_cursor_key(account_type, account_id):
+    return 'update-all-subtitles-cursor-{}-{}'.format(account_type,
+                                                      account_id)
+
+@job(timeout=60*60)
+def update_all_subtitles(account_type, account_id, resume=False):
+    """Update all subtitles for a given account.
+
+    We walk through the account's videos in chunks, ordered by id, and
+    schedule an update_video_subtitles() job for each video that has public
+    subtitles.  Progress is reported using utils.jobprogress.
+
+    After each chunk we store the id of the last video handled.  If the job
+    crashes, run it again with resume=True to continue from that point.
+    """
     logger.info("externalsites.tasks.update_all_subtitles(%s, %s)",
                 account_type, account_id)
     try:
@@ -101,27 +126,88 @@ def update_all_subtitles(account_type, account_id):
                 'data': {
                     'account_type': account_type,
                     'account_id': account_id,
-                    'video_url_id': video_url_id,
-                    'lang_id': lang_id,
-                    'version_id': version_id,
                 }
             }
         )
         return
+    if account is None:
+        logger.warn('update_all_subtitles(): account deleted (%s, %s)',
+                    account_type, account_id)
+        return
     if account.team:
-        videos = account.team.videos
+        videos = account.team.videos.all()
     else:
-        videos = account.user.video_set
+        videos = account.user.video_set.all()
+
+    redis = get_redis_connection('storage')
+    progress_key = resync_progress_key(account_type, account_id)
+    cursor_key = _resync_cursor_key(account_type, account_id)
+    last_video_id = 0
+    if resume:
+        last_video_id = int(redis.get(cursor_key) or 0)
+    total = videos.count()
+    current = videos.filter(id__lte=last_video_id).count()
+    jobprogress.update(progress_key, current, total)
 
-    for video in videos.all():
-        for video_url in video.get_video_urls():
-            if not account.should_sync_video_url(video, video_url):
+    sync_run = uuid.uuid4().hex
+    while True:
+        chunk = list(videos.filter(id__gt=last_video_id)
+                     .order_by('id')
+                     .select_related('teamvideo')
+                     .prefetch_related('videourl_set')
+                     [:RESYNC_CHUNK_SIZE])
+        if not chunk:
+            break
+        video_ids_with_subtitles = set(
+            SubtitleLanguage.objects
+            .filter(video__in=chunk)
+            .having_public_versions()
+            .values_list('video_id', flat=True))
+        for video in chunk:
+            if video.id not in video_ids_with_subtitles:
                 continue
-            language_qs = (video.newsubtitlelanguage_set
-                           .having_public_versions())
-            for language in language_qs:
-                update_subtitles.delay(account_type, account_id,
-                                       video_url.id, language.id)
+            video_url_ids = [
+                video_url.id for video_url in video.get_video_urls()
+                if account.should_sync_video_url(video, video_url)
+            ]
+            if video_url_ids:
+                update_video_subtitles.delay(account_type, account_id,
+                                             video.id, video_url_ids,
+                                             sync_run=sync_run)
+        last_video_id = chunk[-1].id
+        current += len(chunk)
+        redis.setex(cursor_key, RESYNC_CURSOR_TIMEOUT, last_video_id)
+        jobprogress.update(progress_key, current, total)
+
+    redis.delete(cursor_key)
+    jobprogress.complete(progress_key)
+
+@job
+def update_video_subtitles(account_type, account_id, video_id, video_url_ids,
+                           sync_run=None):
+    """Update subtitles for all public languages of a video
+
+    This is used by update_all_subtitles().  It fetches the account, video
+    URLs and public tips once, then syncs each language.
+    """
+    account = get_account(account_type, account_id)
+    try:
+        video = Video.objects.get(id=video_id)
+    except Video.DoesNotExist:
+        return
+    if account is None:
+        return
+    video_urls = list(VideoUrl.objects.filter(id__in=video_url_ids,
+                                              video=video))
+    for video_url in video_urls:
+        video_url.video = video
+    languages = (video.newsubtitlelanguage_set
+                 .having_public_versions()
+                 .fetch_and_join(public_tips=True, video=video))
+    with youtube.caption_list_memo(sync_run):
+        for video_url in video_urls:
+            for language in languages:
+                account.update_subtitles(video_url, language)
 
 @job
 def add_amara_credit(video_url_id):
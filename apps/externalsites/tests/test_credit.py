@@ -67,11 +67,11 @@ class BaseCreditTest(TestCase):
         self.mock_get_video_info.return_value = YouTubeVideoInfoFactory()
 
 class AddCreditTest(BaseCreditTest):
-    @test_utils.patch_for_test('externalsites.google.get_new_access_token')
-    def setUp(self, mock_get_new_access_token):
+    @test_utils.patch_for_test('externalsites.google.get_access_token')
+    def setUp(self, mock_get_access_token):
         BaseCreditTest.setUp(self)
-        self.mock_get_new_access_token = mock_get_new_access_token
-        self.mock_get_new_access_token.return_value = 'test-access-token'
+        self.mock_get_access_token = mock_get_access_token
+        self.mock_get_access_token.return_value = 'test-access-token'
         self.user = UserFactory()
         self.video = YouTubeVideoFactory(user=self.user,
                                          channel_id='test-channel-id')
@@ -87,7 +87,8 @@ class AddCreditTest(BaseCreditTest):
             'test description',
             "Help us caption & translate this video!",
             shortlink_for_video(self.video)])
-        self.mock_get_new_access_token.assert_called_with(
+        self.mock_get_access_token.assert_called_with(
+            self.account.access_token_key(),
             self.account.oauth_refresh_token)
         self.mock_update_video_description.assert_called_with(
             self.video_url.videoid, 'test-access-token', new_description)
@@ -96,12 +97,12 @@ class AddCreditTest(BaseCreditTest):
         # test that add_credit_to_video_url only alters the description once
         add_credit_to_video_url(self.video_url, self.account)
 
-        self.mock_get_new_access_token.reset_mock()
+        self.mock_get_access_token.reset_mock()
         self.mock_update_video_description.reset_mock()
         self.mock_get_video_info.reset_mock()
 
         add_credit_to_video_url(self.video_url, 'test-access-token')
-        self.assertEqual(self.mock_get_new_access_token.call_count, 0)
+        self.assertEqual(self.mock_get_access_token.call_count, 0)
         self.assertEqual(self.mock_update_video_description.call_count, 0)
         self.assertEqual(self.mock_get_video_info.call_count, 0)
 
@@ -116,11 +117,11 @@ class AddCreditTest(BaseCreditTest):
                 shortlink_for_video(self.video)]))
 
         add_credit_to_video_url(self.video_url, self.account)
-        # in this case we should call get_new_access_token() and
+        # in this case we should call get_access_token() and
         # get_video_info() to get the description, but avoid the
         # update_video_description() API call.
 
-        self.assertEqual(self.mock_get_new_access_token.call_count, 1)
+        self.assertEqual(self.mock_get_access_token.call_count, 1)
         self.assertEqual(self.mock_get_video_info.call_count, 1)
         self.assertEqual(self.mock_update_video_description.call_count, 0)
 
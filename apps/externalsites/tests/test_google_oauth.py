@@ -209,6 +209,68 @@ class AccessTokenTest(TestCase):
                               google.get_new_access_token,
                               'test-refresh-token')
 
+    def expect_token_request(self, mocker, access_token, expires_in,
+                             refresh_token='test-refresh-token'):
+        mocker.expect_request(
+            'post', "https://accounts.google.com/o/oauth2/token", data={
+                'client_id': settings.GOOGLE_CLIENT_ID,
+                'client_secret': settings.GOOGLE_CLIENT_SECRET,
+                'grant_type': 'refresh_token',
+                'refresh_token': refresh_token,
+            }, headers={
+                "Content-Type": "application/x-www-form-urlencoded"
+            }, body=json.dumps({
+                'access_token': access_token,
+                'expires_in': expires_in,
+            }),
+        )
+
+    def test_get_access_token_cached(self):
+        mocker = RequestsMocker()
+        self.expect_token_request(mocker, 'test-access-token', 3600)
+        google.get_access_token.run_original_for_test()
+        with mocker:
+            for i in range(3):
+                access_token = google.get_access_token(
+                    'test-account', 'test-refresh-token')
+                self.assertEqual(access_token, 'test-access-token')
+
+    def test_get_access_token_expires_soon(self):
+        # If the token expires within ACCESS_TOKEN_EXPIRE_MARGIN, we shouldn't
+        # store it
+        mocker = RequestsMocker()
+        self.expect_token_request(mocker, 'test-access-token',
+                                  google.ACCESS_TOKEN_EXPIRE_MARGIN)
+        self.expect_token_request(mocker, 'test-access-token2', 3600)
+        google.get_access_token.run_original_for_test()
+        with mocker:
+            self.assertEqual(google.get_access_token(
+                'test-account', 'test-refresh-token'), 'test-access-token')
+            self.assertEqual(google.get_access_token(
+                'test-account', 'test-refresh-token'), 'test-access-token2')
+
+    def test_get_access_token_new_refresh_token(self):
+        mocker = RequestsMocker()
+        self.expect_token_request(mocker, 'test-access-token', 3600)
+        self.expect_token_request(mocker, 'test-access-token2', 3600,
+                                  refresh_token='test-refresh-token2')
+        google.get_access_token.run_original_for_test()
+        with mocker:
+            google.get_access_token('test-account', 'test-refresh-token')
+            self.assertEqual(google.get_access_token(
+                'test-account', 'test-refresh-token2'), 'test-access-token2')
+
+    def test_clear_access_token(self):
+        mocker = RequestsMocker()
+        self.expect_token_request(mocker, 'test-access-token', 3600)
+        self.expect_token_request(mocker, 'test-access-token2', 3600)
+        google.get_access_token.run_original_for_test()
+        with mocker:
+            google.get_access_token('test-account', 'test-refresh-token')
+            google.clear_access_token('test-account', 'test-refresh-token')
+            self.assertEqual(google.get_access_token(
+                'test-account', 'test-refresh-token'), 'test-access-token2')
+
     def test_revoke_auth_token(self):
         mocker = RequestsMocker()
         mocker.expect_request(
@@ -22,6 +22,7 @@ from django.test import TestCase
 from nose.tools import *
 import mock
 
+from externalsites import google
 from externalsites.models import ExternalAccount, YouTubeAccount
 from videos.models import Video, VideoUrl
 from utils import test_utils
@@ -42,14 +43,22 @@ class YoutubeImportTest(TestCase):
         self.mock_get_uploaded_video_ids.return_value = [
             'video-1', 'video-2', 'video-3',
         ]
-        def make_video(url, user, setup_callback=None, team=None):
-            video = VideoFactory(video_url__url=url)
+        def make_video(video_type, user, setup_callback=None, team=None):
+            video = VideoFactory(video_url__url=video_type.url)
             video_url = video.get_primary_videourl_obj()
             if setup_callback:
                 setup_callback(video, video_url)
             return video, video_url
         self.mock_video_add.side_effect = make_video
 
+    def video_add_calls(self):
+        # Video.add() gets passed a YoutubeVideoType.  Convert that to the
+        # URL to make the calls easier to check.
+        return [
+            mock.call(args[0].url, *args[1:], **kwargs)
+            for args, kwargs in self.mock_video_add.call_args_list
+        ]
+
     def test_accounts_to_import(self):
         # We should select:
         #  - All user accounts
@@ -65,7 +74,7 @@ class YoutubeImportTest(TestCase):
     def test_user_account_import(self):
         # we should import all videos and set added_by to the user
         self.user_account.import_videos()
-        assert_equals(self.mock_video_add.call_args_list, [
+        assert_equals(self.video_add_calls(), [
             mock.call('http://youtube.com/watch?v=video-1', self.user),
             mock.call('http://youtube.com/watch?v=video-2', self.user),
             mock.call('http://youtube.com/watch?v=video-3', self.user),
@@ -74,7 +83,7 @@ class YoutubeImportTest(TestCase):
     def test_team_account_import(self):
         # we should import all videos and add them to our team
         self.team_account.import_videos()
-        assert_equals(self.mock_video_add.call_args_list, [
+        assert_equals(self.video_add_calls(), [
             mock.call('http://youtube.com/watch?v=video-1', None, mock.ANY,
                       self.import_team),
             mock.call('http://youtube.com/watch?v=video-2', None, mock.ANY,
@@ -99,6 +108,47 @@ class YoutubeImportTest(TestCase):
         self.user_account.last_import_video_id = 'video-2'
         self.user_account.import_videos()
         # we should only import videos added after video-2 in the playlist
-        assert_equals(self.mock_video_add.call_args_list, [
+        assert_equals(self.video_add_calls(), [
+            mock.call('http://youtube.com/watch?v=video-1', self.user),
+        ])
+
+    def test_skip_existing_urls(self):
+        # We should skip videos that were already added, without calling
+        # Video.add()
+        VideoFactory(video_url__url='http://www.youtube.com/watch?v=video-2',
+                     video_url__type='Y')
+        self.user_account.import_videos()
+        assert_equals(self.video_add_calls(), [
             mock.call('http://youtube.com/watch?v=video-1', self.user),
+            mock.call('http://youtube.com/watch?v=video-3', self.user),
         ])
+
+    def test_existing_urls_for_other_teams(self):
+        # Videos added to another team shouldn't be skipped
+        VideoFactory(video_url__url='http://www.youtube.com/watch?v=video-2',
+                     video_url__type='Y',
+                     video_url__team_id=TeamFactory().id)
+        self.team_account.import_videos()
+        assert_equals(len(self.video_add_calls()), 3)
+
+    @test_utils.patch_for_test("externalsites.google.get_video_infos")
+    def test_batch_video_info(self, mock_get_video_infos):
+        # We should fetch the video info for all videos with 1 call, then
+        # store it on the video types
+        video_info = google.VideoInfo(
+            'test-channel-id', 'test-title', 'test-description', 60,
+            'http://example.com/youtube-thumb.png')
+        mock_get_video_infos.return_value = {
+            'video-1': video_info,
+            'video-3': video_info,
+        }
+        self.user_account.import_videos()
+        assert_equal(mock_get_video_infos.call_count, 1)
+        assert_items_equal(mock_get_video_infos.call_args[0][0],
+                           ['video-1', 'video-2', 'video-3'])
+        video_types = [
+            args[0] for args, kwargs in self.mock_video_add.call_args_list
+        ]
+        assert_equal(video_types[0]._video_info, video_info)
+        assert_false(hasattr(video_types[1], '_video_info'))
+        assert_equal(video_types[2]._video_info, video_info)
@@ -100,16 +100,16 @@ class TestLookupYoutubeAccounts(TestCase):
 
 class SubFetchTestCase(TestCase):
     @test_utils.patch_for_test("externalsites.google.get_video_info")
-    @test_utils.patch_for_test("externalsites.google.get_new_access_token")
+    @test_utils.patch_for_test("externalsites.google.get_access_token")
     @test_utils.patch_for_test("externalsites.google.captions_list")
     @test_utils.patch_for_test("externalsites.google.captions_download")
     def setUp(self, mock_captions_download, mock_captions_list,
-              mock_get_new_access_token, mock_get_video_info):
+              mock_get_access_token, mock_get_video_info):
         self.mock_captions_download = mock_captions_download
         self.mock_captions_list = mock_captions_list
-        self.mock_get_new_access_token = mock_get_new_access_token
+        self.mock_get_access_token = mock_get_access_token
         self.mock_get_video_info = mock_get_video_info
-        self.mock_get_new_access_token.return_value = 'test-access-token'
+        self.mock_get_access_token.return_value = 'test-access-token'
         self.mock_get_video_info.return_value = VideoInfo(
             'username', 'test-title', 'test-description', 60,
             'http://example.com/youtube-thumb.png')
@@ -141,8 +141,9 @@ class SubFetchTestCase(TestCase):
 
         fetch_subs(self.video_url, user=self.user)
         # check that we called the correct API methods
-        assert_equal(self.mock_get_new_access_token.call_args,
-                     mock.call(self.account.oauth_refresh_token))
+        assert_equal(self.mock_get_access_token.call_args,
+                     mock.call(self.account.access_token_key(),
+                               self.account.oauth_refresh_token))
 
         assert_equal(self.mock_captions_list.call_args,
                      mock.call('test-access-token', self.video_id))
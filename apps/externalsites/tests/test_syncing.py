@@ -24,18 +24,19 @@ import string
 
 from django.test import TestCase
 from django.db.models.signals import post_save
+from django_redis import get_redis_connection
 from nose.tools import *
 import babelsubs
 import mock
 
-from externalsites import signalhandlers
+from externalsites import signalhandlers, tasks
 from externalsites.exceptions import SyncingError
 from externalsites.models import (KalturaAccount, SyncedSubtitleVersion,
                                   SyncHistory, get_sync_account)
 from externalsites.syncing import kaltura, brightcove, youtube
 from subtitles import pipeline
 from teams.permissions_const import ROLE_ADMIN
-from utils import test_utils
+from utils import jobprogress, test_utils
 from utils.factories import *
 from utils.test_utils import patch_for_test
 import babelsubs
@@ -203,6 +204,36 @@ class SubtitleTaskTest(TestCase):
         ])
         self.check_synced_version(language, version)
 
+    def test_update_all_subtitles(self):
+        fr_version = pipeline.add_subtitles(self.video, 'fr', None)
+        # Languages without public versions shouldn't be synced
+        pipeline.add_subtitles(self.video, 'de', None,
+                               visibility='private')
+        self.reset_history()
+        self.run_update_all_subtitles()
+        en_version = self.video.subtitle_language('en').get_tip()
+        assert_items_equal(
+            [(c[0][0], c[0][2]) for c in
+             self.mock_update_subtitles.call_args_list],
+            [(self.video_url, en_version), (self.video_url, fr_version)])
+        assert_equal(jobprogress.get(tasks.resync_progress_key(
+            'K', self.account.id)), None)
+
+    @mock.patch('externalsites.tasks.RESYNC_CHUNK_SIZE', 1)
+    def test_update_all_subtitles_resume(self):
+        video2 = KalturaVideoFactory(name='video2')
+        TeamVideoFactory(video=video2, team=self.team)
+        version2 = pipeline.add_subtitles(video2, 'en', None)
+        self.reset_history()
+        # Pretend that a previous run crashed after handling self.video
+        get_redis_connection('storage').set(
+            tasks._resync_cursor_key('K', self.account.id), self.video.id)
+        test_utils.update_all_subtitles.original_func(
+            'K', self.account.id, resume=True)
+        assert_equal(
+            [c[0][2] for c in self.mock_update_subtitles.call_args_list],
+            [version2])
+
     def test_upload_subtitles_error(self):
         now = self.now
         exc = SyncingError('Site exploded')
@@ -909,3 +940,49 @@ class YouTubeLanguageMappingTest(TestCase):
         self.mock_google.languages.extend(['zh-cn', 'zh-hans'])
         self.check_update_subtitles_choice('zh-cn', 'zh-cn')
         self.check_delete_subtitles_choice('zh-cn', 'zh-cn')
+
+class YouTubeCaptionListMemoTest(TestCase):
+    @patch_for_test('externalsites.syncing.youtube.google', MockGoogleAPI)
+    def setUp(self, mock_google):
+        self.mock_google = mock_google
+        self.mock_google.captions_list = mock.Mock(
+            side_effect=self.mock_google.captions_list)
+        self.mock_google.captions_insert.return_value = json.dumps({
+            'id': 'new-caption-id',
+        })
+        self.mock_google.languages.append('en')
+        self.video = VideoFactory()
+
+    def update_subtitles(self, language_code):
+        version = pipeline.add_subtitles(self.video, language_code,
+                                         SubtitleSetFactory())
+        youtube.update_subtitles('test-video-id', 'test-access-token',
+                                 version, enable_language_mapping=False,
+                                 account_syncs_metadata=False)
+
+    def test_captions_list_shared(self):
+        with youtube.caption_list_memo('test-run'):
+            self.update_subtitles('en')
+            self.update_subtitles('fr')
+            self.update_subtitles('de')
+        assert_equal(self.mock_google.captions_list.call_count, 1)
+
+    def test_inserted_captions_remembered(self):
+        with youtube.caption_list_memo('test-run'):
+            self.update_subtitles('fr')
+            self.update_subtitles('fr')
+        assert_equal(self.mock_google.captions_insert.call_count, 1)
+        assert_equal(self.mock_google.captions_update.call_args[0][1],
+                     'new-caption-id')
+
+    def test_deleted_captions_forgotten(self):
+        with youtube.caption_list_memo('test-run'):
+            youtube.delete_subtitles('test-video-id', 'test-access-token',
+                                     'en', enable_language_mapping=False)
+            self.update_subtitles('en')
+        assert_equal(self.mock_google.captions_insert.call_count, 1)
+
+    def test_no_memo_outside_sync_run(self):
+        self.update_subtitles('en')
+        self.update_subtitles('en')
+        assert_equal(self.mock_google.captions_list.call_count, 2)
@@ -228,6 +228,67 @@ class YouTubeTestCase(TestCase):
             with assert_raises(google.APIError):
                 google.get_video_info('test-video-id')
 
+    def make_video_item(self, video_id):
+        return {
+            'id': video_id,
+            'snippet': {
+                'title': 'title-{}'.format(video_id),
+                'channelId': 'test-channel-id',
+                'description': 'test-description',
+                'thumbnails': {
+                    'high': {
+                        'url': 'test-thumbnail-url',
+                    }
+                }
+            },
+            'contentDetails': {
+                'duration': 'PT10M10S',
+            }
+        }
+
+    def test_get_video_infos(self):
+        # We should request up to 50 videos at once
+        video_ids = ['test-video-id{}'.format(i) for i in range(60)]
+        mocker = test_utils.RequestsMocker()
+        for chunk in (video_ids[:50], video_ids[50:]):
+            mocker.expect_request(
+                'get', 'https://www.googleapis.com/youtube/v3/videos', params={
+                    'part': 'snippet,contentDetails',
+                    'id': ','.join(chunk),
+                    'key': settings.GOOGLE_API_KEY,
+                }, body=json.dumps({
+                    # Simulate one of the videos being missing
+                    'items': [
+                        self.make_video_item(video_id)
+                        for video_id in chunk
+                        if video_id != 'test-video-id5'
+                    ]
+                })
+            )
+        google.get_video_infos.run_original_for_test()
+        with mocker:
+            video_infos = google.get_video_infos(video_ids)
+        assert_equal(sorted(video_infos.keys()),
+                     sorted(v for v in video_ids if v != 'test-video-id5'))
+        video_info = video_infos['test-video-id55']
+        assert_equal(video_info.title, 'title-test-video-id55')
+        assert_equal(video_info.channel_id, 'test-channel-id')
+        assert_equal(video_info.duration, 610)
+
+    def test_get_video_infos_invalid_body(self):
+        # For errors, we should return an empty dict and let the caller fall
+        # back to get_video_info()
+        mocker = test_utils.RequestsMocker()
+        mocker.expect_request(
+            'get', 'https://www.googleapis.com/youtube/v3/videos', params={
+                'part': 'snippet,contentDetails',
+                'id': 'test-video-id',
+                'key': settings.GOOGLE_API_KEY,
+            }, body="Invalid body")
+        google.get_video_infos.run_original_for_test()
+        with mocker:
+            assert_equal(google.get_video_infos(['test-video-id']), {})
+
     def test_update_video_description(self):
         mocker = test_utils.RequestsMocker()
         mocker.expect_request(
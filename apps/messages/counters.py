@@ -0,0 +1,119 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+"""messages.counters -- Maintain the per-user message counters
+
+The "You have XX new messages" alert shows on almost every page for logged-in
+users.  Counting the messages each time is slow for users with large inboxes,
+so we store 2 denormalized fields on CustomUser:
+
+  - new_message_count: messages for the user that are unread and newer than
+    last_hidden_message_id
+  - latest_message_id: id of the newest message for the user
+
+Since request.user gets loaded from the user's cache group, reading these
+doesn't touch the Message table at all.
+
+The counters are updated with UPDATE queries as messages are created, read,
+deleted and hidden.  Most of those are handled by the signal handlers in
+messages.signalhandlers.  Code that updates messages with
+QuerySet.update() needs to call recalculate() afterwards.
+
+If the counters drift, the reconcile_message_counters command recalculates
+them from the Message table.
+"""
+
+from django.db.models import Count, F, Max
+from django.db.models.functions import Greatest
+
+from auth.models import CustomUser as User
+from messages.models import Message
+
+def message_created(message):
+    """Update the counters for a new message."""
+    if message.deleted_for_user:
+        return
+    updates = {
+        'latest_message_id': Greatest(F('latest_message_id'), message.id),
+    }
+    if not message.read:
+        updates['new_message_count'] = F('new_message_count') + 1
+    User.objects.filter(id=message.user_id).update(**updates)
+    User.cache.invalidate_by_pk(message.user_id)
+
+def message_deleted(message):
+    """Update the counters for a deleted message."""
+    if not message.deleted_for_user and not message.read:
+        (User.objects
+         .filter(id=message.user_id, new_message_count__gt=0,
+                 last_hidden_message_id__lt=message.id)
+         .update(new_message_count=F('new_message_count') - 1))
+    if User.objects.filter(id=message.user_id,
+                           latest_message_id=message.id).exists():
+        recalculate([message.user_id])
+    User.cache.invalidate_by_pk(message.user_id)
+
+def recalculate(user_ids):
+    """Recalculate the counters for a list of users from the Message table."""
+    user_ids = list(user_ids)
+    for user_id, (count, latest) in calculate(user_ids).items():
+        (User.objects.filter(id=user_id)
+         .update(new_message_count=count, latest_message_id=latest))
+        User.cache.invalidate_by_pk(user_id)
+
+def calculate(user_ids):
+    """Calculate the counters for a list of users
+
+    Returns:
+        dict mapping user ids to (new_message_count, latest_message_id)
+        tuples
+    """
+    messages = (Message.objects
+                .filter(user_id__in=user_ids, deleted_for_user=False)
+                .order_by())
+    latest = dict(messages
+                  .values_list('user_id')
+                  .annotate(Max('id')))
+    new = dict(messages
+               .filter(read=False, id__gt=F('user__last_hidden_message_id'))
+               .values_list('user_id')
+               .annotate(Count('id')))
+    return {
+        user_id: (new.get(user_id, 0), latest.get(user_id, 0))
+        for user_id in user_ids
+    }
+
+def reconcile(user_ids):
+    """Fix the counters for any users where they've drifted
+
+    Returns:
+        number of users whose counters were fixed
+    """
+    user_ids = list(user_ids)
+    correct = calculate(user_ids)
+    current = (User.objects.filter(id__in=user_ids)
+               .values_list('id', 'new_message_count', 'latest_message_id'))
+    fixed = 0
+    for user_id, count, latest in current:
+        if (count, latest) != correct[user_id]:
+            count, latest = correct[user_id]
+            (User.objects.filter(id=user_id)
+             .update(new_message_count=count, latest_message_id=latest))
+            User.cache.invalidate_by_pk(user_id)
+            fixed += 1
+    return fixed
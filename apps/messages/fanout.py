@@ -0,0 +1,235 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+"""messages.fanout -- Send the same notification to many users
+
+Notifications like "new comment on a video you follow" go out to every
+follower.  Rendering the templates, saving a Message and opening an SMTP
+connection for each user is too slow when there are thousands of them, so this
+module does the work in bulk:
+
+  - Templates get rendered once.  The per-user variables (user, plus anything
+    in user_fields) are replaced with placeholder tokens, which we then
+    substitute with the real values for each user.  This means templates can
+    output per-user variables, but can't use them in tags like {% if %} or
+    filters.
+  - Message rows get created with bulk_create(), BATCH_SIZE at a time.
+  - Emails for each batch get sent over a single connection.
+  - If there are more than JOB_SIZE users, we handle the first JOB_SIZE then
+    schedule another deliver() job for the rest.  Progress is reported using
+    utils.jobprogress.
+"""
+
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+from django.utils.html import conditional_escape
+
+from auth.models import CustomUser as User
+from messages.models import Message, SYSTEM_NOTIFICATION
+from utils import jobprogress
+from utils.taskqueue import job
+
+# Users to handle in each bulk_create()/SMTP connection
+BATCH_SIZE = 200
+# Users to handle in each deliver() job
+JOB_SIZE = 5000
+
+Notification = namedtuple('Notification', [
+    'subject', 'message', 'email', 'user_fields', 'content_type_id',
+    'object_pk', 'author_id', 'message_type', 'check_user_preference',
+    'fail_silently',
+])
+
+class Placeholder(object):
+    """Stands in for a per-user template variable
+
+    Attribute lookups return a new placeholder for the longer path, so that
+    {{ user.id }} renders as the token for "user.id".
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return Placeholder('{}.{}'.format(self.path, name))
+
+    def __unicode__(self):
+        return make_token(self.path)
+
+    __str__ = __unicode__
+
+def make_token(path):
+    return u'%%fanout:{}%%'.format(path)
+
+def send(user_ids, subject, message_template=None, email_template=None,
+         context=None, user_fields=None, object=None, author=None,
+         message_type=SYSTEM_NOTIFICATION, check_user_preference=True,
+         fail_silently=False, progress_key=None):
+    """Send a notification to a list of users
+
+    Args:
+        user_ids: ids of the users to notify
+        subject: subject for the messages and emails
+        message_template: template for the Message content.  Messages are
+            only created for users with notify_by_message set.  Pass None to
+            skip creating messages.
+        email_template: template for the email body.  Pass None to skip
+            sending emails.
+        context: context dict shared by all users.  "user" gets added
+            automatically.
+        user_fields: dict mapping extra per-user context variables to
+            (method_name, args) tuples.  For each user, we call
+            getattr(user, method_name)(*args) to get the value.
+        object: object to link the messages to
+        author: User to set as the author of the messages
+        message_type: message_type for the Messages
+        check_user_preference: Only email users with notify_by_email set
+        fail_silently: Ignore errors when sending the emails
+        progress_key: jobprogress key to report progress with
+    """
+    if getattr(settings, "MESSAGES_DISABLED", False):
+        message_template = None
+    user_ids = list(user_ids)
+    if not user_ids or (message_template is None and email_template is None):
+        return
+    user_fields = user_fields or {}
+    context = dict(context or {})
+    context['user'] = Placeholder('user')
+    for name in user_fields:
+        context[name] = Placeholder(name)
+    context['domain'] = settings.HOSTNAME
+    context['url_base'] = "{}://{}".format(settings.DEFAULT_PROTOCOL,
+                                           settings.HOSTNAME)
+    if object is not None:
+        content_type_id = ContentType.objects.get_for_model(object).id
+        object_pk = unicode(object.pk)
+    else:
+        content_type_id = object_pk = None
+    notification = Notification(
+        subject=subject,
+        message=_render(message_template, context),
+        email=_render(email_template, context),
+        user_fields=user_fields,
+        content_type_id=content_type_id,
+        object_pk=object_pk,
+        author_id=author.id if author else None,
+        message_type=message_type,
+        check_user_preference=check_user_preference,
+        fail_silently=fail_silently)
+    deliver(notification, user_ids, progress_key)
+
+def _render(template_name, context):
+    if template_name is None:
+        return None
+    return render_to_string(template_name, context)
+
+@job
+def deliver(notification, user_ids, progress_key=None, done=0, total=None):
+    """Deliver a rendered notification
+
+    This handles the first JOB_SIZE users, then schedules another job for the
+    rest.
+    """
+    if total is None:
+        total = len(user_ids)
+    chunk, rest = user_ids[:JOB_SIZE], user_ids[JOB_SIZE:]
+    for i in range(0, len(chunk), BATCH_SIZE):
+        batch = chunk[i:i+BATCH_SIZE]
+        _deliver_batch(notification, batch)
+        done += len(batch)
+        if progress_key:
+            jobprogress.update(progress_key, done, total)
+    if rest:
+        deliver.delay(notification, rest, progress_key, done, total)
+    elif progress_key:
+        jobprogress.complete(progress_key)
+
+def _deliver_batch(notification, user_ids):
+    users = list(User.objects.filter(id__in=user_ids).order_by('id'))
+    if notification.message is not None:
+        _create_messages(notification, users)
+    if notification.email is not None:
+        _send_emails(notification, users)
+
+def _create_messages(notification, users):
+    messages = []
+    for user in users:
+        if not user.notify_by_message:
+            continue
+        message = Message(
+            user=user, subject=notification.subject,
+            content=substitute(notification.message, user,
+                               notification.user_fields),
+            content_type_id=notification.content_type_id,
+            object_pk=notification.object_pk,
+            author_id=notification.author_id,
+            message_type=notification.message_type)
+        message.auto_truncate_subject()
+        messages.append(message)
+    if messages:
+        Message.objects.bulk_create(messages)
+
+def _send_emails(notification, users):
+    emails = []
+    for user in users:
+        if not user.email:
+            continue
+        if notification.check_user_preference and not user.notify_by_email:
+            continue
+        email = EmailMessage(
+            notification.subject,
+            substitute(notification.email, user, notification.user_fields),
+            settings.DEFAULT_FROM_EMAIL, [user.email],
+            bcc=settings.EMAIL_BCC_LIST)
+        email.content_subtype = 'html'
+        emails.append(email)
+    if emails:
+        connection = get_connection(fail_silently=notification.fail_silently)
+        connection.send_messages(emails)
+
+def substitute(content, user, user_fields):
+    """Replace the placeholder tokens in rendered content for a user."""
+    if '%%fanout:' not in content:
+        return content
+    values = {}
+    for name, (method_name, args) in user_fields.items():
+        values[name] = getattr(user, method_name)(*args)
+    parts = content.split(u'%%fanout:')
+    output = [parts[0]]
+    for part in parts[1:]:
+        path, sep, rest = part.partition(u'%%')
+        output.append(conditional_escape(_lookup(path, user, values)))
+        output.append(rest)
+    return u''.join(output)
+
+def _lookup(path, user, values):
+    bits = path.split('.')
+    if bits[0] == 'user':
+        value = user
+    else:
+        value = values[bits[0]]
+    for bit in bits[1:]:
+        value = getattr(value, bit)
+        if callable(value):
+            value = value()
+    return value
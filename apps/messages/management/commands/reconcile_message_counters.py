@@ -0,0 +1,45 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from django.core.management.base import BaseCommand
+
+from auth.models import CustomUser as User
+from messages import counters
+
+class Command(BaseCommand):
+    help = u'Recalculate the denormalized message counters for users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', metavar='username',
+                            help='Users to check (default: all users)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Users to check per query')
+
+    def handle(self, *args, **options):
+        users = User.objects.all().order_by('id')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        user_ids = list(users.values_list('id', flat=True))
+        batch_size = options['batch_size']
+        fixed = 0
+        for i in range(0, len(user_ids), batch_size):
+            fixed += counters.reconcile(user_ids[i:i+batch_size])
+            self.stdout.write(u'\rChecked {}/{} users'.format(
+                min(i + batch_size, len(user_ids)), len(user_ids)))
+            self.stdout.flush()
+        self.stdout.write(u'\nFixed counters for {} users\n'.format(fixed))
@@ -86,9 +86,11 @@ class MessageManager(models.Manager):
         return self.get_queryset().filter(read=False)
 
     def bulk_create(self, object_list, **kwargs):
+        from messages import counters
         super(MessageManager, self).bulk_create(object_list, **kwargs)
-        for user_id in set(m.user_id for m in object_list):
-            User.cache.invalidate_by_pk(user_id)
+        # bulk_create() doesn't set the ids on MySQL, so we can't update the
+        # counters incrementally
+        counters.recalculate(set(m.user_id for m in object_list))
 
     def cleanup(self, days, message_type=None):
         messages_to_clean = self.get_queryset().filter(created__lte=datetime.datetime.now() - datetime.timedelta(days=days))
@@ -18,6 +18,7 @@
 
 from django.utils.translation import ugettext as _
 
+from messages import counters
 from messages.forms import SendMessageForm
 from messages.models import Message
 from messages.tasks import send_new_message_notification
@@ -59,16 +60,15 @@ class MessagesApiClass(object):
             return {'error': _('You should be authenticated.')}
         if not isinstance(message_ids, list):
             message_ids = [message_ids]
-        user.cache.invalidate()
         Message.objects.filter(pk__in=message_ids, user=user).update(read=True)
+        counters.recalculate([user.id])
         return {}
 
     def mark_all_read(self, user):
         if not user.is_authenticated():
             return {'error': _('You should be authenticated.')}
-        user.cache.invalidate()
-
         Message.objects.filter(user=user).update(read=True)
+        counters.recalculate([user.id])
 
         return {}
 
@@ -19,10 +19,18 @@
 from django.dispatch import receiver
 from django.db.models.signals import post_save, post_delete
 
-from auth.models import CustomUser as User
+from messages import counters
 from messages.models import Message
 
 @receiver(post_save, sender=Message)
+def on_message_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.message_created(instance)
+    else:
+        # The message could have been read or deleted for the user, just
+        # recalculate the counters
+        counters.recalculate([instance.user_id])
+
 @receiver(post_delete, sender=Message)
-def on_message_saved(sender, instance, **kwargs):
-    User.cache.invalidate_by_pk(instance.user_id)
+def on_message_deleted(sender, instance, **kwargs):
+    counters.message_deleted(instance)
@@ -37,6 +37,7 @@ from auth.models import CustomUser as User, UserLanguage
 from localeurl.utils import universal_url
 from teams.moderation_const import REVIEWED_AND_PUBLISHED, \
      REVIEWED_AND_PENDING_APPROVAL, REVIEWED_AND_SENT_BACK
+from messages import fanout
 from messages.models import Message, SYSTEM_NOTIFICATION
 from utils import send_templated_email
 from utils.taskqueue import job
@@ -103,31 +104,20 @@ def application_sent(application_pk):
         return False
     notifiable = TeamMember.objects.filter(team=application.team, user__is_active=True,
                  role__in=[TeamMember.ROLE_ADMIN, TeamMember.ROLE_OWNER])
-    for m in notifiable:
-
-        template_name = "messages/application-sent.txt"
-        context = {
-            "application": application,
-            "applicant": application.user,
-            "url_base": get_url_base(),
-            "team":application.team,
-            "note":application.note,
-            "user":m.user,
-        }
-        body = render_to_string(template_name,context)
-        subject  = fmt(
-            ugettext(u'%(user)s is applying for team %(team)s'),
-            user=application.user, team=application.team.name)
-        if m.user.notify_by_message:
-            msg = Message()
-            msg.message_type = 'S'
-            msg.subject = subject
-            msg.content = body
-            msg.user = m.user
-            msg.object = application.team
-            msg.author = application.user
-            msg.save()
-        send_templated_email(m.user, subject, "messages/email/application-sent-email.html", context)
+    context = {
+        "application": application,
+        "applicant": application.user,
+        "team":application.team,
+        "note":application.note,
+    }
+    subject  = fmt(
+        ugettext(u'%(user)s is applying for team %(team)s'),
+        user=application.user, team=application.team.name)
+    fanout.send(notifiable.values_list('user_id', flat=True), subject,
+                message_template="messages/application-sent.txt",
+                email_template="messages/email/application-sent-email.html",
+                context=context, object=application.team,
+                author=application.user)
     return True
 
 
@@ -178,28 +168,18 @@ def team_member_new(member_pk):
     # notify  admins and owners through messages
     notifiable = TeamMember.objects.filter(team=member.team, user__is_active=True,
        role__in=[TeamMember.ROLE_ADMIN, TeamMember.ROLE_OWNER]).exclude(pk=member.pk)
-    for m in notifiable:
-        context = {
-            "new_member": member.user,
-            "team":member.team,
-            "user":m.user,
-            "role":member.role,
-            "url_base":get_url_base(),
-        }
-        body = render_to_string("messages/team-new-member.txt",context)
-        subject = fmt(
-            ugettext("%(team)s team has a new member"),
-            team=member.team)
-        if m.user.notify_by_message:
-            msg = Message()
-            msg.message_type = 'S'
-            msg.subject = subject
-            msg.content = body
-            msg.user = m.user
-            msg.object = m.team
-            msg.save()
-        template_name = "messages/email/team-new-member.html"
-        send_templated_email(m.user, subject, template_name, context)
+    context = {
+        "new_member": member.user,
+        "team":member.team,
+        "role":member.role,
+    }
+    subject = fmt(
+        ugettext("%(team)s team has a new member"),
+        team=member.team)
+    fanout.send(notifiable.values_list('user_id', flat=True), subject,
+                message_template="messages/team-new-member.txt",
+                email_template="messages/email/team-new-member.html",
+                context=context, object=member.team)
 
     # does this team have a custom message for this?
     team_default_message = None
@@ -719,7 +699,6 @@ def send_video_comment_notification(comment_pk_or_instance, version_pk=None):
         video = ct.video
         language = ct
 
-    domain = settings.HOSTNAME
     protocol = getattr(settings, 'DEFAULT_PROTOCOL', 'https')
 
     if language:
@@ -745,56 +724,48 @@ def send_video_comment_notification(comment_pk_or_instance, version_pk=None):
         ugettext(u'%(user)s left a comment on the video %(title)s'),
         user=unicode(comment.user), title=video.title_display())
 
-    followers = set(video.notification_list(comment.user))
-
-    for user in followers:
-        send_templated_email(
-            user,
-            subject,
-            "messages/email/comment-notification.html",
-            {
-                "video": video,
-                "user": user,
-                "hash": user.hash_for_video(video.video_id),
-                "commenter": unicode(comment.user),
-                "commenter_url": comment.user.get_absolute_url(),
-                "version_url":version_url,
-                "language_url":language_url,
-                "domain":domain,
-                "version": version,
-                "body": comment.content,
-                "STATIC_URL": settings.STATIC_URL,
-            },
-            fail_silently=not settings.DEBUG)
-
+    followers = video.notification_list(comment.user)
+    fanout.send(
+        followers.values_list('id', flat=True), subject,
+        email_template="messages/email/comment-notification.html",
+        context={
+            "video": video,
+            "commenter": unicode(comment.user),
+            "commenter_url": comment.user.get_absolute_url(),
+            "version_url":version_url,
+            "language_url":language_url,
+            "version": version,
+            "body": comment.content,
+            "STATIC_URL": settings.STATIC_URL,
+        },
+        user_fields={
+            "hash": ("hash_for_video", (video.video_id,)),
+        },
+        fail_silently=not settings.DEBUG)
 
     if language:
         obj = language
-        object_pk = language.pk
-        content_type = ContentType.objects.get_for_model(language)
         exclude = [u for u in language.followers.filter(notify_by_message=False)]
         exclude.append(comment.user)
         message_followers = language.notification_list(exclude)
     else:
         obj = video
-        object_pk = video.pk
-        content_type = ContentType.objects.get_for_model(video)
         exclude = list(video.followers.filter(notify_by_message=False))
         exclude.append(comment.user)
         message_followers = video.notification_list(exclude)
 
-    for user in message_followers:
-        Message.objects.create(user=user, subject=subject, object_pk=object_pk,
-                               content_type=content_type, object=obj, message_type="S",
-                content=render_to_string('messages/new-comment.html', {
-                    "video": video,
-                    "language": language,
-                    "commenter": unicode(comment.user),
-                    "commenter_url": comment.user.get_absolute_url(),
-                    "version_url":version_url,
-                    "language_url":language_url,
-                    "domain":domain,
-                    "protocol": protocol,
-                    "version": version,
-                    "body": comment.content
-                }))
+    fanout.send(
+        message_followers.values_list('id', flat=True), subject,
+        message_template='messages/new-comment.html',
+        context={
+            "video": video,
+            "language": language,
+            "commenter": unicode(comment.user),
+            "commenter_url": comment.user.get_absolute_url(),
+            "version_url":version_url,
+            "language_url":language_url,
+            "protocol": protocol,
+            "version": version,
+            "body": comment.content
+        },
+        object=obj)
@@ -0,0 +1,132 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+import mock
+import pytest
+
+from auth.models import CustomUser as User
+from messages import counters
+from messages.models import Message
+from utils.factories import *
+
+@pytest.fixture
+def user():
+    return UserFactory(notify_by_message=True)
+
+def create_message(user, **kwargs):
+    message = Message(user=user, subject='test', content='test',
+                      message_type='S', **kwargs)
+    message.save()
+    return message
+
+def check_counters(user, count, latest):
+    user = User.objects.get(id=user.id)
+    assert (user.new_messages_count(), user.last_message_id()) == (
+        count, latest)
+    assert counters.calculate([user.id]) == {user.id: (count, latest)}
+
+def test_create(user):
+    check_counters(user, 0, 0)
+    m1 = create_message(user)
+    m2 = create_message(user)
+    check_counters(user, 2, m2.id)
+
+def test_create_read(user):
+    m1 = create_message(user, read=True)
+    check_counters(user, 0, m1.id)
+
+def test_create_without_notify_by_message():
+    user = UserFactory(notify_by_message=False)
+    m1 = create_message(user)
+    # Message.save() marks the message as read for these users
+    check_counters(user, 0, m1.id)
+
+def test_bulk_create(user):
+    other_user = UserFactory(notify_by_message=True)
+    Message.objects.bulk_create([
+        Message(user=user, subject='test', content='test', message_type='S'),
+        Message(user=user, subject='test', content='test', message_type='S'),
+        Message(user=other_user, subject='test', content='test',
+                message_type='S'),
+    ])
+    check_counters(user, 2, Message.objects.filter(user=user)[0].id)
+    check_counters(other_user, 1,
+                   Message.objects.filter(user=other_user)[0].id)
+
+def test_read(user):
+    m1 = create_message(user)
+    m2 = create_message(user)
+    m1.read = True
+    m1.save()
+    check_counters(user, 1, m2.id)
+
+def test_read_with_update(user):
+    m1 = create_message(user)
+    m2 = create_message(user)
+    Message.objects.filter(user=user).update(read=True)
+    counters.recalculate([user.id])
+    check_counters(user, 0, m2.id)
+
+def test_delete_for_user(user):
+    m1 = create_message(user)
+    m2 = create_message(user)
+    m2.delete_for_user(user)
+    check_counters(user, 1, m1.id)
+
+def test_delete(user):
+    m1 = create_message(user)
+    m2 = create_message(user)
+    m1.delete()
+    check_counters(user, 1, m2.id)
+    m2.delete()
+    check_counters(user, 0, 0)
+
+def test_hide(user):
+    m1 = create_message(user)
+    m2 = create_message(user)
+    user.set_last_hidden_message_id(mock.Mock(), m1.id)
+    check_counters(user, 1, m2.id)
+    user.set_last_hidden_message_id(mock.Mock(), m2.id)
+    check_counters(user, 0, m2.id)
+    m3 = create_message(user)
+    check_counters(user, 1, m3.id)
+
+def test_user_save_doesnt_overwrite_counters(user):
+    stale_user = User.objects.get(id=user.id)
+    m1 = create_message(user)
+    stale_user.first_name = 'New name'
+    stale_user.save()
+    check_counters(user, 1, m1.id)
+    assert User.objects.get(id=user.id).first_name == 'New name'
+
+def test_reads_dont_query_messages(user):
+    m1 = create_message(user)
+    user = User.objects.get(id=user.id)
+    with mock.patch.object(Message.objects, 'for_user') as for_user:
+        assert user.new_messages_count() == 1
+        assert user.last_message_id() == m1.id
+    assert not for_user.called
+
+def test_reconcile(user):
+    m1 = create_message(user)
+    other_user = UserFactory()
+    User.objects.filter(id=user.id).update(new_message_count=5,
+                                           latest_message_id=0)
+    assert counters.reconcile([user.id, other_user.id]) == 1
+    check_counters(user, 1, m1.id)
+    assert counters.reconcile([user.id, other_user.id]) == 0
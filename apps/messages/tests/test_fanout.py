@@ -0,0 +1,141 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from django.core import mail
+import mock
+import pytest
+
+from messages import fanout
+from messages.models import Message
+from utils.factories import *
+
+@pytest.fixture(autouse=True)
+def setup_settings(settings):
+    settings.DEFAULT_FROM_EMAIL = 'test@example.com'
+    settings.EMAIL_BCC_LIST = []
+
+def send(users, **kwargs):
+    kwargs.setdefault('message_template', 'tests/fanout-message.html')
+    kwargs.setdefault('email_template', 'tests/fanout-message.html')
+    kwargs.setdefault('context', {'team_name': 'Test & Team'})
+    fanout.send([u.id for u in users], 'Test subject', **kwargs)
+
+def correct_content(user, code=''):
+    return u'Hi {} ({}), code: {}, team: Test &amp; Team\n'.format(
+        user.username, user.id, code)
+
+def test_messages():
+    users = [UserFactory(notify_by_message=True) for i in range(3)]
+    send(users, email_template=None)
+    for user in users:
+        message = Message.objects.get(user=user)
+        assert message.subject == 'Test subject'
+        assert message.content == correct_content(user)
+        assert message.message_type == 'S'
+    assert mail.outbox == []
+
+def test_message_object_and_author():
+    user = UserFactory(notify_by_message=True)
+    author = UserFactory()
+    team = TeamFactory()
+    send([user], object=team, author=author)
+    message = Message.objects.get(user=user)
+    assert message.object == team
+    assert message.author == author
+
+def test_skip_users_without_notify_by_message():
+    user = UserFactory(notify_by_message=False)
+    send([user])
+    assert not Message.objects.filter(user=user).exists()
+
+def test_emails():
+    users = [UserFactory(notify_by_email=True) for i in range(3)]
+    send(users, message_template=None)
+    assert sorted(email.to for email in mail.outbox) == sorted(
+        [u.email] for u in users)
+    for email in mail.outbox:
+        user = [u for u in users if u.email == email.to[0]][0]
+        assert email.subject == 'Test subject'
+        assert email.body == correct_content(user)
+    assert not Message.objects.exists()
+
+def test_email_preferences():
+    users = [
+        UserFactory(notify_by_email=True),
+        UserFactory(notify_by_email=False),
+        UserFactory(notify_by_email=True, email=''),
+    ]
+    send(users, message_template=None)
+    assert [email.to for email in mail.outbox] == [[users[0].email]]
+    mail.outbox = []
+    send(users, message_template=None, check_user_preference=False)
+    assert sorted(email.to for email in mail.outbox) == sorted([
+        [users[0].email], [users[1].email],
+    ])
+
+def test_user_fields():
+    user = UserFactory(notify_by_message=True)
+    send([user], user_fields={'code': ('hash_for_video', ('abc',))})
+    code = user.hash_for_video('abc')
+    assert Message.objects.get(user=user).content == correct_content(
+        user, code)
+    assert mail.outbox[0].body == correct_content(user, code)
+
+def test_per_user_values_are_escaped():
+    user = UserFactory(username='<b>bold</b>', notify_by_message=True)
+    send([user])
+    assert '&lt;b&gt;bold&lt;/b&gt;' in Message.objects.get(user=user).content
+
+def test_templates_rendered_once():
+    users = [UserFactory() for i in range(5)]
+    with mock.patch('messages.fanout.render_to_string',
+                    wraps=fanout.render_to_string) as render_to_string:
+        send(users)
+    assert render_to_string.call_count == 2
+
+def test_one_connection_per_batch(monkeypatch):
+    monkeypatch.setattr(fanout, 'BATCH_SIZE', 2)
+    users = [UserFactory(notify_by_email=True) for i in range(5)]
+    with mock.patch('messages.fanout.get_connection',
+                    wraps=fanout.get_connection) as get_connection:
+        send(users, message_template=None)
+    assert get_connection.call_count == 3
+    assert len(mail.outbox) == 5
+
+def test_bulk_create_in_batches(monkeypatch):
+    monkeypatch.setattr(fanout, 'BATCH_SIZE', 2)
+    users = [UserFactory(notify_by_message=True) for i in range(5)]
+    with mock.patch.object(Message.objects, 'bulk_create',
+                           wraps=Message.objects.bulk_create) as bulk_create:
+        send(users, email_template=None)
+    assert bulk_create.call_count == 3
+    assert Message.objects.filter(user__in=users).count() == 5
+
+def test_split_into_jobs(monkeypatch):
+    monkeypatch.setattr(fanout, 'JOB_SIZE', 2)
+    users = [UserFactory(notify_by_message=True) for i in range(5)]
+    with mock.patch('messages.fanout.deliver.delay',
+                    wraps=fanout.deliver.delay) as delay, \
+            mock.patch('messages.fanout.jobprogress') as mock_jobprogress:
+        send(users, email_template=None, progress_key='test-fanout')
+    assert delay.call_count == 2
+    assert [c[0][1:] for c in mock_jobprogress.update.call_args_list] == [
+        (2, 5), (4, 5), (5, 5),
+    ]
+    assert mock_jobprogress.complete.call_args == mock.call('test-fanout')
+    assert Message.objects.filter(user__in=users).count() == 5
@@ -32,6 +32,7 @@ from django.db.models import Max
 
 from auth.models import CustomUser as User
 from auth.models import UserLanguage
+from messages import counters
 from messages.forms import SendMessageForm, NewMessageForm
 from messages.models import Message
 from messages.rpc import MessagesApiClass
@@ -72,6 +73,7 @@ def message(request, message_id):
             pass
 
     messages.filter(user=user).update(read=True)
+    counters.recalculate([user.id])
     
     extra_context = {
         'send_message_form': SendMessageForm(request.user, auto_id='message_form_id_%s'),
@@ -0,0 +1,302 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+"""notifications.delivery -- Deliver team notifications over HTTP
+
+Notifications for each team go into a per-team queue stored in redis.  A
+single deliver_notifications() job per team drains the queue, which means
+notifications are always sent in order.  The basic flow is:
+
+  - enqueue() pushes a notification onto the team's queue.  If there's no
+    job scheduled for the team, it schedules one.
+  - deliver_notifications() sends the notifications at the head of the queue.
+    For teams with TeamNotificationSettings.batch_size > 1, consecutive
+    notifications for the same endpoint get combined into a single POST like
+    this: {"notifications": [<notification1>, <notification2>, ...]}
+  - If there's a network error or a 5xx response, we leave the notifications
+    at the head of the queue and retry them later with exponential backoff.
+    After MAX_ATTEMPTS we give up and move on to the next notification.
+  - Other errors (invalid URLs, DB errors, etc.) aren't retried.  We record
+    the error and drop the notifications from the queue, so that they can't
+    block the notifications after them.
+  - Each job sends at most MAX_BATCHES_PER_JOB requests, then schedules a
+    new job for the rest of the queue.  This keeps the job within its
+    timeout, even when the endpoint is slow.
+
+Requests for each endpoint go through a shared requests.Session, so that we
+can re-use connections rather than opening a new one each time.
+"""
+
+import json
+import logging
+import urlparse
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from rq.timeouts import JobTimeoutException
+import requests
+
+from notifications.models import TeamNotification
+from utils.taskqueue import job
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+# Delay before the first retry, this doubles for each attempt after
+RETRY_DELAY = 60
+# How long we keep the scheduled flag before assuming that the job was lost
+SCHEDULED_TIMEOUT = 60 * 60 * 6
+POOL_SIZE = 4
+# Max number of requests to send in a single deliver_notifications() job
+MAX_BATCHES_PER_JOB = 5
+# Job timeout for deliver_notifications().  This needs to be long enough to
+# send MAX_BATCHES_PER_JOB requests, each of which can take up to
+# settings.NOTIFICATION_TIMEOUT plus the time to update the DB.
+JOB_TIMEOUT = MAX_BATCHES_PER_JOB * 60
+
+def queue_key(team_id):
+    return 'notifications-queue-{}'.format(team_id)
+
+def scheduled_key(team_id):
+    return 'notifications-scheduled-{}'.format(team_id)
+
+def _redis():
+    return get_redis_connection('storage')
+
+def enqueue(team_id, url, data, headers, auth_username, auth_password,
+            batch_size=1):
+    """Queue up a notification to be sent
+
+    Args:
+        team_id: PK of the Team this notification is for
+        url: URL to POST to
+        data: dict of primitive data to JSON-encode and send.  We will also
+            add the number field, which will store the number of the
+            associated TeamNotification.
+        headers: extra headers to add to the request
+        auth_username: authentication to send with the request
+        auth_password: authentication to send with the request
+        batch_size: max number of notifications to send in one request
+    """
+    entry = {
+        'url': url,
+        'data': data,
+        'headers': headers,
+        'auth_username': auth_username,
+        'auth_password': auth_password,
+        'batch_size': batch_size,
+        'notification_id': None,
+        'attempts': 0,
+    }
+    redis = _redis()
+    redis.rpush(queue_key(team_id), json.dumps(entry))
+    if _acquire_scheduled_flag(redis, team_id):
+        deliver_notifications.delay(team_id)
+
+def _acquire_scheduled_flag(redis, team_id):
+    return redis.set(scheduled_key(team_id), 1, nx=True,
+                     ex=SCHEDULED_TIMEOUT)
+
+@job(timeout=JOB_TIMEOUT)
+def deliver_notifications(team_id):
+    """Send the notifications queued up for a team
+
+    Only one of these jobs runs at once for each team, enqueue() ensures that
+    by setting the scheduled flag before scheduling it.
+    """
+    redis = _redis()
+    try:
+        _deliver_queued(redis, team_id)
+    except Exception:
+        # Clear the flag so that the next enqueue() schedules a new job
+        redis.delete(scheduled_key(team_id))
+        raise
+
+def _deliver_queued(redis, team_id):
+    key = queue_key(team_id)
+    batches_sent = 0
+    while True:
+        if batches_sent >= MAX_BATCHES_PER_JOB:
+            # Continue in a new job.  Leave the scheduled flag set, since
+            # we're scheduling it ourselves.
+            deliver_notifications.delay(team_id)
+            return
+        entries = _next_batch(redis, key)
+        if not entries:
+            redis.delete(scheduled_key(team_id))
+            # Check if enqueue() pushed a notification after we checked the
+            # queue, but before we deleted the flag
+            if redis.llen(key) and _acquire_scheduled_flag(redis, team_id):
+                continue
+            return
+        batches_sent += 1
+        try:
+            sent = _send_batch(redis, key, team_id, entries)
+        except JobTimeoutException:
+            # Let the worker handle this.  We don't know if the notifications
+            # were delivered, so leave them in the queue.
+            raise
+        except Exception:
+            logger.error("Error delivering notifications for team %s",
+                         team_id, exc_info=True)
+            _record_error(entries, "Error sending notification")
+            sent = True
+        if not sent:
+            # Try again later.  Leave the scheduled flag set so that
+            # enqueue() doesn't schedule another job in the meantime.
+            attempts = entries[0]['attempts']
+            deliver_notifications.enqueue_in(
+                RETRY_DELAY * 2 ** (attempts - 1), team_id)
+            return
+        redis.ltrim(key, len(entries), -1)
+
+def _next_batch(redis, key):
+    """Get the entries to send in the next request
+
+    This is the first entry in the queue, plus any entries right after it
+    that go to the same endpoint, up to the batch size.
+    """
+    head = redis.lindex(key, 0)
+    if head is None:
+        return []
+    head = json.loads(head)
+    batch = [head]
+    if head['batch_size'] > 1:
+        for value in redis.lrange(key, 1, head['batch_size'] - 1):
+            entry = json.loads(value)
+            if _endpoint(entry) != _endpoint(head):
+                break
+            batch.append(entry)
+    return batch
+
+def _endpoint(entry):
+    return (entry['url'], entry['headers'], entry['auth_username'],
+            entry['auth_password'])
+
+def _send_batch(redis, key, team_id, entries):
+    """Send an HTTP request for a list of queue entries
+
+    This function also handles creating the TeamNotification objects
+    associated with the request, the first time we try to send it.
+
+    Returns:
+        False if the request should be retried, True otherwise
+    """
+    notifications = [_get_notification(team_id, entry) for entry in entries]
+    head = entries[0]
+    for entry in entries:
+        entry['attempts'] += 1
+    # Save the notification ids and attempt counts before sending, so that
+    # we don't create new notifications if something goes wrong below
+    for i, entry in enumerate(entries):
+        redis.lset(key, i, json.dumps(entry))
+
+    post_data = []
+    for entry, notification in zip(entries, notifications):
+        data = entry['data'].copy()
+        data['number'] = notification.number
+        post_data.append(data)
+    if len(entries) == 1:
+        post_data = post_data[0]
+    else:
+        post_data = {'notifications': post_data}
+    headers = head['headers'].copy()
+    headers.update({
+        'Content-type': 'application/json',
+    })
+    if head['auth_username']:
+        auth = HTTPBasicAuth(head['auth_username'], head['auth_password'])
+    else:
+        auth = None
+
+    response_status = None
+    error_message = None
+    try:
+        response = get_session(head['url']).post(
+            head['url'], data=json.dumps(post_data), headers=headers,
+            auth=auth, timeout=settings.NOTIFICATION_TIMEOUT)
+    except requests.ConnectionError:
+        error_message = "Connection error"
+    except requests.Timeout:
+        error_message = "Request timeout"
+    except requests.TooManyRedirects:
+        error_message = "Too many redirects"
+    except requests.RequestException as e:
+        error_message = "Request error: {}".format(type(e).__name__)
+    else:
+        response_status = response.status_code
+        if response.status_code != 200:
+            error_message = 'Response status: {}'.format(
+                response.status_code)
+
+    retryable = (error_message in ("Connection error", "Request timeout") or
+                 (response_status is not None and response_status >= 500))
+    if retryable and head['attempts'] < MAX_ATTEMPTS:
+        logger.info("Notification delivery failed for team %s (%s), "
+                    "retrying", team_id, error_message)
+        return False
+    for notification in notifications:
+        notification.response_status = response_status
+        notification.error_message = error_message
+        notification.save()
+    return True
+
+def _record_error(entries, error_message):
+    notification_ids = [
+        entry['notification_id'] for entry in entries
+        if entry['notification_id'] is not None
+    ]
+    try:
+        (TeamNotification.objects.filter(id__in=notification_ids)
+         .update(error_message=error_message))
+    except Exception:
+        logger.error("Error recording notification error", exc_info=True)
+
+def _get_notification(team_id, entry):
+    if entry['notification_id'] is not None:
+        try:
+            return TeamNotification.objects.get(id=entry['notification_id'])
+        except TeamNotification.DoesNotExist:
+            # Probably pruned by prune_notification_history().  Send the
+            # notification anyways, but with a new number.
+            pass
+    notification = TeamNotification.create_new(team_id, entry['url'],
+                                               entry['data'])
+    entry['notification_id'] = notification.id
+    return notification
+
+# maps (scheme, host) to requests.Session objects
+_sessions = {}
+
+def get_session(url):
+    """Get a requests.Session to use for a URL
+
+    We keep one session per endpoint, for each process.  The session is
+    configured to keep up to POOL_SIZE connections open to the endpoint.
+    """
+    parsed = urlparse.urlparse(url)
+    endpoint = (parsed.scheme, parsed.netloc)
+    if endpoint not in _sessions:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _sessions[endpoint] = session
+    return _sessions[endpoint]
@@ -19,11 +19,8 @@
 import json
 import logging
 
-from requests.auth import HTTPBasicAuth
-import requests
-
-from notifications.models import TeamNotificationSettings, TeamNotification
-from utils.taskqueue import job
+from notifications import delivery
+from notifications.models import TeamNotificationSettings
 
 logger = logging.getLogger(__name__)
 
@@ -52,19 +49,22 @@ class NotificationHandlerBase(object):
         self.headers = notification_settings.get_headers()
         self.auth_username = notification_settings.auth_username
         self.auth_password = notification_settings.auth_password
+        self.batch_size = notification_settings.batch_size
 
     def send_notification(self, data):
         """Send an HTTP notification
 
-        This method queues up a HTTP POST request in the do_http_post() task.
+        This method adds a HTTP POST request to the team's delivery queue.
+        See notifications.delivery for details.
 
         Args:
             data -- array of primative data to be encoded as json.
-              do_http_post() will add the number field which corresponds to
-              the TeamNotification.number
+              The delivery code will add the number field which corresponds
+              to the TeamNotification.number
         """
-        do_http_post.delay(self.team.id, self.url, data, self.headers,
-                           self.auth_username, self.auth_password)
+        delivery.enqueue(self.team.id, self.url, data, self.headers,
+                         self.auth_username, self.auth_password,
+                         self.batch_size)
 
     def on_video_added(self, video, old_team):
         pass
@@ -103,52 +103,6 @@ class NotificationHandlerBase(object):
                           subtitles_language_code, status, extra):
         pass
 
-@job
-def do_http_post(team_id, url, data, headers, auth_username, auth_password):
-    """Handle the HTTP POST for a notifaction
-
-    This function also handles creating the TeamNotification object associated
-    with the request.  It operates inside a task so that the network call
-    doesn't block the web app process.
-
-    Args:
-        team_id: PK of the Team this notification is for
-        url: URL to POST to
-        data: array of primitive data to JSON-encode and send.  We will also
-            add the number field, which will store the number of the
-            associated TeamNotification.
-        headers: extra headers to add to the request
-        auth_username: authentication to send with the request
-        auth_password: authentication to send with the request
-    """
-    if auth_username:
-        auth = HTTPBasicAuth(auth_username, auth_password)
-    else:
-        auth = None
-    notification = TeamNotification.create_new(team_id, url, data)
-    post_data = data.copy()
-    post_data['number'] = notification.number
-    headers.update({
-        'Content-type': 'application/json',
-    })
-    status_code = None
-    error_message = None
-    try:
-        response = requests.post(url, data=json.dumps(post_data),
-                                 headers=headers, auth=auth)
-    except requests.ConnectionError:
-        notification.error_message = "Connection error"
-    except requests.Timeout:
-        notification.error_message = "Request timeout"
-    except requests.TooManyRedirects:
-        notification.error_message = "Too many redirects"
-    else:
-        notification.response_status = response.status_code
-        if response.status_code != 200:
-            notification.error_message = 'Response status: {}'.format(
-                response.status_code)
-    notification.save()
-
 # maps type strings to NotificationHandlerBase subclasses
 _registry = {}
 
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0018_team_daily_stats'),
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamNotificationCounter',
+            fields=[
+                ('team', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='teams.Team')),
+                ('last_number', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='teamnotificationsettings',
+            name='batch_size',
+            field=models.PositiveIntegerField(default=1, help_text='Max number of notifications to combine into a single request.  Use 1 to disable batching.'),
+        ),
+    ]
@@ -19,7 +19,7 @@
 import json
 
 from django.db import models, transaction, IntegrityError
-from django.db.models import Max
+from django.db.models import F, Max
 from django.utils.translation import ugettext_lazy as _, ugettext
 
 from utils import dates
@@ -37,6 +37,10 @@ class TeamNotificationSettings(models.Model):
     header1 = models.CharField(max_length=256, blank=True)
     header2 = models.CharField(max_length=256, blank=True)
     header3 = models.CharField(max_length=256, blank=True)
+    batch_size = models.PositiveIntegerField(
+        default=1, help_text=_('Max number of notifications to combine into '
+                               'a single request.  Use 1 to disable '
+                               'batching.'))
 
     class Meta:
         verbose_name_plural = 'Team notification settings'
@@ -77,36 +81,51 @@ class TeamNotification(models.Model):
             obj = cls(team=team, url=url, timestamp=dates.now())
         else:
             obj = cls(team_id=team, url=url, timestamp=dates.now())
-        obj.set_number()
-        # There is a potential race condition here where another thread also
-        # creates a TeamNotification and takes our number.  If that happens,
-        # then try with the next number.
-        for i in range(10):
-            try:
-                with transaction.atomic():
-                    data['number'] = obj.number
-                    obj.data = json.dumps(data)
-                    obj.save()
-                    return obj
-            except IntegrityError:
-                obj.number = obj.number + 1
-        raise IntegrityError("Couldn't find unused number")
-
-    def set_number(self):
-        self.number = TeamNotification.next_number_for_team(self.team)
+        with transaction.atomic():
+            obj.number = TeamNotificationCounter.next_number(obj.team_id)
+            data['number'] = obj.number
+            obj.data = json.dumps(data)
+            obj.save()
+        return obj
 
     def is_in_progress(self):
         return self.response_status is None and self.error_message is None
 
-    @classmethod
-    def next_number_for_team(cls, team):
-        qs = (cls.objects
-              .filter(team=team)
-              .aggregate(max_number=Max('number')))
-        max_number = qs['max_number']
-        return max_number + 1 if max_number is not None else 1
-
     class Meta:
         unique_together = [
             ('team', 'number'),
         ]
+
+class TeamNotificationCounter(models.Model):
+    """Tracks the last TeamNotification.number used for a team
+
+    Use next_number() to allocate numbers.  It increments the counter with a
+    single UPDATE, which locks the row until the transaction commits, so
+    concurrent callers always get unique numbers.
+    """
+    team = models.OneToOneField(Team, primary_key=True)
+    last_number = models.IntegerField(default=0)
+
+    @classmethod
+    def next_number(cls, team_id):
+        with transaction.atomic():
+            if not cls._increment(team_id):
+                # First notification since we started using the counter.
+                # Continue on from any existing notifications.
+                max_number = (TeamNotification.objects
+                              .filter(team_id=team_id)
+                              .aggregate(max_number=Max('number'))
+                              ['max_number'])
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(team_id=team_id,
+                                           last_number=(max_number or 0) + 1)
+                except IntegrityError:
+                    # Another thread created the counter first
+                    cls._increment(team_id)
+            return cls.objects.get(team_id=team_id).last_number
+
+    @classmethod
+    def _increment(cls, team_id):
+        return (cls.objects.filter(team_id=team_id)
+                .update(last_number=F('last_number') + 1))
@@ -52,6 +52,14 @@ def on_team_video_move(sender, destination_team, old_team, **kwargs):
     call_event_handler(destination_team, 'on_video_added', video, old_team)
     call_event_handler(old_team, 'on_video_removed', video, destination_team)
 
+@receiver(teams.signals.videos_moved_from_team_to_team)
+def on_team_videos_move(sender, moves, **kwargs):
+    for team_video, old_team in moves:
+        call_event_handler(sender, 'on_video_added', team_video.video,
+                           old_team)
+        call_event_handler(old_team, 'on_video_removed', team_video.video,
+                           sender)
+
 @receiver(teams.signals.video_moved_from_project_to_project)
 def on_team_video_moved_project(sender, old_project, new_project, **kwargs):
     video = sender.video
@@ -22,12 +22,16 @@ from django.db.models import Max
 from django.test import TestCase
 from nose.tools import *
 from requests.auth import HTTPBasicAuth
-from requests.exceptions import ConnectionError, Timeout, TooManyRedirects
+from requests.exceptions import (ConnectionError, MissingSchema, Timeout,
+                                 TooManyRedirects)
+from rq.timeouts import JobTimeoutException
 import json
 import mock
+from django_redis import get_redis_connection
 
-from notifications import handlers
-from notifications.models import TeamNotificationSettings, TeamNotification
+from notifications import delivery, handlers
+from notifications.models import (TeamNotificationSettings, TeamNotification,
+                                  TeamNotificationCounter)
 from notifications.tasks import REMOVE_AFTER, MIN_KEEP, prune_notification_history
 from subtitles import pipeline
 from subtitles.signals import subtitles_imported
@@ -275,24 +279,25 @@ class TeamNotificationTest(TestCase):
         assert_equal(make_notification().number, 2)
         assert_equal(make_notification().number, 3)
 
-    @patch_for_test('notifications.models.TeamNotification.next_number_for_team')
-    def test_notification_number_collision(self, next_number_for_team):
-        # Simulate a potential race condition where we create notifications in
-        # different threads.  We should still get unique, increasing,
-        # notification numbers and not get Integrity Errors
-        next_number_for_team.return_value = 1
+    def test_notification_number_continues_from_existing(self):
+        # Teams that had notifications before we added the counter should
+        # continue on from their highest number
         team = TeamFactory()
-        notification1 = TeamNotification.create_new(
-            team, 'http://example.com', {'foo': 'bar'})
-        # This next create_new() will try to save the same number as the
-        # first.  It should recover from the IntegrityError
-        notification2 = TeamNotification.create_new(
+        TeamNotification.objects.create(team=team, number=10, data='{}',
+                                        url='http://example.com',
+                                        timestamp=dates.now())
+        notification = TeamNotification.create_new(
             team, 'http://example.com', {'foo': 'bar'})
-        assert_equal(notification1.number, 1)
-        assert_equal(notification2.number, 2)
-        # check that the number is stored correctly in the data
-        assert_equal(json.loads(notification1.data)['number'], 1)
-        assert_equal(json.loads(notification2.data)['number'], 2)
+        assert_equal(notification.number, 11)
+        assert_equal(json.loads(notification.data)['number'], 11)
+
+    def test_notification_number_per_team(self):
+        team = TeamFactory()
+        team2 = TeamFactory()
+        TeamNotification.create_new(team, 'http://example.com', {})
+        TeamNotification.create_new(team, 'http://example.com', {})
+        assert_equal(TeamNotification.create_new(
+            team2, 'http://example.com', {}).number, 1)
 
 class TeamNotificationSettingsTest(TestCase):
     def test_get_headers(self):
@@ -315,21 +320,46 @@ class TestSendNotification(TestCase):
         handler = handlers.NotificationHandlerBase(settings)
         data = {'foo': 'bar'}
         handler.send_notification(data)
-        # Note: do_http_post gets replaced with a mock function for the
-        # unittests
-        assert_equal(handlers.do_http_post.delay.call_args,
-                     mock.call(team.id, settings.url, data,
-                               settings.get_headers(), settings.auth_username,
-                               settings.auth_password))
-
-class TestDoHTTPPost(TestCase):
+        assert_equal(delivery._next_batch(get_redis_connection('storage'),
+                                          delivery.queue_key(team.id)), [{
+            'url': settings.url,
+            'data': data,
+            'headers': settings.get_headers(),
+            'auth_username': settings.auth_username,
+            'auth_password': settings.auth_password,
+            'batch_size': 1,
+            'notification_id': None,
+            'attempts': 0,
+        }])
+        # Note: deliver_notifications gets replaced with a mock function for
+        # the unittests
+        assert_equal(delivery.deliver_notifications.delay.call_args,
+                     mock.call(team.id))
+
+    def test_one_job_per_team(self):
+        team = TeamFactory()
+        for i in range(3):
+            delivery.enqueue(team.id, 'http://example.com/', {}, {}, '', '')
+        assert_equal(delivery.deliver_notifications.delay.call_count, 1)
+
+class TestDeliverNotifications(TestCase):
     def setUp(self):
         self.team = TeamFactory()
         self.data = {'foo': 'bar'}
         self.url = 'http://example.com/notifications/'
-        handlers.do_http_post.run_original_for_test()
+        delivery.deliver_notifications.run_original_for_test()
         self.now = dates.now.freeze()
 
+    def enqueue(self, data=None, headers=None, auth_username='',
+                auth_password='', batch_size=1):
+        delivery.enqueue(self.team.id, self.url,
+                         data if data is not None else self.data,
+                         headers or {}, auth_username, auth_password,
+                         batch_size)
+
+    def deliver(self):
+        delivery.deliver_notifications(self.team.id)
+
     def check_notification(self, status_code, error_message=None):
         notification = TeamNotification.objects.get(team=self.team)
         assert_equal(notification.team, self.team)
@@ -344,11 +374,16 @@ class TestDoHTTPPost(TestCase):
         correct_data['number'] = notification.number
         assert_equal(json.loads(notification.data), correct_data)
 
-    def calc_post_data(self):
-        post_data = self.data.copy()
-        post_data['number'] = TeamNotification.next_number_for_team(self.team)
+    def calc_post_data(self, number=1, data=None):
+        post_data = (data or self.data).copy()
+        post_data['number'] = number
         return json.dumps(post_data)
 
+    def check_queue_empty(self):
+        redis = get_redis_connection('storage')
+        assert_equal(redis.llen(delivery.queue_key(self.team.id)), 0)
+        assert_false(redis.exists(delivery.scheduled_key(self.team.id)))
+
     def test_http_request(self):
         mocker = RequestsMocker()
         mocker.expect_request(
@@ -359,27 +394,131 @@ class TestDoHTTPPost(TestCase):
             },
             auth=HTTPBasicAuth('alice', '1234'),
         )
+        self.enqueue(headers={'extra-header': '123'},
+                     auth_username='alice', auth_password='1234')
         with mocker:
-            handlers.do_http_post(self.team.id, self.url, self.data,
-                                  {'extra-header': '123'}, 'alice', '1234')
+            self.deliver()
         self.check_notification(200)
+        self.check_queue_empty()
+
+    def test_sent_in_order(self):
+        mocker = RequestsMocker()
+        for i in range(1, 4):
+            mocker.expect_request(
+                'post', self.url, data=self.calc_post_data(i, {'i': i}),
+                headers={'Content-type': 'application/json'})
+            self.enqueue(data={'i': i})
+        with mocker:
+            self.deliver()
+        assert_equal(
+            list(TeamNotification.objects.order_by('number')
+                 .values_list('number', 'response_status')),
+            [(1, 200), (2, 200), (3, 200)])
+        self.check_queue_empty()
+
+    def test_batching(self):
+        mocker = RequestsMocker()
+        mocker.expect_request(
+            'post', self.url, data=json.dumps({
+                'notifications': [
+                    {'i': 1, 'number': 1},
+                    {'i': 2, 'number': 2},
+                ],
+            }),
+            headers={'Content-type': 'application/json'})
+        mocker.expect_request(
+            'post', self.url, data=self.calc_post_data(3, {'i': 3}),
+            headers={'Content-type': 'application/json'})
+        for i in range(1, 4):
+            self.enqueue(data={'i': i}, batch_size=2)
+        with mocker:
+            self.deliver()
+        assert_equal(
+            list(TeamNotification.objects.values_list('number',
+                                                      'response_status')),
+            [(1, 200), (2, 200), (3, 200)])
+        self.check_queue_empty()
 
     def test_status_code_error(self):
         mocker = RequestsMocker()
         mocker.expect_request(
             'post', self.url, data=self.calc_post_data(),
             headers={'Content-type': 'application/json'},
-            status_code=500,
+            status_code=404,
         )
+        self.enqueue()
         with mocker:
-            handlers.do_http_post(self.team.id, self.url, self.data, {}, '', '')
-        self.check_notification(500, "Response status: 500")
+            self.deliver()
+        self.check_notification(404, "Response status: 404")
+        self.check_queue_empty()
 
     def test_network_errors(self):
-        self.check_network_error(ConnectionError(), 'Connection error')
-        self.check_network_error(Timeout(), 'Request timeout')
         self.check_network_error(TooManyRedirects(), 'Too many redirects')
 
+    def test_other_request_errors(self):
+        # Other request errors, like invalid URLs, shouldn't be retried
+        self.check_network_error(MissingSchema(),
+                                 'Request error: MissingSchema')
+
+    def test_unexpected_error(self):
+        # Unexpected errors shouldn't leave the notification at the head of
+        # the queue, where it would block the notifications after it
+        mocker = RequestsMocker()
+        mocker.expect_request(
+            'post', self.url, data=self.calc_post_data(1, {'i': 1}),
+            headers={'Content-type': 'application/json'},
+            error=ValueError(),
+        )
+        mocker.expect_request(
+            'post', self.url, data=self.calc_post_data(2, {'i': 2}),
+            headers={'Content-type': 'application/json'})
+        self.enqueue(data={'i': 1})
+        self.enqueue(data={'i': 2})
+        with mocker:
+            self.deliver()
+        assert_equal(
+            list(TeamNotification.objects.order_by('number').values_list(
+                'number', 'response_status', 'error_message')),
+            [(1, None, 'Error sending notification'), (2, 200, None)])
+        self.check_queue_empty()
+
+    def test_max_batches_per_job(self):
+        # After MAX_BATCHES_PER_JOB requests, we should schedule a new job
+        # for the rest of the queue
+        mocker = RequestsMocker()
+        for i in range(1, 3):
+            mocker.expect_request(
+                'post', self.url, data=self.calc_post_data(i, {'i': i}),
+                headers={'Content-type': 'application/json'})
+        for i in range(1, 4):
+            self.enqueue(data={'i': i})
+        delay = delivery.deliver_notifications.delay
+        delay.reset_mock()
+        with mock.patch('notifications.delivery.MAX_BATCHES_PER_JOB', 2):
+            with mocker:
+                self.deliver()
+        assert_equal(delay.call_args_list, [mock.call(self.team.id)])
+        redis = get_redis_connection('storage')
+        assert_equal(redis.llen(delivery.queue_key(self.team.id)), 1)
+        assert_true(redis.exists(delivery.scheduled_key(self.team.id)))
+
+    def test_job_timeout(self):
+        # If the job times out, we should leave the notification in the queue
+        # rather than recording an error for it
+        mocker = RequestsMocker()
+        mocker.expect_request(
+            'post', self.url, data=self.calc_post_data(),
+            headers={'Content-type': 'application/json'},
+            error=JobTimeoutException(),
+        )
+        self.enqueue()
+        with mocker:
+            with assert_raises(JobTimeoutException):
+                self.deliver()
+        assert_true(TeamNotification.objects.get().is_in_progress())
+        redis = get_redis_connection('storage')
+        assert_equal(redis.llen(delivery.queue_key(self.team.id)), 1)
+
     def check_network_error(self, exception, error_message):
         mocker = RequestsMocker()
         mocker.expect_request(
@@ -387,11 +526,48 @@ class TestDoHTTPPost(TestCase):
             headers={'Content-type': 'application/json'},
             error=exception,
         )
+        self.enqueue()
         with mocker:
-            handlers.do_http_post(self.team.id, self.url, self.data, {}, '',
-                                  '')
+            self.deliver()
         self.check_notification(None, error_message)
+        self.check_queue_empty()
+
+    def test_retry(self):
+        self.check_retry(ConnectionError(), None, 'Connection error')
+        TeamNotification.objects.all().delete()
+        self.check_retry(Timeout(), None, 'Request timeout')
         TeamNotification.objects.all().delete()
+        self.check_retry(None, 500, 'Response status: 500')
+
+    def check_retry(self, exception, status_code, error_message):
+        self.enqueue()
+        enqueue_in = delivery.deliver_notifications.enqueue_in
+        enqueue_in.reset_mock()
+        for attempt in range(1, delivery.MAX_ATTEMPTS + 1):
+            mocker = RequestsMocker()
+            # The number should stay the same for each attempt
+            mocker.expect_request(
+                'post', self.url, data=self.calc_post_data(),
+                headers={'Content-type': 'application/json'},
+                error=exception, status_code=status_code or 200,
+            )
+            with mocker:
+                self.deliver()
+            if attempt < delivery.MAX_ATTEMPTS:
+                assert_equal(enqueue_in.call_args, mock.call(
+                    delivery.RETRY_DELAY * 2 ** (attempt - 1), self.team.id))
+                assert_true(TeamNotification.objects.get().is_in_progress())
+        # After the last attempt we should give up
+        assert_equal(enqueue_in.call_count, delivery.MAX_ATTEMPTS - 1)
+        self.check_notification(status_code, error_message)
+        self.check_queue_empty()
+        TeamNotificationCounter.objects.all().delete()
+
+    def test_pooled_session(self):
+        assert_is(delivery.get_session('http://example.com/foo'),
+                  delivery.get_session('http://example.com/bar'))
+        assert_is_not(delivery.get_session('http://example.com/foo'),
+                      delivery.get_session('http://example.org/foo'))
 
 @mock.patch('notifications.tasks.MIN_KEEP', 100)
 @mock.patch('notifications.tasks.REMOVE_AFTER', 15)
@@ -25,6 +25,8 @@ Staff pages aren't auto-generated like the django admin pages.  All the staff
 app does is serve up an index page that links to pages created by other apps.
 """
 
+default_app_config = 'staff.apps.StaffConfig'
+
 import collections
 
 from django.urls import reverse
@@ -22,4 +22,5 @@ from staff import views
 
 urlpatterns = [
     url(r'^$', views.index, name='index'),
+    url(r'^job-metrics/$', views.job_metrics, name='job-metrics'),
 ]
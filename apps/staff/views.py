@@ -19,6 +19,7 @@
 from utils.decorators import staff_member_required
 from django.shortcuts import render
 
+from utils import jobmetrics
 import staff
 
 @staff_member_required
@@ -26,3 +27,29 @@ def index(request):
     return render(request, 'staff/index.html', {
         'sections': staff.get_sections(),
     })
+
+@staff_member_required
+def job_metrics(request):
+    try:
+        hours = int(request.GET.get('hours', 24))
+    except ValueError:
+        hours = 24
+    rows = []
+    for report in jobmetrics.get_report(hours):
+        rows.append({
+            'name': report.name,
+            'runs': report.successes + report.failures,
+            'failures': report.failures,
+            'latency': [report.latency.format_percentile(p, 's')
+                        for p in jobmetrics.PERCENTILES],
+            'runtime': [report.runtime.format_percentile(p, 's')
+                        for p in jobmetrics.PERCENTILES],
+            'queries': [report.queries.format_percentile(p)
+                        for p in jobmetrics.PERCENTILES],
+        })
+    return render(request, 'staff/job-metrics.html', {
+        'hours': hours,
+        'percentiles': jobmetrics.PERCENTILES,
+        'queue_depths': jobmetrics.queue_depths(),
+        'rows': rows,
+    })
@@ -0,0 +1,172 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+"""staticmedia.build -- Build static media ahead of time
+
+build() creates the build directory that staticmedia.manifest serves from.  It
+builds all media bundles, plus the JS i18n catalog and JS language data for
+each locale.  Building a bundle mostly means waiting for uglifyjs/sass/r.js,
+so we build them in parallel using a thread pool.
+"""
+
+from cStringIO import StringIO
+import functools
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.utils.translation import activate, deactivate
+
+from staticmedia import bundles
+from staticmedia import manifest
+from staticmedia.jsi18ncompat import (get_javascript_catalog,
+                                      render_javascript_catalog)
+from staticmedia.jslanguagedata import render_js_language_script
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+HASH_LENGTH = 16
+
+def build(build_dir, locales=None, threads=4, log=None):
+    """Build static media into a directory
+
+    Args:
+        build_dir: directory to write the files to
+        locales: locales to build JS catalogs and language data for.  By
+            default we build them for each locale that has a djangojs
+            catalog.
+        threads: number of files to build at once
+        log: function to call with a message for each file we build
+
+    Returns:
+        manifest data, which also gets written to manifest.json inside
+        build_dir
+    """
+    if locales is None:
+        locales = all_locales()
+    jobs = []
+    for bundle_name in sorted(settings.MEDIA_BUNDLES.keys()):
+        bundle = bundles.get_bundle(bundle_name)
+        jobs.append(('{}/{}'.format(bundle.bundle_type, bundle.name),
+                     bundle.mime_type, bundle.build_contents))
+    for locale in locales:
+        jobs.append(('jsi18catalog/{}.js'.format(locale),
+                     'application/javascript',
+                     functools.partial(render_js_catalog, locale)))
+        jobs.append(('jslanguagedata/{}.js'.format(locale),
+                     'application/javascript',
+                     functools.partial(render_js_language_data, locale)))
+
+    def run_job(job):
+        name, mime_type, build_func = job
+        if log:
+            log(name)
+        return name, write_file(build_dir, name, mime_type, build_func())
+
+    pool = ThreadPool(threads)
+    try:
+        entries = pool.map(run_job, jobs)
+    finally:
+        pool.close()
+        pool.join()
+    manifest_data = {
+        'files': dict(entries),
+    }
+    _write_atomic(os.path.join(build_dir, manifest.MANIFEST_FILENAME),
+                  json.dumps(manifest_data, indent=2, sort_keys=True))
+    return manifest_data
+
+def all_locales():
+    """Get all locales that have a djangojs catalog."""
+    locale_dir = os.path.join(settings.PROJECT_ROOT, 'locale')
+    return [
+        child for child in sorted(os.listdir(locale_dir))
+        if os.path.exists(os.path.join(locale_dir, child,
+                                       'LC_MESSAGES/djangojs.mo'))
+    ]
+
+def render_js_catalog(locale):
+    activate(locale)
+    try:
+        catalog, plural = get_javascript_catalog(locale, 'djangojs', [])
+        return render_javascript_catalog(catalog, plural).content
+    finally:
+        deactivate()
+
+def render_js_language_data(locale):
+    activate(locale)
+    try:
+        return render_js_language_script()
+    finally:
+        deactivate()
+
+def write_file(build_dir, name, mime_type, content):
+    """Write a built file and its compressed variants
+
+    Returns:
+        manifest entry for the file
+    """
+    if isinstance(content, unicode):
+        content = content.encode('utf-8')
+    content_hash = hashlib.sha1(content).hexdigest()[:HASH_LENGTH]
+    basename, ext = os.path.splitext(name)
+    path = '{}.{}{}'.format(basename, content_hash, ext)
+    full_path = os.path.join(build_dir, path)
+    _write_atomic(full_path, content)
+    encodings = ['gzip']
+    _write_atomic(full_path + '.gz', gzip_compress(content))
+    if brotli is not None:
+        encodings.append('br')
+        _write_atomic(full_path + '.br', brotli.compress(content))
+    return {
+        'path': path,
+        'mime_type': mime_type,
+        'hash': content_hash,
+        'encodings': encodings,
+    }
+
+def gzip_compress(content):
+    zbuf = StringIO()
+    # Set mtime so that the output only depends on the content
+    zfile = gzip.GzipFile(mode='wb', compresslevel=9, fileobj=zbuf, mtime=0)
+    zfile.write(content)
+    zfile.close()
+    return zbuf.getvalue()
+
+def _write_atomic(path, content):
+    dirname = os.path.dirname(path)
+    if not os.path.exists(dirname):
+        try:
+            os.makedirs(dirname)
+        except OSError:
+            # Probably another thread created the directory
+            pass
+    # Write to a temp file, then rename it so that readers never see a
+    # partially written file
+    fd, tmp_path = tempfile.mkstemp(dir=dirname)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    os.chmod(tmp_path, 0o644)
+    os.rename(tmp_path, path)
@@ -26,6 +26,10 @@ the files does several things.
     - Optionally processes them through a preprocessor like SASS
 
 See the bundle_* functions for exactly what we do for various media types.
+
+Production servers serve bundles that were built ahead of time by the
+build_media command (see staticmedia.manifest).  get_contents() is only used
+for development servers, where STATIC_MEDIA_BUILD_DIR isn't set.
 """
 
 import json
@@ -39,6 +43,7 @@ from django.core.cache import cache
 from django.urls import reverse
 from django.template.loader import render_to_string
 
+from staticmedia import manifest
 from staticmedia import utils
 import optionalapps
 
@@ -84,7 +89,9 @@ class Bundle(object):
 
     def get_url(self):
         """Get an URL that points to this bundle."""
-        if settings.STATIC_MEDIA_USES_S3:
+        if manifest.enabled():
+            return manifest.url(self.manifest_name())
+        elif settings.STATIC_MEDIA_USES_S3:
             return self.get_s3_url()
         else:
             return self.get_local_server_url()
@@ -92,6 +99,9 @@ class Bundle(object):
     def get_s3_url(self):
         return "%s%s/%s" % (utils.static_url(), self.bundle_type, self.name)
 
+    def manifest_name(self):
+        return '%s/%s' % (self.bundle_type, self.name)
+
     def get_local_server_url(self):
         view_name = 'staticmedia:%s_bundle' % self.bundle_type
         return reverse(view_name, kwargs={
@@ -284,13 +294,14 @@ class RequireJSBundle(Bundle):
             ])
 
     def get_html(self):
-        if settings.STATIC_MEDIA_USES_S3:
-            return self.get_html_s3()
+        if settings.STATIC_MEDIA_USES_S3 or manifest.enabled():
+            return self.get_html_built()
         else:
             return self.get_html_local_server()
 
-    def get_html_s3(self):
-        return '<script async src="{}"></script>'.format(self.get_s3_url())
+    def get_html_built(self):
+        """HTML for the bundle built by r.js"""
+        return '<script async src="{}"></script>'.format(self.get_url())
 
     def get_html_local_server(self):
         """HTML for a local dev server."""
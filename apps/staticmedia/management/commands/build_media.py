@@ -0,0 +1,49 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from staticmedia import build
+
+class Command(BaseCommand):
+    help = """Build static media ahead of time (see staticmedia.build)"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('build_dir', nargs='?',
+                            help="Directory to build into (default: "
+                            "settings.STATIC_MEDIA_BUILD_DIR)")
+        parser.add_argument('--threads', dest='threads', type=int,
+                            default=4, help="Number of files to build at once")
+
+    def handle(self, *args, **options):
+        build_dir = options['build_dir'] or settings.STATIC_MEDIA_BUILD_DIR
+        if not build_dir:
+            raise CommandError("No build directory given and "
+                               "STATIC_MEDIA_BUILD_DIR is not set")
+        if not os.path.exists(build_dir):
+            os.makedirs(build_dir)
+        manifest_data = build.build(build_dir, threads=options['threads'],
+                                    log=self.log_file)
+        self.stdout.write("built {} files in {}\n".format(
+            len(manifest_data['files']), build_dir))
+
+    def log_file(self, name):
+        self.stdout.write("building %s\n" % name)
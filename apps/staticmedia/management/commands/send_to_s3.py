@@ -16,26 +16,23 @@
 # along with this program.  If not, see
 # http://www.gnu.org/licenses/agpl-3.0.html.
 
-from cStringIO import StringIO
 import datetime
 import email
-import gzip
 import mimetypes
+import shutil
+import tempfile
 import time
 import os
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.utils.translation import to_locale, activate
 import boto3
 
 from deploy.git_helpers import get_current_commit_hash
-from staticmedia import bundles
+from staticmedia import build
+from staticmedia import manifest
 from staticmedia import oldembedder
 from staticmedia import utils
-from staticmedia.jsi18ncompat import (get_javascript_catalog,
-                                      render_javascript_catalog)
-from staticmedia.jslanguagedata import render_js_language_script
 
 class Command(BaseCommand):
     help = """Upload static media to S3 """
@@ -46,20 +43,27 @@ class Command(BaseCommand):
                             help="Don't check the git commit in commit.py")
         parser.add_argument('--no-gzip', dest='gzip', action='store_false',
                             default=True, help="Don't gzip files")
+        parser.add_argument('--build-dir', dest='build_dir', default=None,
+                            help="Upload the media from a directory created "
+                            "by build_media rather than building it")
+        parser.add_argument('--threads', dest='threads', type=int,
+                            default=4, help="Number of files to build at once")
 
     def handle(self, *args, **options):
         self.options = options
         self.setup_s3_subdir()
         self.setup_connection()
         self.copy_experimental_editor()
-        self.build_bundles()
-        self.upload_bundles()
+        self.build_media()
+        try:
+            self.upload_built_media()
+        finally:
+            if self.options['build_dir'] is None:
+                shutil.rmtree(self.build_dir)
         self.upload_static_dir('images')
         self.upload_static_dir('fonts')
         self.upload_static_dir('flowplayer')
         self.upload_app_static_media()
-        self.upload_js_catalogs()
-        self.upload_js_language_data()
         self.upload_old_embedder()
 
     def setup_s3_subdir(self):
@@ -87,22 +91,34 @@ class Command(BaseCommand):
             url_base = "http:" + url_base
         self.stdout.write("-> %s%s\n" % (url_base, key))
 
-    def build_bundles(self):
-        self.built_bundles = []
-        for bundle_name in settings.MEDIA_BUNDLES.keys():
-            bundle = bundles.get_bundle(bundle_name)
-            self.stdout.write("building %s\n" % bundle_name)
-            self.built_bundles.append((bundle, bundle.build_contents()))
+    def build_media(self):
+        if self.options['build_dir'] is not None:
+            self.build_dir = self.options['build_dir']
+            self.manifest_data = manifest.read(self.build_dir)
+        else:
+            self.build_dir = tempfile.mkdtemp()
+            self.manifest_data = build.build(
+                self.build_dir, threads=self.options['threads'],
+                log=lambda name: self.stdout.write("building %s\n" % name))
 
         self.stdout.write("building old embedder\n")
         self.old_embedder_js_code = oldembedder.js_code()
 
-    def upload_bundles(self):
-        for bundle, contents in self.built_bundles:
-            settings = self.cache_forever_settings()
-            settings['ContentType'] = bundle.mime_type
-            upload_path = '%s/%s' % (bundle.bundle_type, bundle.name)
-            self.upload_string(upload_path, contents, settings)
+    def upload_built_media(self):
+        """Upload the bundles, JS catalogs and JS language data
+
+        We upload each file to both its built name, which includes a content
+        hash, and its regular name.  Pages rendered with the manifest link to
+        the built name, other clients can still use the regular one.
+        """
+        for name, entry in sorted(self.manifest_data['files'].items()):
+            path = os.path.join(self.build_dir, entry['path'])
+            with open(path, 'rb') as f:
+                contents = f.read()
+            for upload_path in (entry['path'], name):
+                settings = self.cache_forever_settings()
+                settings['ContentType'] = entry['mime_type']
+                self.upload_string(upload_path, contents, settings)
 
     def upload_static_dir(self, subdir):
         directory = os.path.join(settings.STATIC_ROOT, subdir)
@@ -126,13 +142,6 @@ class Command(BaseCommand):
         return (content_type.startswith('text/') or
                 content_type == 'application/javascript')
 
-    def compress_string(self, data):
-        zbuf = StringIO()
-        zfile = gzip.GzipFile(mode='wb', compresslevel=6, fileobj=zbuf)
-        zfile.write(data)
-        zfile.close()
-        return zbuf.getvalue()
-
     def upload_old_embedder(self):
         # the old embedder is a little different the the others, since we put
         # it in the root directory of our s3 bucket.  This means that we can't
@@ -143,36 +152,11 @@ class Command(BaseCommand):
                            self.no_cache_settings(),
                            store_in_s3_subdirectory=False)
 
-    def upload_js_catalogs(self):
-        settings = self.cache_forever_settings()
-        settings['ContentType'] = 'application/javascript'
-        for locale in self.all_locales():
-            filename = "jsi18catalog/{}.js".format(locale)
-            activate(locale)
-            catalog, plural = get_javascript_catalog(locale, 'djangojs', [])
-            response = render_javascript_catalog(catalog, plural)
-            self.upload_string(filename, response.content, settings)
-
-    def upload_js_language_data(self):
-        settings = self.cache_forever_settings()
-        settings['ContentType'] = 'application/javascript'
-        for locale in self.all_locales():
-            activate(locale)
-            filename = "jslanguagedata/{}.js".format(locale)
-            self.upload_string(filename, render_js_language_script(), settings)
-
-    def all_locales(self):
-        locale_dir = os.path.join(settings.PROJECT_ROOT, 'locale')
-        for child in os.listdir(locale_dir):
-            if os.path.exists(os.path.join(
-                    locale_dir, child, 'LC_MESSAGES/djangojs.mo')):
-                yield child
-
     def upload_string(self, filename, content, settings,
                       store_in_s3_subdirectory=True):
         content_type = settings.get('ContentType', 'application/unknown')
         if self.should_gzip(content_type):
-            content = self.compress_string(content)
+            content = build.gzip_compress(content)
             settings['ContentEncoding'] = 'gzip'
 
         if store_in_s3_subdirectory:
@@ -0,0 +1,155 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+"""staticmedia.manifest -- Serve prebuilt static media
+
+Building media bundles means running uglifyjs/sass, which is much too slow to
+do while handling a request.  The build_media command (see staticmedia.build)
+builds everything ahead of time into settings.STATIC_MEDIA_BUILD_DIR:
+
+  - Each file gets written to a name that includes a hash of its contents
+    (for example js/site.<hash>.js).  These files never change, so clients
+    can cache them forever.
+  - Next to each file there's a gzip (.gz) and brotli (.br) compressed
+    variant.
+  - manifest.json maps the regular names (js/site.js) to the built files.
+
+If STATIC_MEDIA_BUILD_DIR is set, the staticmedia views and template tags
+only use the manifest.  We read it once per process, so the server needs to
+be restarted after a new build.  If STATIC_MEDIA_BUILD_DIR is not set (the
+default for development), bundles get built on demand by
+Bundle.get_contents().
+"""
+
+import json
+import os
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+from staticmedia import utils
+
+MANIFEST_FILENAME = 'manifest.json'
+# Maps Content-Encoding values to the suffix for the compressed variants, in
+# the order that we prefer them
+ENCODINGS = [
+    ('br', '.br'),
+    ('gzip', '.gz'),
+]
+CACHE_FOREVER_TIMEOUT = 3600 * 24 * 365
+
+# maps build directories to (entries, entries_by_path) tuples
+_manifests = {}
+
+def enabled():
+    """Should we serve static media from the manifest?"""
+    return bool(settings.STATIC_MEDIA_BUILD_DIR)
+
+def read(build_dir):
+    """Read the manifest data from a build directory."""
+    with open(os.path.join(build_dir, MANIFEST_FILENAME)) as f:
+        return json.load(f)
+
+def _load():
+    build_dir = settings.STATIC_MEDIA_BUILD_DIR
+    if build_dir not in _manifests:
+        entries = read(build_dir)['files']
+        entries_by_path = {
+            entry['path']: entry for entry in entries.values()
+        }
+        _manifests[build_dir] = (entries, entries_by_path)
+    return _manifests[build_dir]
+
+def lookup(name):
+    """Get the manifest entry for a file
+
+    Args:
+        name: regular name (js/site.js) or built name (js/site.<hash>.js)
+
+    Returns:
+        dict with these keys, or None if the file isn't in the manifest:
+          - path: built name, relative to the build directory
+          - mime_type: content type to serve the file with
+          - hash: hash of the file contents
+          - encodings: list of compressed variants that we built
+    """
+    entries, entries_by_path = _load()
+    if name in entries:
+        return entries[name]
+    return entries_by_path.get(name)
+
+def url(name):
+    """Get the URL for a file in the manifest
+
+    If the file isn't in the manifest, we return the URL for the regular
+    name.
+    """
+    entry = lookup(name)
+    if entry is None:
+        return utils.static_url() + name
+    return utils.static_url() + entry['path']
+
+def serve(request, name):
+    """Serve a file from the build directory
+
+    Requests for the built name get far-future cache headers.  Requests for
+    the regular name get the same content, but clients need to revalidate
+    them since the content changes with each build.
+    """
+    entry = lookup(name)
+    if entry is None:
+        raise Http404()
+    encoding, suffix = _choose_encoding(request, entry)
+    etag = '"{}{}"'.format(entry['hash'], '-' + encoding if encoding else '')
+    if _not_modified(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        path = os.path.join(settings.STATIC_MEDIA_BUILD_DIR,
+                            entry['path'] + suffix)
+        with open(path, 'rb') as f:
+            response = HttpResponse(f.read(), entry['mime_type'])
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Vary'] = 'Accept-Encoding'
+    if name == entry['path']:
+        response['Cache-Control'] = 'public, max-age={}'.format(
+            CACHE_FOREVER_TIMEOUT)
+    else:
+        response['Cache-Control'] = 'no-cache'
+    return response
+
+def _choose_encoding(request, entry):
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        params = [p.strip() for p in part.split(';')]
+        if 'q=0' in params:
+            continue
+        accepted.add(params[0].lower())
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and encoding in entry['encodings']:
+            return encoding, suffix
+    return None, ''
+
+def _not_modified(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return etag in etags or '*' in etags
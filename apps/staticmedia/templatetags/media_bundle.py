@@ -27,6 +27,7 @@ from django.utils.translation import to_locale
 from utils.translation import get_language_label
 
 from staticmedia import bundles
+from staticmedia import manifest
 from staticmedia import utils
 
 register = template.Library()
@@ -65,7 +66,9 @@ def static_url():
 @register.simple_tag(takes_context=True)
 def js_i18n_catalog(context):
     locale = to_locale(context['LANGUAGE_CODE'])
-    if settings.STATIC_MEDIA_USES_S3:
+    if manifest.enabled():
+        src = manifest.url('jsi18catalog/{}.js'.format(locale))
+    elif settings.STATIC_MEDIA_USES_S3:
         src = utils.static_url() + 'jsi18catalog/{}.js'.format(locale)
     else:
         src = reverse('staticmedia:js_i18n_catalog', args=(locale,))
@@ -74,7 +77,9 @@ def js_i18n_catalog(context):
 @register.simple_tag(takes_context=True)
 def js_language_data(context):
     locale = to_locale(context['LANGUAGE_CODE'])
-    if settings.STATIC_MEDIA_USES_S3:
+    if manifest.enabled():
+        src = manifest.url('jslanguagedata/{}.js'.format(locale))
+    elif settings.STATIC_MEDIA_USES_S3:
         src = utils.static_url() + 'jslanguagedata/{}.js'.format(locale)
     else:
         src = reverse('staticmedia:js_language_data', args=(locale,))
@@ -18,14 +18,21 @@
 
 from __future__ import absolute_import
 
+import gzip
 import os
+import shutil
+import tempfile
+from cStringIO import StringIO
 
 from django.conf import settings
 from django.core.cache import cache
 from django.test import TestCase
 from django.test.utils import override_settings
+from django.urls import reverse
 
+from staticmedia import build
 from staticmedia import bundles
+from staticmedia import manifest
 from utils import test_utils
 
 @override_settings(MEDIA_BUNDLES={
@@ -185,3 +192,105 @@ class TestCaching(TestCase):
         self.assertEqual(self.bundle.get_contents(), 'build-output')
         self.assertEqual(mock_build.call_count, 2)
         self.assertEqual(mock_modified_since.call_count, 2)
+
+@override_settings(MEDIA_BUNDLES={
+    'test.js': {
+        'files': (
+            'foo.js',
+            'bar.js',
+        )
+    },
+    'test.css': {
+        'files': (
+            'foo.css',
+            'bar.css',
+        )
+    },
+}, STATIC_MEDIA_COMPRESSED=True)
+class TestPrebuiltMedia(TestCase):
+    @test_utils.patch_for_test('staticmedia.utils.run_command')
+    @test_utils.patch_for_test('staticmedia.bundles.media_directories')
+    def setUp(self, mock_media_directories, mock_run_command):
+        self.mock_run_command = mock_run_command
+        self.mock_run_command.side_effect = (
+            lambda cmdline, stdin: 'compressed:' + stdin)
+        mock_media_directories.return_value = [
+            os.path.join(os.path.dirname(__file__), 'testdata')
+        ]
+        self.build_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.build_dir)
+        self.manifest_data = build.build(self.build_dir, locales=[])
+        settings_override = override_settings(
+            STATIC_MEDIA_BUILD_DIR=self.build_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def read_built_file(self, path):
+        with open(os.path.join(self.build_dir, path), 'rb') as f:
+            return f.read()
+
+    def built_path(self, name):
+        return self.manifest_data['files'][name]['path']
+
+    def test_build(self):
+        self.assertEqual(sorted(self.manifest_data['files'].keys()),
+                         ['css/test.css', 'js/test.js'])
+        self.assertEqual(self.mock_run_command.call_count, 2)
+        entry = self.manifest_data['files']['js/test.js']
+        self.assertEqual(entry['path'],
+                         'js/test.{}.js'.format(entry['hash']))
+        self.assertEqual(entry['mime_type'], 'text/javascript')
+        content = self.read_built_file(entry['path'])
+        self.assertTrue(content.startswith('compressed:'))
+        gzip_content = self.read_built_file(entry['path'] + '.gz')
+        self.assertEqual(
+            gzip.GzipFile(fileobj=StringIO(gzip_content)).read(), content)
+        self.assertEqual(manifest.read(self.build_dir), self.manifest_data)
+
+    def test_url(self):
+        self.assertEqual(bundles.get_bundle('test.js').get_url(),
+                         '/media/' + self.built_path('js/test.js'))
+
+    def get_bundle(self, bundle_name, **extra):
+        url = reverse('staticmedia:js_bundle', kwargs={
+            'bundle_name': bundle_name,
+        })
+        return self.client.get(url, **extra)
+
+    def test_serve(self):
+        path = self.built_path('js/test.js')
+        response = self.get_bundle(os.path.basename(path))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.read_built_file(path))
+        self.assertEqual(response['Cache-Control'],
+                         'public, max-age=31536000')
+        self.assertEqual(response['ETag'], '"{}"'.format(
+            self.manifest_data['files']['js/test.js']['hash']))
+        # We should never build bundles while serving them
+        self.assertEqual(self.mock_run_command.call_count, 2)
+
+    def test_serve_gzip(self):
+        path = self.built_path('js/test.js')
+        response = self.get_bundle(os.path.basename(path),
+                                   HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response.content, self.read_built_file(path + '.gz'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_not_modified(self):
+        path = self.built_path('js/test.js')
+        etag = self.get_bundle(os.path.basename(path))['ETag']
+        response = self.get_bundle(os.path.basename(path),
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_serve_regular_name(self):
+        # Requests for the regular name get the same content, but clients
+        # need to revalidate them
+        response = self.get_bundle('test.js')
+        self.assertEqual(response.content,
+                         self.read_built_file(self.built_path('js/test.js')))
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+    def test_missing_file(self):
+        self.assertEqual(self.get_bundle('other.js').status_code, 404)
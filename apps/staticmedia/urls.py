@@ -38,9 +38,11 @@ else:
         url(r'^js/(?P<bundle_name>[\w\.-]+)$', views.js_bundle, name='js_bundle'),
         url(r'^js/(?P<bundle_name>[\w\.-]+)/(?P<path>.*)$',
             views.js_bundle_with_path, name='js_bundle_with_path'),
-        url(r'^jsi18catalog/(?P<locale>[\w-]+)\.js$', views.js_i18n_catalog,
+        # The locale part also matches the built names from the manifest,
+        # which include a content hash (en.<hash>.js)
+        url(r'^jsi18catalog/(?P<locale>[\w\.-]+)\.js$', views.js_i18n_catalog,
             name='js_i18n_catalog'),
-        url(r'^jslanguagedata/(?P<locale>[\w-]+)\.js$',
+        url(r'^jslanguagedata/(?P<locale>[\w\.-]+)\.js$',
             views.js_language_data, name='js_language_data'),
         # embed.js is a weird file, but we want to continue support for a
         # while
@@ -25,6 +25,7 @@ from django.utils.translation import activate
 from django.views import static
 
 from staticmedia import bundles
+from staticmedia import manifest
 from staticmedia import oldembedder
 from staticmedia import utils
 from staticmedia.jsi18ncompat import (get_javascript_catalog,
@@ -52,6 +53,9 @@ def lookup_bundle(request, bundle_name, correct_type):
     return bundle
 
 def bundle_content(request, bundle_name, correct_type):
+    if manifest.enabled():
+        return manifest.serve(request, '{}/{}'.format(
+            correct_type.bundle_type, bundle_name))
     bundle = lookup_bundle(request, bundle_name, correct_type)
     return HttpResponse(bundle.get_contents(), bundle.mime_type)
 
@@ -60,10 +64,14 @@ def requirejs(request):
                         document_root=settings.STATIC_ROOT)
 
 def js_i18n_catalog(request, locale):
+    if manifest.enabled():
+        return manifest.serve(request, 'jsi18catalog/{}.js'.format(locale))
     catalog, plural = get_javascript_catalog(locale, 'djangojs', [])
     return render_javascript_catalog(catalog, plural)
 
 def js_language_data(request, locale):
+    if manifest.enabled():
+        return manifest.serve(request, 'jslanguagedata/{}.js'.format(locale))
     activate(locale)
     return HttpResponse(render_js_language_script(), 'application/javascript')
 
@@ -0,0 +1,168 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+"""subtitles.export -- Export subtitles for many languages/videos at once
+
+This module handles exports that include more than 1 subtitle language:
+
+  - get_merged_dfxp() creates a single DFXP file with all public languages
+    for a video.
+  - write_zip() writes a ZIP archive with a file for each public language of
+    a list of videos, in any babelsubs format.  It can optionally include
+    the merged DFXP for each video.
+
+We work through the videos in batches of BATCH_SIZE and fetch the public tips
+for each batch with 1 query.  Only 1 batch is kept in memory at once and the
+ZIP entries get written to the output file as we go, so exporting a whole
+team doesn't mean holding all of its subtitles in memory.
+
+Per-language files come from subtitles.rendercache.  Those are usually warmed
+when subtitles get published, so most files don't need to be parsed or
+rendered again.  In that case we also skip loading the subtitle data from
+the DB.
+"""
+
+import logging
+import zipfile
+
+from subtitles import rendercache
+from subtitles.models import SubtitleVersion
+from utils.subtitles import dfxp_merge
+from videos.models import Video
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MERGED_DFXP_FILENAME = 'all-languages.dfxp'
+
+def public_tips(videos, load_subtitles=True):
+    """Fetch the public tips for a list of videos
+
+    Args:
+        videos: list of Video objects
+        load_subtitles: If False, we defer loading the subtitle data.  Use
+            this if you're going to use the render cache.
+
+    Returns:
+        dict mapping video ids to lists of SubtitleVersions.  Each list
+        starts with the primary audio language, followed by the other
+        languages in the order they were created.
+    """
+    video_map = {video.id: video for video in videos}
+    tips = {video.id: [] for video in videos}
+    qs = (SubtitleVersion.objects.public_tips()
+          .filter(video_id__in=video_map.keys())
+          .order_by('subtitle_language_id'))
+    if not load_subtitles:
+        qs = qs.defer('serialized_subtitles')
+    for version in qs:
+        video = video_map[version.video_id]
+        version.video = video
+        if version.language_code == video.primary_audio_language_code:
+            tips[video.id].insert(0, version)
+        else:
+            tips[video.id].append(version)
+    return tips
+
+def merge_dfxp(versions):
+    """Merge the subtitles for a list of versions into a DFXP string
+
+    Returns None if versions is empty.
+    """
+    if not versions:
+        return None
+    return dfxp_merge([version.get_subtitles() for version in versions])
+
+def get_merged_dfxp(video):
+    """Get a DFXP file containing subtitles for all public languages."""
+    return merge_dfxp(public_tips([video])[video.id])
+
+def iter_video_batches(video_ids, batch_size=BATCH_SIZE):
+    """Fetch videos in batches
+
+    Yields lists of up to batch_size Video objects, in the same order as
+    video_ids.
+    """
+    video_ids = list(video_ids)
+    for i in xrange(0, len(video_ids), batch_size):
+        batch_ids = video_ids[i:i+batch_size]
+        video_map = Video.objects.in_bulk(batch_ids)
+        yield [video_map[id] for id in batch_ids if id in video_map]
+
+def write_zip(fileobj, video_ids, formats, include_merged_dfxp=False,
+              progress_callback=None):
+    """Write a ZIP archive with subtitles for a list of videos
+
+    The archive has a directory for each video, named after its video_id.
+    Inside that there's a <language_code>.<format> file for each public
+    language and format, plus all-languages.dfxp if include_merged_dfxp is
+    True.  Videos without public subtitles are skipped.
+
+    Args:
+        fileobj: file-like object to write the archive to
+        video_ids: primary keys of the videos to export
+        formats: list of babelsubs format names
+        include_merged_dfxp: also include the merged DFXP for each video
+        progress_callback: called with (current, total) after each batch of
+            videos.
+
+    Returns:
+        number of files that were written to the archive
+    """
+    video_ids = list(video_ids)
+    file_count = 0
+    videos_done = 0
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED,
+                         allowZip64=True) as archive:
+        for videos in iter_video_batches(video_ids, BATCH_SIZE):
+            tips = public_tips(videos, load_subtitles=include_merged_dfxp)
+            for video in videos:
+                for version in tips[video.id]:
+                    for format in formats:
+                        content = _render(version, format)
+                        if content is not None:
+                            archive.writestr('{}/{}.{}'.format(
+                                video.video_id, version.language_code,
+                                format), content)
+                            file_count += 1
+                if include_merged_dfxp and tips[video.id]:
+                    archive.writestr(
+                        '{}/{}'.format(video.video_id, MERGED_DFXP_FILENAME),
+                        _encode(merge_dfxp(tips[video.id])))
+                    file_count += 1
+                # Drop the parsed subtitles before moving on to the next
+                # video
+                del tips[video.id]
+            videos_done = min(videos_done + BATCH_SIZE, len(video_ids))
+            if progress_callback:
+                progress_callback(videos_done, len(video_ids))
+    return file_count
+
+def _render(version, format):
+    try:
+        return _encode(rendercache.render(
+            version, format, language=version.language_code))
+    except Exception:
+        logger.warn("Error exporting subtitles (%s/%s)", version.id, format,
+                    exc_info=True)
+        return None
+
+def _encode(content):
+    if isinstance(content, unicode):
+        return content.encode('utf-8')
+    return content
@@ -0,0 +1,83 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from subtitles import storageformat
+from subtitles.models import SubtitleVersion
+from utils.compress import compress
+
+class Command(BaseCommand):
+    help = ("Compare parse time and row size of the DFXP and binary "
+            "subtitle storage formats using existing versions")
+
+    def add_arguments(self, parser):
+        parser.add_argument('-c', '--count', default=100, type=int,
+                            help='Number of versions to sample')
+        parser.add_argument('-r', '--repeat', default=5, type=int,
+                            help='Number of times to parse each version')
+        parser.add_argument('--min-subtitles', dest='min-subtitles',
+                            default=1, type=int,
+                            help='Only sample versions with at least this '
+                            'many subtitles')
+
+    def handle(self, **options):
+        repeat = options['repeat']
+        qs = (SubtitleVersion.objects
+              .filter(subtitle_count__gte=options['min-subtitles'])
+              .order_by('-id')[:options['count']])
+        totals = {
+            'versions': 0,
+            'skipped': 0,
+            'dfxp_size': 0,
+            'binary_size': 0,
+            'dfxp_time': 0.0,
+            'binary_time': 0.0,
+        }
+        for version in qs:
+            subtitles = version.get_subtitles()
+            dfxp_data = compress(subtitles.to_xml())
+            binary_data = storageformat.serialize(subtitles,
+                                                  version.language_code)
+            if storageformat.is_legacy(binary_data):
+                totals['skipped'] += 1
+                continue
+            totals['versions'] += 1
+            totals['dfxp_size'] += len(dfxp_data)
+            totals['binary_size'] += len(binary_data)
+            totals['dfxp_time'] += timeit.timeit(
+                lambda: storageformat.load(dfxp_data, version.language_code),
+                number=repeat) / repeat
+            totals['binary_time'] += timeit.timeit(
+                lambda: storageformat.load(binary_data,
+                                           version.language_code),
+                number=repeat) / repeat
+
+        if not totals['versions']:
+            self.stdout.write('no versions to benchmark\n')
+            return
+        self.stdout.write(
+            'versions: {versions} (skipped {skipped})\n'
+            'dfxp:   {dfxp_size} bytes, {dfxp_time:.3f}s total parse time\n'
+            'binary: {binary_size} bytes, {binary_time:.3f}s total parse '
+            'time\n'.format(**totals))
+        self.stdout.write('size ratio: {:.2f}, speedup: {:.2f}x\n'.format(
+            float(totals['binary_size']) / totals['dfxp_size'],
+            totals['dfxp_time'] / max(totals['binary_time'], 1e-9)))
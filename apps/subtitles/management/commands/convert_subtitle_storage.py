@@ -0,0 +1,88 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from subtitles import storageformat
+from subtitles.models import SubtitleVersion
+
+class Command(BaseCommand):
+    help = ("Convert SubtitleVersion.serialized_subtitles from DFXP to the "
+            "binary storage format")
+
+    def add_arguments(self, parser):
+        parser.add_argument('-b', '--batch-size', dest='batch-size',
+                            default=200, type=int,
+                            help='Number of versions to convert at once')
+        parser.add_argument('-s', '--start-id', dest='start-id', default=-1,
+                            type=int,
+                            help='Only convert versions with ids greater than '
+                            'this (used to resume a previous run)')
+        parser.add_argument('-l', '--rate-limit', dest='rate-limit',
+                            metavar='COUNT', type=float,
+                            help='Only convert COUNT versions per second')
+
+    def handle(self, **options):
+        batch_size = options['batch-size']
+        rate_limit = options['rate-limit']
+        last_id = options['start-id']
+        start_time = time.time()
+        count = converted = 0
+        while True:
+            versions = list(SubtitleVersion.objects
+                            .filter(id__gt=last_id)
+                            .order_by('id')
+                            .values_list('id', 'language_code',
+                                         'serialized_subtitles')
+                            [:batch_size])
+            if not versions:
+                break
+            for version_id, language_code, data in versions:
+                last_id = version_id
+                count += 1
+                if self.convert_version(version_id, language_code, data):
+                    converted += 1
+            current_time = time.time()
+            rate = count / (current_time - start_time)
+            self.stdout.write(
+                'checked {} versions, converted {} ({:.2f} versions/sec '
+                'last_id: {})\n'.format(count, converted, rate, last_id))
+            self.stdout.flush()
+            if rate_limit is not None and rate > rate_limit:
+                time.sleep((count / rate_limit) - (current_time - start_time))
+
+    def convert_version(self, version_id, language_code, data):
+        if not storageformat.is_legacy(data):
+            return False
+        try:
+            subtitles = storageformat.load(data, language_code)
+        except Exception, e:
+            self.stderr.write('error loading version {}: {}\n'.format(
+                version_id, e))
+            return False
+        new_data = storageformat.serialize(subtitles, language_code)
+        if storageformat.is_legacy(new_data):
+            # Can't be represented in the binary format, leave it alone
+            return False
+        # Use update() to avoid all the work that SubtitleVersion.save() does.
+        # The subtitles themselves haven't changed.
+        (SubtitleVersion.objects.filter(id=version_id)
+         .update(serialized_subtitles=new_data))
+        return True
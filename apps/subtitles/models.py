@@ -43,10 +43,9 @@ import videos.tasks
 from babelsubs.storage import SubtitleSet
 from babelsubs.storage import calc_changes
 from babelsubs.generators.html import HTMLGenerator
-from babelsubs import load_from
 from subtitles import signals
+from subtitles import storageformat
 from utils import dates
-from utils.compress import compress, decompress
 from utils.subtitles import create_new_subtitles
 from utils.text import fmt
 from utils import translation
@@ -289,6 +288,29 @@ class SubtitleLanguagageQuerySet(query.QuerySet):
             """,
         ])
 
+    def annotate_nonempty_tip(self):
+        """Add a has_nonempty_tip attribute to the SLs in this QS.
+
+        This uses the same check as having_nonempty_tip(), but doesn't filter
+        out any languages.
+        """
+        return self.extra(select={'has_nonempty_tip':
+            """
+            EXISTS (
+                SELECT 1
+                FROM subtitles_subtitleversion AS sv
+                WHERE sv.version_number = (
+                    SELECT MAX(sv2.version_number)
+                    FROM subtitles_subtitleversion sv2
+                    WHERE sv2.subtitle_language_id=subtitles_subtitlelanguage.id
+                    AND sv2.visibility_override != 'deleted'
+                )
+                AND sv.subtitle_count > 0
+                AND sv.subtitle_language_id=subtitles_subtitlelanguage.id
+            )
+            """,
+        })
+
     def not_having_nonempty_tip(self):
         """Return a QS of SLs that do not have a tip version with 1 or more subtitles."""
         return self.extra(where=[
@@ -1508,9 +1530,10 @@ class SubtitleVersion(models.Model):
     meta_2_content = metadata.MetadataContentField()
     meta_3_content = metadata.MetadataContentField()
 
-    # Subtitles are stored in a text blob, serialized as base64'ed zipped XML
-    # (oh the joys of Django).  Use the subtitles property to get and set them.
-    # You shouldn't be touching this field.
+    # Subtitles are stored in a text blob, serialized using the binary format
+    # from subtitles.storageformat (older rows contain base64'ed zipped XML).
+    # Use get_subtitles() and set_subtitles() to work with them.  You
+    # shouldn't be touching this field.
     serialized_subtitles = models.TextField()
 
     # Lineage is stored as a blob of JSON to save on DB rows.  You shouldn't
@@ -1539,8 +1562,8 @@ class SubtitleVersion(models.Model):
         """
         # We cache the parsed subs for speed.
         if self._subtitles == None:
-            self._subtitles = load_from(decompress(self.serialized_subtitles),
-                    type='dfxp').to_internal()
+            self._subtitles = storageformat.load(self.serialized_subtitles,
+                                                 self.language_code)
             # force the subtitles to have the correct language code.  For a
             # while we had a bug where we always set to to "en"
             self._subtitles.set_language(self.language_code)
@@ -1575,7 +1598,8 @@ class SubtitleVersion(models.Model):
                                 % str(type(subtitles)))
 
         self.subtitle_count = len(subtitles)
-        self.serialized_subtitles = compress(subtitles.to_xml())
+        self.serialized_subtitles = storageformat.serialize(
+            subtitles, self.language_code)
 
         # We cache the parsed subs for speed.
         self._subtitles = subtitles
@@ -0,0 +1,160 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+"""subtitles.rendercache -- Cache rendered subtitle output
+
+Rendering subtitles means loading the SubtitleSet for a version and then
+running it through a babelsubs generator.  SubtitleVersions are (mostly)
+immutable, so the output for a given version/format/options combination never
+changes.  This module caches that output so we only need to render it once.
+
+Rendered subtitles get stored in one of 2 places:
+
+  - If settings.SUBTITLE_RENDER_CACHE_DIR is set, we store them as files in
+    that directory.
+  - Otherwise, we store them in the redis storage cache.
+
+Since the output can't change, we can also use a strong ETag for it.  Use
+etag() to calculate it and not_modified() to check if a request can be
+handled with a 304 response.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.utils.http import parse_etags
+from django_redis import get_redis_connection
+import babelsubs
+
+logger = logging.getLogger(__name__)
+
+# Bump this to invalidate all cached output (for example when upgrading
+# babelsubs changes how subtitles get rendered)
+CACHE_VERSION = 1
+
+def render(version, format, **options):
+    """Render subtitles for a version
+
+    Args:
+        version: SubtitleVersion to render
+        format: babelsubs format name
+        **options: extra args to pass to babelsubs.to()
+
+    Returns:
+        The rendered subtitles as a unicode string
+    """
+    key = _make_key(version, format, options)
+    content = _get(key)
+    if content is None:
+        content = _render(version, format, options)
+        _set(key, content)
+    return content.decode('utf-8')
+
+def warm(version, formats, **options):
+    """Render subtitles for a version and store them in the cache
+
+    Formats that are already cached are skipped.
+    """
+    for format in formats:
+        key = _make_key(version, format, options)
+        if _exists(key):
+            continue
+        try:
+            _set(key, _render(version, format, options))
+        except Exception:
+            logger.warn("Error rendering subtitles (%s/%s)", version.id,
+                        format, exc_info=True)
+
+def etag(version, format, **options):
+    """Get a strong ETag for rendered subtitles."""
+    return '"{}"'.format(_make_key(version, format, options))
+
+def not_modified(request, etag):
+    """Check if we can send a 304 response for a request
+
+    Returns True if the If-None-Match header matches etag.
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return etag in etags or '*' in etags
+
+def _render(version, format, options):
+    content = babelsubs.to(version.get_subtitles(), format, **options)
+    if isinstance(content, unicode):
+        content = content.encode('utf-8')
+    return content
+
+def _make_key(version, format, options):
+    # Include language_code since it can be changed with
+    # SubtitleLanguage.change_language_code() and babelsubs uses it for the
+    # output.  Include the created timestamp so that keys stay unique even if
+    # ids get re-used (for example when the DB is rolled back in the unittests)
+    key_data = json.dumps([version.language_code, version.created.isoformat(),
+                           options], sort_keys=True)
+    return 'subtitle-render-{}-{}-{}-{}'.format(
+        CACHE_VERSION, version.id, format,
+        hashlib.sha1(key_data).hexdigest()[:16])
+
+def _cache_dir():
+    return settings.SUBTITLE_RENDER_CACHE_DIR
+
+def _path(key):
+    digest = hashlib.sha1(key).hexdigest()
+    return os.path.join(_cache_dir(), digest[:2], digest)
+
+def _get(key):
+    if _cache_dir():
+        try:
+            with open(_path(key), 'rb') as f:
+                return f.read()
+        except IOError:
+            return None
+    else:
+        return get_redis_connection('storage').get(key)
+
+def _exists(key):
+    if _cache_dir():
+        return os.path.exists(_path(key))
+    else:
+        return get_redis_connection('storage').exists(key)
+
+def _set(key, content):
+    if _cache_dir():
+        path = _path(key)
+        dirname = os.path.dirname(path)
+        if not os.path.exists(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                # Probably another process created the directory
+                pass
+        # Write to a temp file, then rename it so that readers never see a
+        # partially written file
+        fd, tmp_path = tempfile.mkstemp(dir=dirname)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.rename(tmp_path, path)
+    else:
+        get_redis_connection('storage').setex(
+            key, settings.SUBTITLE_RENDER_CACHE_TIMEOUT, content)
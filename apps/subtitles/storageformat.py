@@ -0,0 +1,202 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+"""subtitles.storageformat -- Storage encoding for SubtitleVersion.
+
+SubtitleVersion.serialized_subtitles used to always contain base64'ed, zipped
+DFXP.  Loading that means inflating the data and then running the full DFXP
+parser over the document, which is slow for large subtitle sets.
+
+This module implements a compact binary encoding instead.  The data is a
+version-tagged, length-prefixed cue table:
+
+    header:
+        4 bytes  -- MAGIC
+        1 byte   -- format version
+        string   -- language code
+        uint16   -- number of style refs, followed by that many strings
+        uint32   -- number of cues
+
+    each cue:
+        uint32   -- start time in ms (NO_TIME if unsynced)
+        uint32   -- end time in ms (NO_TIME if unsynced)
+        uint16   -- index into the style refs + 1 (0 means no region)
+        uint8    -- flags (FLAG_NEW_PARAGRAPH)
+        string   -- the cue text, as DFXP inline markup
+
+Strings are a uint32 byte length followed by UTF-8 data.  The whole thing gets
+run through utils.compress, then prefixed with PREFIX so that we can tell it
+apart from legacy rows.  Since PREFIX contains a character that can't appear
+in base64 data, there's no chance of confusing the two.
+
+Use serialize() to create serialized_subtitles data and load() to read it
+back in either format.  Not every SubtitleSet can be represented by the cue
+table (for example DFXP with markup that babelsubs normalizes differently on
+append), so serialize() checks that the data round-trips and falls back to the
+legacy format if it doesn't.
+"""
+
+import struct
+
+from babelsubs import load_from
+
+from utils.compress import compress, decompress
+from utils.subtitles import create_new_subtitles
+
+PREFIX = 'amara-subs:'
+MAGIC = 'AMSB'
+FORMAT_VERSION = 1
+
+NO_TIME = 0xffffffff
+FLAG_NEW_PARAGRAPH = 0x01
+
+_HEADER = struct.Struct('>4sB')
+_UINT16 = struct.Struct('>H')
+_UINT32 = struct.Struct('>I')
+_CUE = struct.Struct('>IIHB')
+
+class DecodeError(ValueError):
+    pass
+
+def is_legacy(data):
+    """Check if serialized_subtitles data is in the legacy DFXP format."""
+    return not data.startswith(PREFIX)
+
+def load(data, language_code):
+    """Load serialized_subtitles data in either format
+
+    Returns a SubtitleSet
+    """
+    if is_legacy(data):
+        return load_from(decompress(data), type='dfxp').to_internal()
+    else:
+        return decode(data, language_code)
+
+def serialize(subtitles, language_code):
+    """Serialize a SubtitleSet for storage in serialized_subtitles
+
+    We use the binary format when possible and legacy DFXP otherwise.
+    """
+    try:
+        data = encode(subtitles, language_code)
+        if decode(data, language_code) == subtitles:
+            return data
+    except (ValueError, TypeError, struct.error):
+        pass
+    return compress(subtitles.to_xml())
+
+def encode(subtitles, language_code):
+    """Encode a SubtitleSet using the binary format.
+
+    Returns a string suitable for storing in serialized_subtitles.
+    """
+    styles = []
+    style_map = {}
+    cues = []
+    for item in subtitles.subtitle_items():
+        meta = item.meta or {}
+        region = meta.get('region')
+        if region:
+            if region not in style_map:
+                style_map[region] = len(styles) + 1
+                styles.append(region)
+            style_ref = style_map[region]
+        else:
+            style_ref = 0
+        flags = 0
+        if meta.get('new_paragraph'):
+            flags |= FLAG_NEW_PARAGRAPH
+        cues.append((item.start_time, item.end_time, style_ref, flags,
+                     item.text))
+
+    parts = [
+        _HEADER.pack(MAGIC, FORMAT_VERSION),
+        _pack_string(language_code),
+        _UINT16.pack(len(styles)),
+    ]
+    parts.extend(_pack_string(style) for style in styles)
+    parts.append(_UINT32.pack(len(cues)))
+    for start_time, end_time, style_ref, flags, text in cues:
+        parts.append(_CUE.pack(_pack_time(start_time), _pack_time(end_time),
+                               style_ref, flags))
+        parts.append(_pack_string(text))
+    return PREFIX + compress(''.join(parts))
+
+def decode(data, language_code=None):
+    """Decode data created with encode()
+
+    Args:
+        data: serialized_subtitles value
+        language_code: language code to use for the SubtitleSet.  If not
+            given, we use the code stored in the data.
+
+    Returns a SubtitleSet
+    """
+    if is_legacy(data):
+        raise DecodeError("Not in binary format")
+    reader = _Reader(decompress(data[len(PREFIX):]))
+    magic, version = reader.unpack(_HEADER)
+    if magic != MAGIC:
+        raise DecodeError("Invalid magic: {!r}".format(magic))
+    if version != FORMAT_VERSION:
+        raise DecodeError("Unknown format version: {}".format(version))
+    stored_language_code = reader.read_string()
+    styles = [reader.read_string()
+              for i in xrange(reader.unpack(_UINT16)[0])]
+
+    subtitles = create_new_subtitles(language_code or stored_language_code)
+    for i in xrange(reader.unpack(_UINT32)[0]):
+        start_time, end_time, style_ref, flags = reader.unpack(_CUE)
+        text = reader.read_string()
+        subtitles.append_subtitle(
+            _unpack_time(start_time), _unpack_time(end_time), text,
+            new_paragraph=bool(flags & FLAG_NEW_PARAGRAPH),
+            region=styles[style_ref - 1] if style_ref else None,
+            escape=False)
+    return subtitles
+
+def _pack_string(value):
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    return _UINT32.pack(len(value)) + value
+
+def _pack_time(value):
+    return NO_TIME if value is None else value
+
+def _unpack_time(value):
+    return None if value == NO_TIME else value
+
+class _Reader(object):
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read(self, length):
+        end = self.pos + length
+        if end > len(self.data):
+            raise DecodeError("Truncated data")
+        value = self.data[self.pos:end]
+        self.pos = end
+        return value
+
+    def unpack(self, struct_obj):
+        return struct_obj.unpack(self.read(struct_obj.size))
+
+    def read_string(self):
+        length = self.unpack(_UINT32)[0]
+        return self.read(length).decode('utf-8')
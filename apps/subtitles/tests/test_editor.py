@@ -78,6 +78,34 @@ class EditorViewTest(TestCase):
         self.assertEqual(self.user.get_api_key(), data['authHeaders']['x-apikey'])
         self.assertEqual(self.user.username, data['authHeaders']['x-api-username'])
 
+    def test_language_versions(self):
+        video = make_video()
+        video.primary_audio_language_code = 'en'
+        video.save()
+        for i in range(2):
+            pipeline.add_subtitles(video, 'en', SubtitleSetFactory())
+        pipeline.add_subtitles(video, 'en', SubtitleSetFactory(),
+                               visibility='private')
+        for i in range(2):
+            pipeline.add_subtitles(video, 'de', SubtitleSetFactory())
+        self._login()
+        url = reverse("subtitles:subtitle-editor", args=(video.video_id,'fr'))
+        data = self._get_boostrapped_data(self.client.get(url))
+        languages = dict((l['language_code'], l) for l in data['languages'])
+        # We should list the versions that the user can see, but only
+        # include the subtitles for the latest version of the base language
+        en_versions = languages['en']['versions']
+        self.assertEqual([v['version_no'] for v in en_versions], [1, 2])
+        self.assertEqual([v['visibility'] for v in en_versions],
+                         ['public', 'public'])
+        self.assertNotIn('subtitles', en_versions[0])
+        self.assertIn('subtitles', en_versions[1])
+        self.assertEqual(languages['en']['numVersions'], 3)
+        de_versions = languages['de']['versions']
+        self.assertEqual([v['version_no'] for v in de_versions], [1, 2])
+        for version_data in de_versions:
+            self.assertNotIn('subtitles', version_data)
+
     def test_permission(self):
         # test public video is ok
         # test video on hidden team to non members is not ok
@@ -0,0 +1,198 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from __future__ import absolute_import
+from cStringIO import StringIO
+import zipfile
+
+from django.test import TestCase
+from django.urls import reverse
+from nose.tools import *
+import babelsubs
+import mock
+
+from subtitles import export
+from subtitles import pipeline
+from subtitles import rendercache
+from teams import tasks
+from teams.models import VideoVisibility
+from utils import privatestorage
+from utils.factories import *
+from utils.subtitles import dfxp_merge
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.video = VideoFactory(primary_audio_language_code='fr')
+        self.versions = [
+            pipeline.add_subtitles(self.video, language_code,
+                                   SubtitleSetFactory(num_subs=2))
+            for language_code in ('en', 'fr', 'es')
+        ]
+        pipeline.add_subtitles(self.video, 'de', SubtitleSetFactory(),
+                               visibility='private')
+        self.video2 = VideoFactory()
+        self.video2_version = pipeline.add_subtitles(
+            self.video2, 'en', SubtitleSetFactory(num_subs=2))
+        self.video_without_subs = VideoFactory()
+        self.video_ids = [self.video.id, self.video2.id,
+                          self.video_without_subs.id]
+
+    def write_zip(self, *args, **kwargs):
+        output = StringIO()
+        export.write_zip(output, *args, **kwargs)
+        output.seek(0)
+        return zipfile.ZipFile(output)
+
+    def test_public_tips(self):
+        tips = export.public_tips([self.video, self.video2,
+                                   self.video_without_subs])
+        # The primary audio language should be first, then the other public
+        # languages in the order they were created.
+        assert_equal([v.language_code for v in tips[self.video.id]],
+                     ['fr', 'en', 'es'])
+        assert_equal(tips[self.video2.id], [self.video2_version])
+        assert_equal(tips[self.video_without_subs.id], [])
+
+    def test_get_merged_dfxp(self):
+        assert_equal(export.get_merged_dfxp(self.video), dfxp_merge([
+            self.versions[1].get_subtitles(),
+            self.versions[0].get_subtitles(),
+            self.versions[2].get_subtitles(),
+        ]))
+        assert_equal(export.get_merged_dfxp(self.video_without_subs), None)
+
+    def test_write_zip(self):
+        archive = self.write_zip(self.video_ids, ['srt', 'vtt'])
+        assert_equal(sorted(archive.namelist()), sorted([
+            '{}/{}.{}'.format(video_id, language_code, format)
+            for video_id, language_code in [
+                (self.video.video_id, 'en'),
+                (self.video.video_id, 'es'),
+                (self.video.video_id, 'fr'),
+                (self.video2.video_id, 'en'),
+            ]
+            for format in ('srt', 'vtt')
+        ]))
+        version = self.versions[0]
+        assert_equal(
+            archive.read('{}/en.srt'.format(self.video.video_id)),
+            babelsubs.to(version.get_subtitles(), 'srt',
+                         language='en').encode('utf-8'))
+
+    def test_merged_dfxp(self):
+        archive = self.write_zip(self.video_ids, [], include_merged_dfxp=True)
+        assert_equal(sorted(archive.namelist()), sorted([
+            '{}/all-languages.dfxp'.format(self.video.video_id),
+            '{}/all-languages.dfxp'.format(self.video2.video_id),
+        ]))
+        assert_equal(
+            archive.read('{}/all-languages.dfxp'.format(self.video.video_id)),
+            export.get_merged_dfxp(self.video).encode('utf-8'))
+
+    def test_uses_render_cache(self):
+        for version in self.versions + [self.video2_version]:
+            rendercache.warm(version, ['srt'],
+                             language=version.language_code)
+        with mock.patch('babelsubs.to') as mock_to:
+            self.write_zip(self.video_ids, ['srt'])
+        assert_equal(mock_to.call_count, 0)
+
+    def test_progress(self):
+        progress_callback = mock.Mock()
+        with mock.patch('subtitles.export.BATCH_SIZE', 2):
+            self.write_zip(self.video_ids, ['srt'],
+                           progress_callback=progress_callback)
+        assert_equal(progress_callback.call_args_list, [
+            mock.call(2, 3),
+            mock.call(3, 3),
+        ])
+
+    def test_download_all_zip(self):
+        url = reverse('subtitles:download_all_zip',
+                      args=(self.video.video_id, 'test'))
+        response = self.client.get(url, {'format': 'vtt'})
+        assert_equal(response.status_code, 200)
+        assert_equal(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(StringIO(''.join(response.streaming_content)))
+        assert_equal(sorted(archive.namelist()), [
+            '{}/{}.vtt'.format(self.video.video_id, language_code)
+            for language_code in ('en', 'es', 'fr')
+        ])
+
+    def test_download_all_zip_errors(self):
+        url = reverse('subtitles:download_all_zip',
+                      args=(self.video.video_id, 'test'))
+        assert_equal(self.client.get(url, {'format': 'foo'}).status_code, 404)
+        url = reverse('subtitles:download_all_zip',
+                      args=(self.video_without_subs.video_id, 'test'))
+        assert_equal(self.client.get(url).status_code, 404)
+
+    def test_download_all_zip_restricted_format(self):
+        url = reverse('subtitles:download_all_zip',
+                      args=(self.video.video_id, 'test'))
+        with mock.patch('subtitles.views.user_can_access_subtitles_format',
+                        return_value=False):
+            response = self.client.get(url, {'format': 'srt'})
+        assert_equal(response.status_code, 403)
+
+    def test_download_all_zip_private_video(self):
+        team = TeamFactory(video_visibility=VideoVisibility.PRIVATE)
+        video = TeamVideoFactory(team=team).video
+        pipeline.add_subtitles(video, 'en', SubtitleSetFactory())
+        url = reverse('subtitles:download_all_zip',
+                      args=(video.video_id, 'test'))
+        assert_equal(self.client.get(url).status_code, 403)
+        # Team members should be able to download it
+        member = TeamMemberFactory(team=team).user
+        self.client.login(username=member.username, password='password')
+        assert_equal(self.client.get(url).status_code, 200)
+
+class ExportTeamSubtitlesTest(TestCase):
+    def setUp(self):
+        self.team = TeamFactory()
+        self.project = ProjectFactory(team=self.team)
+        self.team_video = TeamVideoFactory(team=self.team,
+                                           project=self.project)
+        self.other_team_video = TeamVideoFactory(team=self.team)
+        TeamVideoFactory()
+        for video in (self.team_video.video, self.other_team_video.video):
+            pipeline.add_subtitles(video, 'en', SubtitleSetFactory())
+        self.saved_archives = {}
+        def save(name, content):
+            self.saved_archives[name] = zipfile.ZipFile(
+                StringIO(content.read()))
+            return name
+        patcher = mock.patch.object(privatestorage.storage, 'save', save)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_export(self):
+        path = tasks.export_team_subtitles(self.team.id, ['srt'])
+        assert_true(path.startswith(
+            'team-exports/{}/'.format(self.team.slug)))
+        assert_equal(sorted(self.saved_archives[path].namelist()), sorted([
+            '{}/en.srt'.format(self.team_video.video.video_id),
+            '{}/en.srt'.format(self.other_team_video.video.video_id),
+        ]))
+
+    def test_project(self):
+        path = tasks.export_team_subtitles(self.team.id, ['srt'],
+                                           project_id=self.project.id)
+        assert_equal(self.saved_archives[path].namelist(), [
+            '{}/en.srt'.format(self.team_video.video.video_id),
+        ])
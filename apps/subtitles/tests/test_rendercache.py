@@ -0,0 +1,87 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from __future__ import absolute_import
+import shutil
+import tempfile
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from nose.tools import *
+import babelsubs
+import mock
+
+from subtitles import pipeline
+from subtitles import rendercache
+from utils.factories import *
+from utils.test_utils import reload_obj
+
+class RenderCacheTest(TestCase):
+    def setUp(self):
+        self.video = VideoFactory()
+        self.version = pipeline.add_subtitles(self.video, 'en',
+                                              SubtitleSetFactory(num_subs=2))
+
+    def test_render(self):
+        assert_equal(rendercache.render(self.version, 'srt'),
+                     babelsubs.to(self.version.get_subtitles(), 'srt'))
+
+    def test_render_uses_cache(self):
+        rendercache.render(self.version, 'srt')
+        with mock.patch('babelsubs.to') as mock_to:
+            rendercache.render(reload_obj(self.version), 'srt')
+        assert_equal(mock_to.call_count, 0)
+
+    def test_options_are_part_of_the_key(self):
+        with mock.patch('babelsubs.to') as mock_to:
+            mock_to.return_value = 'subs'
+            rendercache.render(self.version, 'srt')
+            rendercache.render(self.version, 'srt', language='en')
+        assert_equal(mock_to.call_count, 2)
+
+    def test_warm(self):
+        rendercache.warm(self.version, ['srt', 'vtt'])
+        with mock.patch('babelsubs.to') as mock_to:
+            rendercache.render(self.version, 'srt')
+            rendercache.render(self.version, 'vtt')
+        assert_equal(mock_to.call_count, 0)
+
+    def test_etag(self):
+        etag = rendercache.etag(self.version, 'srt')
+        assert_equal(etag, rendercache.etag(reload_obj(self.version), 'srt'))
+        assert_not_equal(etag, rendercache.etag(self.version, 'vtt'))
+        request = mock.Mock(META={'HTTP_IF_NONE_MATCH': etag})
+        assert_true(rendercache.not_modified(request, etag))
+        request = mock.Mock(META={})
+        assert_false(rendercache.not_modified(request, etag))
+
+class RenderCacheDiskTest(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.video = VideoFactory()
+        self.version = pipeline.add_subtitles(self.video, 'en',
+                                              SubtitleSetFactory(num_subs=2))
+
+    def test_render_uses_disk(self):
+        with override_settings(SUBTITLE_RENDER_CACHE_DIR=self.cache_dir):
+            content = rendercache.render(self.version, 'vtt')
+            with mock.patch('babelsubs.to') as mock_to:
+                assert_equal(rendercache.render(self.version, 'vtt'),
+                             content)
+            assert_equal(mock_to.call_count, 0)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from __future__ import absolute_import
+
+from django.test import TestCase
+from nose.tools import *
+
+from subtitles import storageformat
+from subtitles.models import SubtitleVersion
+from subtitles.tests.utils import make_video, make_sl, refresh
+from utils.compress import compress, decompress
+from utils.subtitles import create_new_subtitles
+
+class StorageFormatTest(TestCase):
+    def make_subtitles(self):
+        subtitles = create_new_subtitles('en')
+        subtitles.append_subtitle(100, 200, 'a', new_paragraph=True)
+        subtitles.append_subtitle(300, 400, u'ಠ_ಠ', region='top')
+        subtitles.append_subtitle(None, None, 'unsynced')
+        return subtitles
+
+    def test_round_trip(self):
+        subtitles = self.make_subtitles()
+        data = storageformat.encode(subtitles, 'en')
+        assert_false(storageformat.is_legacy(data))
+        assert_equal(storageformat.decode(data), subtitles)
+
+    def test_empty(self):
+        subtitles = create_new_subtitles('en')
+        data = storageformat.encode(subtitles, 'en')
+        assert_equal(storageformat.decode(data), subtitles)
+
+    def test_load_legacy(self):
+        subtitles = self.make_subtitles()
+        data = compress(subtitles.to_xml())
+        assert_true(storageformat.is_legacy(data))
+        assert_equal(storageformat.load(data, 'en'), subtitles)
+
+    def test_unknown_version(self):
+        data = storageformat.PREFIX + compress(
+            storageformat._HEADER.pack(storageformat.MAGIC, 99))
+        with assert_raises(storageformat.DecodeError):
+            storageformat.decode(data)
+
+    def test_truncated_data(self):
+        data = storageformat.encode(self.make_subtitles(), 'en')
+        raw = decompress(data[len(storageformat.PREFIX):])
+        data = storageformat.PREFIX + compress(raw[:-3])
+        with assert_raises(storageformat.DecodeError):
+            storageformat.decode(data)
+
+class SubtitleVersionStorageTest(TestCase):
+    def setUp(self):
+        self.video = make_video()
+        self.sl = make_sl(self.video, 'en')
+
+    def test_set_subtitles_uses_binary_format(self):
+        version = self.sl.add_version(subtitles=[(100, 200, 'a')])
+        version = refresh(version)
+        assert_false(storageformat.is_legacy(version.serialized_subtitles))
+        assert_equal(len(version.get_subtitles()), 1)
+
+    def test_legacy_rows_still_load(self):
+        version = self.sl.add_version(subtitles=[(100, 200, 'a')])
+        subtitles = version.get_subtitles()
+        SubtitleVersion.objects.filter(id=version.id).update(
+            serialized_subtitles=compress(subtitles.to_xml()))
+        assert_equal(refresh(version).get_subtitles(), subtitles)
@@ -32,4 +32,5 @@ urlpatterns = [
     url(r'^(?P<video_id>[\w]+)/(?P<language_code>[\w-]+)(?:/(?P<version_number>[\d]+))?/download/(?P<filename>.+)\.(?P<format>[\w]+)',
         views.download, name='download'),
     url(r'^(?P<video_id>[\w]+)/download/(?P<filename>.+)\.dfxp', views.download_all, name='download_all'),
+    url(r'^(?P<video_id>[\w]+)/download/(?P<filename>.+)\.zip', views.download_all_zip, name='download_all_zip'),
 ]
@@ -16,7 +16,9 @@
 # You should have received a copy of the GNU Affero General Public License along
 # with this program.  If not, see http://www.gnu.org/licenses/agpl-3.0.html.
 
+import collections
 import json
+import tempfile
 from urllib import urlencode
 
 import babelsubs
@@ -24,8 +26,8 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import redirect_to_login
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponse, Http404, HttpResponseServerError, HttpResponseForbidden
-from django.db.models import Count
+from django.http import (FileResponse, HttpResponse, Http404,
+                         HttpResponseServerError, HttpResponseForbidden)
 from django.conf import settings
 from django.contrib import messages
 from django.template import RequestContext
@@ -40,11 +42,11 @@ from django.template.defaultfilters import urlize, linebreaks, force_escape
 from django.views.decorators.clickjacking import xframe_options_exempt
 
 from auth.models import CustomUser as User
+from subtitles import export
 from subtitles import shims
 from subtitles.workflows import get_workflow
 from subtitles.models import SubtitleLanguage, SubtitleVersion
 from subtitles.permissions import user_can_access_subtitles_format
-from subtitles.templatetags.new_subtitles_tags import visibility
 from subtitles.forms import SubtitlesUploadForm
 from teams.models import Task
 from teams.permissions import can_perform_task
@@ -243,30 +245,68 @@ class SubtitleEditorBase(View):
 
         return editor_data
 
+    def calc_version_summaries(self):
+        """Fetch version info for all languages with a single query
+
+        We only need the version number and visibility for most versions, so
+        we use a values_list() query to avoid loading the
+        serialized_subtitles blob for each one.
+
+        Sets self.version_summaries, which maps language ids to lists of
+        (version_id, version_number, visibility) tuples for all versions,
+        including deleted ones, ordered by version number.
+        """
+        self.version_summaries = collections.defaultdict(list)
+        qs = (SubtitleVersion.objects.full()
+              .filter(video=self.video)
+              .order_by('version_number')
+              .values_list('id', 'subtitle_language_id', 'version_number',
+                           'visibility', 'visibility_override'))
+        for (version_id, language_id, version_number, visibility,
+             visibility_override) in qs:
+            self.version_summaries[language_id].append(
+                (version_id, version_number,
+                 visibility_override or visibility))
+
+    def load_full_version(self, version_id):
+        """Get a SubtitleVersion that we need to send the subtitles for
+
+        This is normally the editing version or the version we're
+        translating from, which we've already loaded.
+        """
+        for version in (self.editing_version, self.translated_from_version):
+            if version is not None and version.id == version_id:
+                return version
+        return SubtitleVersion.objects.get(id=version_id)
+
     def editor_data_for_language(self, language):
         versions_data = []
 
         if self.workflow.user_can_view_private_subtitles(
             self.user, language.language_code):
-            language_qs = language.subtitleversion_set.extant()
+            allowed_visibility = ('public', 'private')
         else:
-            language_qs = language.subtitleversion_set.public()
-        for i, version in enumerate(language_qs):
+            allowed_visibility = ('public',)
+        summaries = [
+            summary for summary in self.version_summaries[language.id]
+            if summary[2] in allowed_visibility
+        ]
+        full_version_ids = set(
+            version.id for version in (self.editing_version,
+                                       self.translated_from_version)
+            if version is not None)
+        if language.language_code == self.base_language and summaries:
+            full_version_ids.add(summaries[-1][0])
+        for version_id, version_number, visibility in summaries:
             version_data = {
-                'version_no':version.version_number,
-                'visibility': visibility(version),
+                'version_no': version_number,
+                'visibility': visibility,
             }
-            if self.editing_version == version:
-                version_data.update(_version_data(version))
-            elif self.translated_from_version == version:
-                version_data.update(_version_data(version))
-            elif (language.language_code == self.base_language and
-                  i == len(language_qs) - 1):
-                version_data.update(_version_data(version))
-
+            if version_id in full_version_ids:
+                version_data.update(_version_data(
+                    self.load_full_version(version_id)))
             versions_data.append(version_data)
 
-
         return {
             'translatedFrom': self.translated_from_version and {
                 'language_code': self.translated_from_version.subtitle_language.language_code,
@@ -276,7 +316,7 @@ class SubtitleEditorBase(View):
             'language_code': language.language_code,
             'name': language.get_language_code_display(),
             'pk': language.pk,
-            'numVersions': language.num_versions,
+            'numVersions': len(self.version_summaries[language.id]),
             'versions': versions_data,
             'subtitles_complete': language.subtitles_complete,
             'is_rtl': language.is_rtl(),
@@ -388,8 +428,8 @@ class SubtitleEditorBase(View):
         # show the user the rererence languages:
         self.translated_from_version = self.editing_language.\
             get_translation_source_version(ignore_forking=True)
-        self.languages = self.video.newsubtitlelanguage_set.annotate(
-            num_versions=Count('subtitleversion'))
+        self.languages = list(self.video.newsubtitlelanguage_set.all())
+        self.calc_version_summaries()
         editor_data = self.get_editor_data()
         self.experimental = 'experimental' in request.GET
 
@@ -483,3 +523,27 @@ def download_all(request, video_id, filename):
     response = HttpResponse(merged_dfxp, content_type="text/plain")
     response['Content-Disposition'] = 'attachment'
     return response
+
+def download_all_zip(request, video_id, filename):
+    """Download a ZIP archive with all public languages for a video
+
+    The format GET param selects the subtitle format (default: srt).
+    """
+    user = _user_for_download_permissions(request)
+    format = request.GET.get('format', 'srt')
+    if format not in babelsubs.get_available_formats():
+        raise Http404()
+    if not user_can_access_subtitles_format(user, format):
+        raise PermissionDenied()
+    video = get_object_or_404(Video, video_id=video_id)
+    if not video.get_workflow().user_can_view_video(user):
+        raise PermissionDenied()
+    # Build the archive in a temp file, then stream it to the client
+    archive = tempfile.TemporaryFile()
+    if not export.write_zip(archive, [video.id], [format]):
+        archive.close()
+        raise Http404()
+    archive.seek(0)
+    response = FileResponse(archive, content_type="application/zip")
+    response['Content-Disposition'] = 'attachment'
+    return response
@@ -1,8 +1,14 @@
 from django.contrib.contenttypes.models import ContentType
-from subtitles.models import SubtitleLanguage
+from django.db import transaction
+from subtitles.models import SubtitleLanguage, SubtitleVersion
 from subtitles.signals import subtitles_published
-from teams.signals import api_subtitles_approved
+from teams import stats
+from teams.models import (Team, TeamVideo, TeamVideoMigration, Task, Workflow,
+                          autocreate_tasks)
+from teams.signals import (api_subtitles_approved, api_teamvideo_new,
+                           videos_moved_from_team_to_team)
 from utils.csv_parser import UnicodeReader
+from videos.models import Video
 from videos.tasks import video_changed_tasks
 
 def complete_approve_tasks(tasks):
@@ -33,3 +39,106 @@ def add_videos_from_csv(team, user, csv_file):
     for row in reader:
         videos.append(dict(zip(fields, row)))
     add_team_videos.delay(team.pk, user.pk, videos)
+
+MOVE_CHUNK_SIZE = 200
+
+def move_videos(team_videos, new_team, project=None, user=None):
+    """Move a group of team videos to a new team
+
+    This has the same effect as calling TeamVideo.move_to() for each team
+    video, but the database work for videos moving between teams is done for
+    chunks of videos at once.  In particular, the activity records get
+    copied/moved with a few statements per chunk rather than several for each
+    record.
+
+    Args:
+        team_videos: iterable of TeamVideo objects to move
+        new_team: Team to move the videos to
+        project: Project to move the videos to.  If None, videos changing
+            teams are moved to the default project and videos within new_team
+            stay in their current project.
+        user: User moving the videos
+
+    Returns:
+        (moved, errors) tuple.  moved is a list of TeamVideos that were moved.
+        errors is a list of (team_video, exception) tuples for videos that
+        couldn't be moved because of a Video.DuplicateUrlError.
+    """
+    moved = []
+    errors = []
+    chunk = []
+    for team_video in team_videos:
+        if team_video.team_id == new_team.id:
+            # Moving between projects is cheap, just use the normal code
+            team_video.move_to(new_team, project, user)
+            moved.append(team_video)
+            continue
+        chunk.append(team_video)
+        if len(chunk) >= MOVE_CHUNK_SIZE:
+            _move_chunk(chunk, new_team, project, user, moved, errors)
+            chunk = []
+    if chunk:
+        _move_chunk(chunk, new_team, project, user, moved, errors)
+    return moved, errors
+
+def _move_chunk(team_videos, new_team, project, user, moved, errors):
+    if project is None:
+        project = new_team.default_project
+    chunk_moves = []
+    with transaction.atomic():
+        for team_video in team_videos:
+            try:
+                with transaction.atomic():
+                    team_video.video.update_team(new_team)
+            except Video.DuplicateUrlError, e:
+                errors.append((team_video, e))
+            else:
+                chunk_moves.append((team_video, team_video.team))
+        if not chunk_moves:
+            return
+        team_video_ids = [tv.id for tv, old_team in chunk_moves]
+        video_ids = [tv.video_id for tv, old_team in chunk_moves]
+
+        Task.objects.filter(team_video_id__in=team_video_ids).update(
+            deleted=True)
+        TeamVideo.objects.filter(id__in=team_video_ids).update(
+            team=new_team, project=project)
+        (SubtitleVersion.objects.extant()
+         .filter(video_id__in=video_ids)
+         .update(visibility='public'))
+        Video.objects.filter(id__in=video_ids).update(
+            is_public=new_team.videos_public(),
+            moderated_by=new_team if new_team.moderates_videos() else None)
+        TeamVideoMigration.objects.bulk_create([
+            TeamVideoMigration(from_team=old_team, to_team=new_team,
+                               to_project=project)
+            for tv, old_team in chunk_moves
+        ])
+
+        workflows = list(Workflow.objects.filter(team=new_team)
+                         .select_related('project', 'team', 'team_video'))
+        for team_video, old_team in chunk_moves:
+            team_video.team = new_team
+            team_video.project = project
+            team_video.video.is_public = new_team.videos_public()
+            team_video.video.cache.invalidate()
+            team_video.video.clear_team_video_cache()
+            team_video.video.teamvideo = team_video
+            # Lookup the workflow using our prefetched list
+            if workflows:
+                team_video._cached_workflow = Workflow.get_for_target(
+                    team_video.id, 'team_video', workflows)
+            else:
+                team_video._cached_workflow = Workflow(team=new_team)
+            autocreate_tasks(team_video)
+        for team_id in set([new_team.id] +
+                           [old_team.id for tv, old_team in chunk_moves]):
+            Team.cache.invalidate_by_pk(team_id)
+        videos_moved_from_team_to_team.send(sender=new_team, user=user,
+                                            moves=chunk_moves)
+
+    for team_video, old_team in chunk_moves:
+        api_teamvideo_new.send(team_video)
+        stats.increment(new_team, 'videos-added')
+        video_changed_tasks.delay(team_video.video_id)
+        moved.append(team_video)
@@ -53,7 +53,7 @@ from teams.models import (
     BillingReport, MembershipNarrowing, Application, TeamVisibility,
     VideoVisibility, EmailInvite, Setting
 )
-from teams import behaviors, notifymembers, permissions, tasks
+from teams import behaviors, bulk_actions, notifymembers, permissions, tasks
 from teams.exceptions import ApplicationInvalidException
 from teams.fields import TeamMemberInput, TeamMemberRoleSelect, MultipleProjectField, MultipleUsernameInviteField
 from teams.permissions import (
@@ -1827,7 +1827,7 @@ class ActivityFiltersForm(FiltersForm):
         return choices
 
     def _get_queryset(self, cleaned_data):
-        qs = ActivityRecord.objects.for_team(self.team)
+        qs = ActivityRecord.objects.for_team(self.team).with_related_objects()
         if not (self.is_bound and self.is_valid()):
             return qs
         type = cleaned_data.get('type')
@@ -2685,6 +2685,8 @@ class DeleteVideosFormSimple(DeleteVideosForm):
 class MoveVideosForm(VideoManagementForm):
     name = 'move'
     label = _('Move')
+    iter_objects_select_related = ('teamvideo', 'teamvideo__team',
+                                   'teamvideo__project')
 
     new_team = AmaraChoiceField(label=_('New Team'), choices=[])
     project = AmaraChoiceField(label=_('Project'), choices=[],
@@ -2749,20 +2751,16 @@ class MoveVideosForm(VideoManagementForm):
     def perform_submit(self, qs):
         self.duplicate_url_errors = 0
         self.video_policy_errors = 0
-        self.success_count = 0
-        for video in qs:
-            team_video = video.teamvideo
-            try:
-                team_video.move_to(self.cleaned_data['new_team'],
-                                   self.cleaned_data['project'],
-                                   self.user)
-            except Video.DuplicateUrlError, e:
-                if e.from_prevent_duplicate_public_videos:
-                    self.video_policy_errors += 1
-                else:
-                    self.duplicate_url_errors += 1
+        moved, errors = bulk_actions.move_videos(
+            (video.teamvideo for video in qs),
+            self.cleaned_data['new_team'], self.cleaned_data['project'],
+            self.user)
+        for team_video, e in errors:
+            if e.from_prevent_duplicate_public_videos:
+                self.video_policy_errors += 1
             else:
-                self.success_count += 1
+                self.duplicate_url_errors += 1
+        self.success_count = len(moved)
 
     def message(self):
         if not self.success_count:
@@ -0,0 +1,37 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from django.core.management.base import BaseCommand
+
+from teams import rollups
+from teams.models import Team
+
+class Command(BaseCommand):
+    help = u'Rebuild the team statistics rollups from existing data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', metavar='team-slug',
+                            help='Teams to rebuild (default: all teams)')
+
+    def handle(self, *args, **options):
+        teams = Team.objects.all().order_by('id')
+        if options['slugs']:
+            teams = teams.filter(slug__in=options['slugs'])
+        for team in teams:
+            rollups.rebuild(team)
+            self.stdout.write(u'{}: rebuilt\n'.format(team.slug))
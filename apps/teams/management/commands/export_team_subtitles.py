@@ -0,0 +1,69 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from django.core.management.base import BaseCommand, CommandError
+import babelsubs
+
+from teams import tasks
+from teams.models import Project, Team
+from utils import privatestorage
+
+class Command(BaseCommand):
+    help = u'Export the public subtitles for a team as a ZIP archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('slug', metavar='team-slug')
+        parser.add_argument('--project', dest='project', default=None,
+                            help='Only export videos in this project (slug)')
+        parser.add_argument('--format', dest='formats', action='append',
+                            help='Subtitle format to export (can be given '
+                            'multiple times, default: srt)')
+        parser.add_argument('--merged-dfxp', dest='merged_dfxp',
+                            action='store_true', default=False,
+                            help='Also include the merged DFXP for each video')
+        parser.add_argument('--background', dest='background',
+                            action='store_true', default=False,
+                            help='Run the export in the worker')
+
+    def handle(self, *args, **options):
+        try:
+            team = Team.objects.get(slug=options['slug'])
+        except Team.DoesNotExist:
+            raise CommandError(u'Unknown team: {}'.format(options['slug']))
+        if options['project']:
+            try:
+                project_id = team.project_set.get(slug=options['project']).id
+            except Project.DoesNotExist:
+                raise CommandError(u'Unknown project: {}'.format(
+                    options['project']))
+        else:
+            project_id = None
+        formats = options['formats'] or ['srt']
+        for format in formats:
+            if format not in babelsubs.get_available_formats():
+                raise CommandError(u'Unknown format: {}'.format(format))
+
+        if options['background']:
+            job = tasks.export_team_subtitles.delay(
+                team.id, formats, project_id, options['merged_dfxp'])
+            self.stdout.write(u'export job: {}\n'.format(job.id))
+        else:
+            path = tasks.export_team_subtitles(
+                team.id, formats, project_id, options['merged_dfxp'])
+            self.stdout.write(u'{}\n'.format(
+                privatestorage.storage.url(path)))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.15 on 2018-12-04 14:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('amara_auth', '0009_auto_20181129_0617'),
+        ('teams', '0017_merge_20181126_1529'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamDailyLanguageStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('language_code', models.CharField(max_length=16)),
+                ('subtitles_edited', models.PositiveIntegerField(default=0)),
+                ('subtitles_published', models.PositiveIntegerField(default=0)),
+                ('members_joined', models.PositiveIntegerField(default=0)),
+                ('members_left', models.PositiveIntegerField(default=0)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='teams.Team')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TeamDailyStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('videos_added', models.PositiveIntegerField(default=0)),
+                ('members_joined', models.PositiveIntegerField(default=0)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='teams.Team')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TeamDailyUserStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('contributions', models.PositiveIntegerField(default=0)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='teams.Team')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='amara_auth.CustomUser')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='teamdailyuserstats',
+            unique_together=set([('team', 'date', 'user')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='teamdailystats',
+            unique_together=set([('team', 'date')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='teamdailylanguagestats',
+            unique_together=set([('team', 'date', 'language_code')]),
+        ),
+    ]
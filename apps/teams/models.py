@@ -21,7 +21,7 @@ from math import ceil
 import csv
 import datetime
 import logging
-from cStringIO import StringIO
+import tempfile
 
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
@@ -65,6 +65,7 @@ from utils import enum
 from utils import translation, send_templated_email
 from utils.amazon import S3EnabledImageField, S3EnabledFileField
 from utils.bunch import Bunch
+from utils.externalsort import external_sort
 from utils.panslugify import pan_slugify
 from utils.text import fmt
 from utils.translation import get_language_label
@@ -938,7 +939,8 @@ class Team(models.Model):
     def members_count_since(self, joined_since):
         """Return the number of members of this team who joined the last n days.
         """
-        return self.users.filter(date_joined__gt=datetime.datetime.now() - datetime.timedelta(days=joined_since)).count()
+        from teams import rollups
+        return rollups.members_joined(self, since=joined_since)
 
     def members_since(self, joined_since):
         """ Returns the members who joined the team the last n days
@@ -959,7 +961,8 @@ class Team(models.Model):
     def videos_count_since(self, added_since = None):
         """Return the number of videos of this team added the last n days.
         """
-        return self.teamvideo_set.filter(created__gt=datetime.datetime.now() - datetime.timedelta(days=added_since)).count()
+        from teams import rollups
+        return rollups.videos_added(self, since=added_since)
 
     def videos_since(self, added_since):
         """Returns the videos of this team added the last n days.
@@ -3607,6 +3610,12 @@ class BillingReport(models.Model):
     type = models.IntegerField(choices=TYPE_CHOICES,
                                default=TYPE_BILLING_RECORD)
 
+    # Number of approve tasks to fetch at once when generating reports
+    REPORT_CHUNK_SIZE = 500
+    # Number of rows to sort in memory at once for the approval for users
+    # report
+    REPORT_SORT_CHUNK_SIZE = 10000
+
     def __unicode__(self):
         if hasattr(self, 'id') and self.id is not None:
             team_count = self.teams.all().count()
@@ -3622,11 +3631,54 @@ class BillingReport(models.Model):
             team__in=self.teams.all(),
             completed__range=(self.start_date, self.end_date))
 
+    def _iter_approved_task_chunks(self):
+        """Iterate through the approved tasks in chunks.
+
+        Each chunk is a list of tasks with the objects we need for the report
+        rows already fetched.  We iterate using the task id, rather than
+        OFFSET, so that each chunk takes the same amount of time to fetch.
+        """
+        qs = (self._get_approved_tasks()
+              .select_related('team', 'team_video__video',
+                              'team_video__project', 'assignee',
+                              'new_subtitle_version__subtitle_language__video')
+              .order_by('id'))
+        last_id = -1
+        while True:
+            chunk = list(qs.filter(id__gt=last_id)[:self.REPORT_CHUNK_SIZE])
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1].id
+
+    def _latest_tasks(self, qs, approve_tasks):
+        """Find the most recently completed task for each approve task.
+
+        Args:
+            qs: Task queryset to select from
+            approve_tasks: list of approve tasks
+
+        Returns:
+            dict mapping (team_video_id, language) to the most recently
+            completed task in qs for that team video and language.
+        """
+        keys = set((t.team_video_id, t.language) for t in approve_tasks)
+        qs = (qs.filter(team_video_id__in=set(k[0] for k in keys),
+                        language__in=set(k[1] for k in keys))
+              .select_related('assignee')
+              .order_by('completed', 'id'))
+        latest = {}
+        for task in qs:
+            key = (task.team_video_id, task.language)
+            if key in keys:
+                latest[key] = task
+        return latest
+
     def _report_date(self, datetime):
         return datetime.strftime('%Y-%m-%d %H:%M:%S')
 
     def generate_rows_type_approval(self):
-        header = (
+        yield (
             'Team',
             'Video Title',
             'Video ID',
@@ -3638,32 +3690,31 @@ class BillingReport(models.Model):
             'Approver',
             'Date',
         )
-        rows = [header]
-        for approve_task in self._get_approved_tasks():
-            video = approve_task.team_video.video
-            project = approve_task.team_video.project.name if approve_task.team_video.project else 'none'
-            version = approve_task.new_subtitle_version
-            language = version.subtitle_language
-            subtitle_task = (Task.objects.complete_subtitle_or_translate()
-                             .filter(team_video=approve_task.team_video,
-                                     language=approve_task.language)
-                             .order_by('-completed'))[0]
-            rows.append((
-                approve_task.team.name,
-                video.title_display(),
-                video.video_id,
-                project,
-                approve_task.language,
-                get_minutes_for_version(version, False),
-                language.is_primary_audio_language(),
-                subtitle_task.type==Task.TYPE_IDS['Translate'],
-                unicode(approve_task.assignee),
-                self._report_date(approve_task.completed),
-            ))
-        return rows
+        for approve_tasks in self._iter_approved_task_chunks():
+            subtitle_tasks = self._latest_tasks(
+                Task.objects.complete_subtitle_or_translate(), approve_tasks)
+            for approve_task in approve_tasks:
+                video = approve_task.team_video.video
+                project = approve_task.team_video.project.name if approve_task.team_video.project else 'none'
+                version = approve_task.new_subtitle_version
+                language = version.subtitle_language
+                subtitle_task = subtitle_tasks[approve_task.team_video_id,
+                                               approve_task.language]
+                yield (
+                    approve_task.team.name,
+                    video.title_display(),
+                    video.video_id,
+                    project,
+                    approve_task.language,
+                    get_minutes_for_version(version, False),
+                    language.is_primary_audio_language(),
+                    subtitle_task.type==Task.TYPE_IDS['Translate'],
+                    unicode(approve_task.assignee),
+                    self._report_date(approve_task.completed),
+                )
 
     def generate_rows_type_approval_for_users(self):
-        header = (
+        yield (
             'User',
             'Task Type',
             'Team',
@@ -3678,60 +3729,64 @@ class BillingReport(models.Model):
             'Date',
             'Pay Rate',
         )
-        data_rows = []
-        for approve_task in self._get_approved_tasks():
-            video = approve_task.team_video.video
-            project = approve_task.team_video.project.name if approve_task.team_video.project else 'none'
-            version = approve_task.get_subtitle_version()
-            language = version.subtitle_language
-
-            all_tasks = [approve_task]
-            try:
-                all_tasks.append((Task.objects.complete_subtitle_or_translate()
-                                  .filter(team_video=approve_task.team_video,
-                                          language=approve_task.language)
-                                  .order_by('-completed'))[0])
-            except IndexError:
-                # no subtitling task, probably the review task was manually
-                # created.
-                pass
-            try:
-                all_tasks.append((Task.objects.complete_review()
-                                  .filter(team_video=approve_task.team_video,
-                                          language=approve_task.language)
-                                  .order_by('-completed'))[0])
-            except IndexError:
-                # review not enabled
-                pass
-
-            for task in all_tasks:
-                data_rows.append((
-                    unicode(task.assignee),
-                    task.get_type_display(),
-                    approve_task.team.name,
-                    video.title_display(),
-                    video.video_id,
-                    project,
-                    language.language_code,
-                    get_minutes_for_version(version, False),
-                    language.is_primary_audio_language(),
-                    unicode(approve_task.assignee),
-                    unicode(task.body),
-                    self._report_date(task.completed),
-                    task.assignee.pay_rate_code,
-                ))
-
-        data_rows.sort(key=lambda row: row[0])
-        return [header] + data_rows
+        # Sort the rows by user without having to keep them all in memory
+        for row in external_sort(self._approval_for_users_data_rows(),
+                                 key=lambda row: row[0],
+                                 chunk_size=self.REPORT_SORT_CHUNK_SIZE):
+            yield row
+
+    def _approval_for_users_data_rows(self):
+        for approve_tasks in self._iter_approved_task_chunks():
+            subtitle_tasks = self._latest_tasks(
+                Task.objects.complete_subtitle_or_translate(), approve_tasks)
+            # Note: If there is no subtitle task, probably the review task
+            # was manually created.  If there is no review task, then review
+            # is not enabled.
+            review_tasks = self._latest_tasks(
+                Task.objects.complete_review(), approve_tasks)
+            for approve_task in approve_tasks:
+                video = approve_task.team_video.video
+                project = approve_task.team_video.project.name if approve_task.team_video.project else 'none'
+                version = approve_task.get_subtitle_version()
+                language = version.subtitle_language
+                minutes = get_minutes_for_version(version, False)
+
+                key = (approve_task.team_video_id, approve_task.language)
+                all_tasks = [approve_task]
+                if key in subtitle_tasks:
+                    all_tasks.append(subtitle_tasks[key])
+                if key in review_tasks:
+                    all_tasks.append(review_tasks[key])
+
+                for task in all_tasks:
+                    yield (
+                        unicode(task.assignee),
+                        task.get_type_display(),
+                        approve_task.team.name,
+                        video.title_display(),
+                        video.video_id,
+                        project,
+                        language.language_code,
+                        minutes,
+                        language.is_primary_audio_language(),
+                        unicode(approve_task.assignee),
+                        unicode(task.body),
+                        self._report_date(task.completed),
+                        task.assignee.pay_rate_code,
+                    )
 
     def generate_rows_type_billing_record(self):
-        rows = []
         for i,team in enumerate(self.teams.all()):
-            rows = rows + BillingRecord.objects.csv_report_for_team(team,
+            rows = BillingRecord.objects.csv_report_for_team(team,
                 self.start_date, self.end_date, add_header=i == 0)
-        return rows
+            for row in rows:
+                yield row
 
     def generate_rows(self):
+        """Generate the rows for this report.
+
+        Returns an iterator that yields the header row, then each data row.
+        """
         if self.type == BillingReport.TYPE_BILLING_RECORD:
             rows = self.generate_rows_type_billing_record()
         elif self.type == BillingReport.TYPE_APPROVAL:
@@ -3748,7 +3803,7 @@ class BillingReport(models.Model):
                 return value.encode("utf-8")
             else:
                 return value
-        return [tuple(_convert(v) for v in row) for row in rows]
+        return (tuple(_convert(v) for v in row) for row in rows)
 
     def process(self):
         """
@@ -3757,26 +3812,32 @@ class BillingReport(models.Model):
         storage will take care of exporting it to s3.
         """
         try:
-            rows = self.generate_rows()
+            self.make_csv_file(self.generate_rows())
         except StandardError:
             logger.error("Error generating billing report: (id: %s)", self.id)
-        else:
-            self.make_csv_file(rows)
         self.processed = datetime.datetime.utcnow()
         self.save()
 
     def make_csv_file(self, rows):
+        """Write rows to our CSV file.
+
+        rows can be any iterable.  We write the rows to a temporary file as
+        they're generated, then let the storage backend upload that file in
+        chunks, so we never need to hold the entire report in memory.
+        """
         rows = self.convert_unicode_to_utf8(rows)
 
-        csv_file = StringIO()
-        writer = csv.writer(csv_file)
-        writer.writerows(rows)
+        with tempfile.TemporaryFile() as csv_file:
+            writer = csv.writer(csv_file)
+            for row in rows:
+                writer.writerow(row)
+            csv_file.seek(0)
 
-        name = 'bill-%s-teams-%s-%s-%s-%s.csv' % (
-            self.teams.all().count(),
-            self.start_str, self.end_str,
-            self.get_type_display(), self.pk)
-        self.csv_file.save(name, csv_file)
+            name = 'bill-%s-teams-%s-%s-%s-%s.csv' % (
+                self.teams.all().count(),
+                self.start_str, self.end_str,
+                self.get_type_display(), self.pk)
+            self.csv_file.save(name, File(csv_file))
 
     @property
     def start_str(self):
@@ -4117,3 +4178,52 @@ class TeamSubtitlesCompleted(models.Model):
             'video_id': self.video.video_id,
             'lang': self.language_code,
         })
+
+class TeamDailyStats(models.Model):
+    """
+    Per-day counters for a team.  See teams.rollups for how these get
+    maintained.
+    """
+    team = models.ForeignKey(Team)
+    date = models.DateField()
+    videos_added = models.PositiveIntegerField(default=0)
+    members_joined = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [
+            ('team', 'date'),
+        ]
+
+class TeamDailyLanguageStats(models.Model):
+    """
+    Per-day, per-language counters for a team.
+    """
+    team = models.ForeignKey(Team)
+    date = models.DateField()
+    language_code = models.CharField(max_length=16)
+    # Number of subtitle versions added
+    subtitles_edited = models.PositiveIntegerField(default=0)
+    # Number of times subtitles were published
+    subtitles_published = models.PositiveIntegerField(default=0)
+    # Number of members who speak the language that joined/left the team
+    members_joined = models.PositiveIntegerField(default=0)
+    members_left = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [
+            ('team', 'date', 'language_code'),
+        ]
+
+class TeamDailyUserStats(models.Model):
+    """
+    Per-day, per-user counters for a team.
+    """
+    team = models.ForeignKey(Team)
+    date = models.DateField()
+    user = models.ForeignKey(User)
+    contributions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [
+            ('team', 'date', 'user'),
+        ]
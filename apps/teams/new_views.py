@@ -26,7 +26,6 @@ from __future__ import absolute_import
 import functools
 import json
 import logging
-import pickle
 from collections import namedtuple, OrderedDict
 
 from django.conf import settings
@@ -34,7 +33,6 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login as auth_login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import redirect_to_login
-from django.core.cache import cache
 from django.core.paginator import Paginator
 from django.core.signing import BadSignature
 from django.urls import reverse
@@ -950,13 +948,7 @@ def statistics(request, team, tab):
     if (tab == 'teamstats' and
         not permissions.can_view_stats_tab(team, request.user)):
         return HttpResponseForbidden("Not allowed")
-    cache_key = 'stats-' + team.slug + '-' + tab
-    cached_context = cache.get(cache_key)
-    if cached_context:
-        context = pickle.loads(cached_context)
-    else:
-        context = compute_statistics(team, stats_type=tab)
-        cache.set(cache_key, pickle.dumps(context), 60*60*24)
+    context = compute_statistics(team, stats_type=tab)
     context['tab'] = tab
     context['team'] = team
     context['breadcrumbs'] = [
@@ -254,7 +254,7 @@ class OldActivityFiltersForm(forms.Form):
         return data if data else None
 
     def get_queryset(self):
-        qs = ActivityRecord.objects.for_team(self.team)
+        qs = ActivityRecord.objects.for_team(self.team).with_related_objects()
         if not (self.is_bound and self.is_valid()):
             return qs
         type = self.cleaned_data.get('type')
@@ -0,0 +1,302 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+"""
+teams.rollups -- Per-day counters for the team statistics pages
+
+Calculating the team statistics from scratch means scanning every subtitle
+language, version and member for the team.  Instead, we keep per-team, per-day
+counter rows that get incremented as things happen:
+
+  - TeamDailyStats: videos added and members joined
+  - TeamDailyLanguageStats: subtitles edited/published and members
+    joined/left, for each language
+  - TeamDailyUserStats: contributions for each user
+
+The record_* functions get called by the signal handlers in
+teams.signalhandlers.  When videos move to another team or get removed from
+one, record_videos_moved() moves their subtitle counts along with them, so
+that the rows match what rebuild() would calculate.  The other functions sum
+up the rows for the statistics pages, which means the work is proportional to
+the number of days rather than the size of the team.
+
+Unlike teams.stats, which tracks recent activity in redis, these rows are
+stored forever so that we can calculate all-time totals.  Use rebuild() (or
+the backfill_team_rollups command) to calculate the rows from the existing
+data.  This needs to be run once after the tables are created, otherwise the
+counts start at 0 and moving videos out of a team can make them negative.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncDate
+
+from auth.models import UserLanguage
+from subtitles.models import SubtitleLanguage, SubtitleVersion
+from teams.models import (Team, TeamDailyStats, TeamDailyLanguageStats,
+                          TeamDailyUserStats, TeamMember, TeamVideo)
+from utils import dates
+
+def record_video_added(team):
+    _increment(TeamDailyStats, team.id, {}, videos_added=1)
+
+def record_member_joined(member):
+    _increment(TeamDailyStats, member.team_id, {}, members_joined=1)
+    for language_code in _user_languages(member.user_id):
+        _increment(TeamDailyLanguageStats, member.team_id,
+                   {'language_code': language_code}, members_joined=1)
+
+def record_member_left(member):
+    if not Team.objects.filter(id=member.team_id).exists():
+        # The member was deleted along with the team
+        return
+    for language_code in _user_languages(member.user_id):
+        _increment(TeamDailyLanguageStats, member.team_id,
+                   {'language_code': language_code}, members_left=1)
+
+def record_subtitles_edited(team, version):
+    _increment(TeamDailyLanguageStats, team.id,
+               {'language_code': version.language_code}, subtitles_edited=1)
+    if version.author_id and version.author_id != settings.ANONYMOUS_USER_ID:
+        _increment(TeamDailyUserStats, team.id, {'user_id': version.author_id},
+                   contributions=1)
+
+def record_subtitles_published(team, language_code):
+    _increment(TeamDailyLanguageStats, team.id,
+               {'language_code': language_code}, subtitles_published=1)
+
+def record_videos_moved(video_ids, old_team, new_team):
+    """Move the counts for videos from one team to another
+
+    The videos count as removed from old_team and added to new_team today.
+    Their subtitle counts get moved on the days that the subtitles were
+    created.
+
+    Args:
+        video_ids: ids of the videos that moved
+        old_team: Team the videos were in
+        new_team: Team the videos are in now, or None if they were removed
+            from old_team
+    """
+    language_counts = _language_counts(
+        SubtitleVersion.objects.filter(video_id__in=video_ids),
+        SubtitleLanguage.objects.filter(video_id__in=video_ids))
+    user_counts = list(_user_counts(
+        SubtitleVersion.objects.filter(video_id__in=video_ids)))
+    for team, sign in ((old_team, -1), (new_team, 1)):
+        if team is None:
+            continue
+        _increment(TeamDailyStats, team.id, {},
+                   videos_added=sign * len(video_ids))
+        for (day, language_code), counts in language_counts.items():
+            _increment(TeamDailyLanguageStats, team.id,
+                       {'date': day, 'language_code': language_code},
+                       **{
+                           name: sign * value
+                           for name, value in counts.items()
+                       })
+        for day, user_id, count in user_counts:
+            _increment(TeamDailyUserStats, team.id,
+                       {'date': day, 'user_id': user_id},
+                       contributions=sign * count)
+
+def _user_languages(user_id):
+    return set(UserLanguage.objects
+               .filter(user_id=user_id)
+               .values_list('language', flat=True))
+
+def _increment(model, team_id, lookup, **counts):
+    lookup = dict(lookup, team_id=team_id)
+    lookup.setdefault('date', dates.now().date())
+    updates = {
+        name: F(name) + value
+        for name, value in counts.items()
+    }
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**dict(lookup, **counts))
+    except IntegrityError:
+        # Another process created the row before us
+        model.objects.filter(**lookup).update(**updates)
+
+def _filter(model, team, since):
+    qs = model.objects.filter(team=team)
+    if since:
+        qs = qs.filter(date__gt=dates.now().date() - timedelta(days=since))
+    return qs
+
+def _sum(qs, field):
+    return qs.aggregate(total=Sum(field))['total'] or 0
+
+def videos_added(team, since=None):
+    """Count videos added to a team.
+
+    Args:
+        team: Team to count for
+        since: only count the last n days
+    """
+    return _sum(_filter(TeamDailyStats, team, since), 'videos_added')
+
+def members_joined(team, since=None):
+    """Count members who joined a team."""
+    return _sum(_filter(TeamDailyStats, team, since), 'members_joined')
+
+def subtitle_counts(team, since=None):
+    """Count subtitle activity for each language
+
+    Returns:
+        list of (language_code, subtitles_edited, subtitles_published) tuples
+    """
+    qs = (_filter(TeamDailyLanguageStats, team, since)
+          .values_list('language_code')
+          .annotate(Sum('subtitles_edited'), Sum('subtitles_published'))
+          .order_by())
+    return [
+        (language_code, int(edited), int(published))
+        for language_code, edited, published in qs
+        if edited or published
+    ]
+
+def member_language_counts(team, since=None):
+    """Count team members by language
+
+    If since is given, we count the members who joined in the last n days.
+    Otherwise, we count members who joined minus members who left.  Note that
+    this counts the languages that members spoke when they joined/left the
+    team, which can differ from the ones they speak now.
+
+    Returns:
+        list of (language_code, count) tuples
+    """
+    qs = (_filter(TeamDailyLanguageStats, team, since)
+          .values_list('language_code')
+          .annotate(Sum('members_joined'), Sum('members_left'))
+          .order_by())
+    counts = []
+    for language_code, joined, left in qs:
+        count = int(joined) if since else int(joined) - int(left)
+        if count > 0:
+            counts.append((language_code, count))
+    return counts
+
+def top_contributors(team, since=None, limit=20):
+    """Get the users with the most contributions
+
+    Returns:
+        list of (user_id, contributions) tuples
+    """
+    qs = (_filter(TeamDailyUserStats, team, since)
+          .values_list('user_id')
+          .annotate(total=Sum('contributions'))
+          .filter(total__gt=0)
+          .order_by('-total', 'user_id'))
+    return [(user_id, int(total)) for user_id, total in qs[:limit]]
+
+@transaction.atomic
+def rebuild(team):
+    """Recalculate the rollup rows for a team from the existing data
+
+    Some things can't be reconstructed: we don't know when members left, or
+    which languages they spoke at the time.  For subtitles published, we
+    count each completed language once, on the day of its last version.
+    """
+    for model in (TeamDailyStats, TeamDailyLanguageStats, TeamDailyUserStats):
+        model.objects.filter(team=team).delete()
+
+    daily = defaultdict(dict)
+    for day, count in _count_by_day(TeamVideo.objects.filter(team=team),
+                                    'created'):
+        daily[day]['videos_added'] = count
+    for day, count in _count_by_day(TeamMember.objects.filter(team=team),
+                                    'created'):
+        daily[day]['members_joined'] = count
+    TeamDailyStats.objects.bulk_create([
+        TeamDailyStats(team=team, date=day, **counts)
+        for day, counts in daily.items()
+    ])
+
+    versions = SubtitleVersion.objects.filter(video__teamvideo__team=team)
+    by_language = _language_counts(
+        versions,
+        SubtitleLanguage.objects.filter(video__teamvideo__team=team))
+    user_languages = UserLanguage.objects.filter(
+        user__team_members__team=team)
+    for day, language_code, count in _count_by_day(
+            user_languages, 'user__team_members__created', 'language'):
+        by_language[day, language_code]['members_joined'] = count
+    TeamDailyLanguageStats.objects.bulk_create([
+        TeamDailyLanguageStats(team=team, date=day,
+                               language_code=language_code, **counts)
+        for (day, language_code), counts in by_language.items()
+    ])
+
+    TeamDailyUserStats.objects.bulk_create([
+        TeamDailyUserStats(team=team, date=day, user_id=user_id,
+                           contributions=count)
+        for day, user_id, count in _user_counts(versions)
+    ])
+
+def _language_counts(versions, languages):
+    """Count subtitles edited/published by day and language
+
+    Returns:
+        dict mapping (date, language_code) to dicts of counts
+    """
+    by_language = defaultdict(dict)
+    for day, language_code, count in _count_by_day(
+            versions, 'created', 'language_code'):
+        by_language[day, language_code]['subtitles_edited'] = count
+    completed = (languages
+                 .filter(subtitles_complete=True)
+                 .annotate(last_version=Max('subtitleversion__created'))
+                 .exclude(last_version=None)
+                 .values_list('language_code', 'last_version'))
+    for language_code, last_version in completed:
+        counts = by_language[last_version.date(), language_code]
+        counts['subtitles_published'] = (
+            counts.get('subtitles_published', 0) + 1)
+    return by_language
+
+def _user_counts(versions):
+    """Count contributions by day and user
+
+    Yields (date, user_id, count) tuples
+    """
+    contributions = (versions
+                     .exclude(author_id=settings.ANONYMOUS_USER_ID)
+                     .exclude(author_id=None))
+    return _count_by_day(contributions, 'created', 'author_id')
+
+def _count_by_day(qs, date_field, *fields):
+    """Count rows grouped by day and fields
+
+    Yields (date, field_value1, ..., count) tuples
+    """
+    qs = (qs.exclude(**{date_field: None})
+          .annotate(day=TruncDate(date_field))
+          .values_list('day', *fields)
+          .annotate(count=Count('id'))
+          .order_by())
+    for row in qs:
+        yield row
@@ -16,15 +16,20 @@
 # along with this program.  If not, see 
 # http://www.gnu.org/licenses/agpl-3.0.html.
 
+from collections import defaultdict
+
+from django.db import transaction
 from django.dispatch import receiver
 from django.db.models.signals import post_save, post_delete
 
 from auth.models import CustomUser as User
 from subtitles.signals import subtitles_published, subtitles_added
-from teams import stats
+from teams import rollups, stats
 from teams.models import (TeamVideo, TeamMember, MembershipNarrowing,
                           TeamSubtitlesCompleted)
-from teams.signals import api_teamvideo_new
+from teams.signals import (api_teamvideo_new, video_moved_from_team_to_team,
+                           videos_moved_from_team_to_team,
+                           video_removed_from_team)
 from videos.signals import feed_imported
 
 @receiver(feed_imported)
@@ -38,6 +43,39 @@ def on_feed_imported(signal, sender, new_videos, **kwargs):
 def on_team_member_change(sender, instance, **kwargs):
     User.cache.invalidate_by_pk(instance.user_id)
 
+@receiver(post_save, sender=TeamMember)
+def on_team_member_save(sender, instance, created, **kwargs):
+    if created:
+        rollups.record_member_joined(instance)
+
+@receiver(post_delete, sender=TeamMember)
+def on_team_member_delete(sender, instance, **kwargs):
+    # Wait for the commit, since the member may be getting deleted along with
+    # the team
+    transaction.on_commit(lambda: rollups.record_member_left(instance))
+
+@receiver(post_save, sender=TeamVideo)
+def on_team_video_save(sender, instance, created, **kwargs):
+    if created:
+        rollups.record_video_added(instance.team)
+
+@receiver(video_moved_from_team_to_team)
+def update_rollups_on_video_moved(sender, destination_team, old_team, video,
+                                  **kwargs):
+    rollups.record_videos_moved([video.id], old_team, destination_team)
+
+@receiver(videos_moved_from_team_to_team)
+def update_rollups_on_videos_moved(sender, moves, **kwargs):
+    by_old_team = defaultdict(list)
+    for team_video, old_team in moves:
+        by_old_team[old_team].append(team_video.video_id)
+    for old_team, video_ids in by_old_team.items():
+        rollups.record_videos_moved(video_ids, old_team, sender)
+
+@receiver(video_removed_from_team)
+def update_rollups_on_video_removed(sender, team, **kwargs):
+    rollups.record_videos_moved([sender.id], team, None)
+
 @receiver(post_save, sender=MembershipNarrowing)
 @receiver(post_delete, sender=MembershipNarrowing)
 def on_membership_narrowing_change(sender, instance, **kwargs):
@@ -64,3 +102,15 @@ def on_subtitles_published(sender, version=None, **kwargs):
                 member=member,
                 video=sender.video,
                 language_code=sender.language_code)
+
+@receiver(subtitles_published)
+def update_rollups_on_subtitles_published(sender, **kwargs):
+    tv = sender.video.get_team_video()
+    if tv:
+        rollups.record_subtitles_published(tv.team, sender.language_code)
+
+@receiver(subtitles_added)
+def update_rollups_on_subtitles_added(sender, version=None, **kwargs):
+    tv = sender.video.get_team_video()
+    if tv and version:
+        rollups.record_subtitles_edited(tv.team, version)
@@ -28,6 +28,11 @@ member_remove = dispatch.Signal()
 video_removed_from_team = dispatch.Signal(providing_args=["team", "user"])
 video_moved_from_team_to_team = dispatch.Signal(
         providing_args=["destination_team", "old_team", "video"])
+# Sent by bulk_actions.move_videos() instead of video_moved_from_team_to_team.
+# The sender is the destination team and moves is a list of (team_video,
+# old_team) tuples.
+videos_moved_from_team_to_team = dispatch.Signal(
+        providing_args=["user", "moves"])
 video_moved_from_project_to_project = dispatch.Signal(
         providing_args=["old_project", "new_project", "video"])
 team_settings_changed = dispatch.Signal(
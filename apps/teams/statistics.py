@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.urls import reverse
 from auth.models import CustomUser as User
+from teams import rollups
 from utils.graphing import plot
 from utils import DEFAULT_PROTOCOL
 from utils.translation import get_language_label
@@ -10,6 +11,9 @@ from django.utils.timezone import utc
 def compute_statistics(team, stats_type):
     """computes a bunch of statistics for the team, either at
     the video or member levels.
+
+    The counts come from the per-day rows in teams.rollups, so this is cheap
+    enough to call on every request.
     """
     from views import TableCell
     summary = ''
@@ -22,59 +26,49 @@ def compute_statistics(team, stats_type):
     summary_additional_recent = ''
     summary_table = ''
     if stats_type == 'videosstats':
-        (complete_languages, incomplete_languages) = team.get_team_languages()
-        languages = complete_languages + incomplete_languages
-        unique_languages = set(languages)
-        total = 0
-        numbers = []
         y_title = "Number of edited subtitles"
-        for l in unique_languages:
-            count_complete = complete_languages.count(l)
-            count_incomplete = incomplete_languages.count(l)
-            numbers.append((get_language_label(l), count_complete + count_incomplete, "Published: %s, total edits:" % count_complete))
-            total += count_complete + count_incomplete
+        language_counts = rollups.subtitle_counts(team)
+        numbers = [
+            (get_language_label(l), edited, "Published: %s, total edits:" % published)
+            for l, edited, published in language_counts
+        ]
+        total = sum(edited for l, edited, published in language_counts)
         summary = 'Top languages (all time)'
         title = ""
         graph = plot(numbers, title=title, graph_type='HorizontalBar', labels=True, max_entries=20, y_title=y_title)
 
-        (complete_languages_recent, incomplete_languages_recent, new_languages) = team.get_team_languages(since=30)
-        languages_recent = complete_languages_recent + incomplete_languages_recent
-        unique_languages_recent = set(languages_recent)
+        language_counts_recent = rollups.subtitle_counts(team, since=30)
         summary_recent = "Top languages (past 30 days)"
-        numbers_recent = []
-        total_recent = 0
-        for l in unique_languages_recent:
-            count_complete_recent = complete_languages_recent.count(l)
-            count_incomplete_recent = incomplete_languages_recent.count(l)
-            numbers_recent.append((get_language_label(l), count_complete_recent + count_incomplete_recent, "Published: %s, total edits:" % count_complete_recent))
-            total_recent += count_complete_recent + count_incomplete_recent
+        numbers_recent = [
+            (get_language_label(l), edited, "Published: %s, total edits:" % published)
+            for l, edited, published in language_counts_recent
+        ]
+        total_recent = sum(edited for l, edited, published in language_counts_recent)
         title_recent = ""
         graph_recent = plot(numbers_recent, title=title_recent, graph_type='HorizontalBar', labels=True, max_entries=20, y_title=y_title)
 
         summary_table = []
         summary_table.append([TableCell("", header=True), TableCell("all time", header=True), TableCell("past 30 days", header=True)])
         summary_table.append([TableCell("videos added", header=True), TableCell(str(team.videos_count)), TableCell(str(team.videos_count_since(30)))])
-        summary_table.append([TableCell("languages edited", header=True), TableCell(str(len(unique_languages))), TableCell(str(len(unique_languages_recent)))])
+        summary_table.append([TableCell("languages edited", header=True), TableCell(str(len(language_counts))), TableCell(str(len(language_counts_recent)))])
         summary_table.append([TableCell("subtitles edited", header=True), TableCell(str(total)), TableCell(str(total_recent))])
 
     elif stats_type == 'teamstats':
-        languages = list(team.languages())
-        unique_languages = set(languages)
+        member_languages = rollups.member_language_counts(team)
         summary = u'Members by language (all time)'
-        numbers = []
-        for l in unique_languages:
-            numbers.append((get_language_label(l), languages.count(l),
-                            get_language_label(l)))
+        numbers = [
+            (get_language_label(l), count, get_language_label(l))
+            for l, count in member_languages
+        ]
         title = ''
         graph = plot(numbers, graph_type='HorizontalBar', title=title, max_entries=25, labels=True, total_label="Members: ")
-        languages_recent = list(team.languages(members_joined_since=30))
-        unique_languages_recent = set(languages_recent)
+        member_languages_recent = rollups.member_language_counts(team, since=30)
         summary_recent = u'New members by language (past 30 days)'
         numbers_recent = []
-        for l in unique_languages_recent:
+        for l, count in member_languages_recent:
             numbers_recent.append(
                 (get_language_label(l),
-                 languages_recent.count(l),
+                 count,
                  get_language_label(l),
                  "%s://%s%s" % (DEFAULT_PROTOCOL, settings.HOSTNAME, reverse('teams:members', args=[], kwargs={'slug': team.slug}) + "?sort=-joined&lang=%s" % l))
                 )
@@ -84,58 +78,26 @@ def compute_statistics(team, stats_type):
         summary_table = []
         summary_table.append([TableCell("", header=True), TableCell("all time", header=True), TableCell("past 30 days", header=True)])
         summary_table.append([TableCell("members joined", header=True), TableCell(str(team.members_count)), TableCell(str(team.members_count_since(30)))])
-        summary_table.append([TableCell("member languages", header=True), TableCell(str(len(unique_languages))), TableCell(str(len(unique_languages_recent)))])
-
-        active_users = {}
-        for sv in team.active_users():
-            if sv[0] in active_users:
-                active_users[sv[0]].add(sv[1])
-            else:
-                active_users[sv[0]] = set([sv[1]])
-
-        most_active_users = active_users.items()
-        most_active_users.sort(reverse=True, key=lambda x: len(x[1]))
-        if len(most_active_users) > 20:
-            most_active_users = most_active_users[:20]
-
-        active_users_recent = {}
-        for sv in team.active_users(since=30):
-            if sv[0] in active_users_recent:
-                active_users_recent[sv[0]].add(sv[1])
-            else:
-                active_users_recent[sv[0]] = set([sv[1]])
-
-        most_active_users_recent = active_users_recent.items()
-        most_active_users_recent.sort(reverse=True, key=lambda x: len(x[1]))
-        if len(most_active_users_recent) > 20:
-            most_active_users_recent = most_active_users_recent[:20]
-
-        def displayable_user(user, users_details):
-            user_details = users_details[user[0]]
-            return ("%s %s (%s)" % (user_details[1], user_details[2], user_details[3]),
-                    len(user[1]),
-                    "%s %s (%s)" % (user_details[1], user_details[2], user_details[3]),
-                    "%s://%s%s" % (DEFAULT_PROTOCOL, settings.HOSTNAME, reverse("profiles:profile", kwargs={'user_id': str(user[0])}))
-            )
-
-        user_details = User.displayable_users(map(lambda x: int(x[0]), most_active_users))
-        user_details_dict = {}
-        for user in user_details:
-            user_details_dict[user[0]] = user
-
-        most_active_users = map(lambda x: displayable_user(x, user_details_dict), most_active_users)
-
+        summary_table.append([TableCell("member languages", header=True), TableCell(str(len(member_languages))), TableCell(str(len(member_languages_recent)))])
+
+        def displayable_users(contributors):
+            user_details = dict(
+                (user[0], user) for user in
+                User.displayable_users([user_id for user_id, count in contributors]))
+            rv = []
+            for user_id, count in contributors:
+                if user_id not in user_details:
+                    continue
+                label = "%s %s (%s)" % user_details[user_id][1:4]
+                rv.append((label, count, label,
+                           "%s://%s%s" % (DEFAULT_PROTOCOL, settings.HOSTNAME, reverse("profiles:profile", kwargs={'user_id': str(user_id)}))))
+            return rv
+
+        most_active_users = displayable_users(rollups.top_contributors(team))
         summary_additional = u'Top contributors (all time)'
         graph_additional = plot(most_active_users, graph_type='HorizontalBar', title='', labels=True, xlinks=True, total_label="Contributions: ")
 
-
-        user_details_recent = User.displayable_users(map(lambda x: int(x[0]), most_active_users_recent))
-        user_details_dict_recent = {}
-        for user in user_details_recent:
-            user_details_dict_recent[user[0]] = user
-
-        most_active_users_recent = map(lambda x: displayable_user(x, user_details_dict_recent), most_active_users_recent)
-
+        most_active_users_recent = displayable_users(rollups.top_contributors(team, since=30))
         summary_additional_recent = u'Top contributors (past 30 days)'
         graph_additional_recent = plot(most_active_users_recent, graph_type='HorizontalBar', title='', labels=True, xlinks=True, total_label="Contributions: ")
 
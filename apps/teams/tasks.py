@@ -1,9 +1,11 @@
 from datetime import datetime
 import logging
+import tempfile
 
 logger = logging.getLogger('teams.tasks')
 
 from django.conf import settings
+from django.core.files import File
 from django.db.models import F
 from django.utils.translation import ugettext_lazy as _
 import requests
@@ -11,29 +13,21 @@ import requests
 from utils import send_templated_email
 from utils.panslugify import pan_slugify
 from utils.translation import SUPPORTED_LANGUAGE_CODES
-from widget.video_cache import (
-    invalidate_cache as invalidate_video_cache,
-    invalidate_video_moderation,
-    invalidate_video_visibility
-)
+from widget.video_cache import invalidate_team_cache
 
-from utils.taskqueue import job
+from utils.taskqueue import job, Job
 from utils.text import fmt
 from videos.tasks import video_changed_tasks
 
-@job
+@job(coalesce=True)
 def invalidate_video_caches(team_id):
     """Invalidate all TeamVideo caches for all the given team's videos."""
-    from teams.models import Team
-    team = Team.objects.get(pk=team_id)
-    for video_id in team.teamvideo_set.values_list('video__video_id', flat=True):
-        invalidate_video_cache(video_id)
+    invalidate_team_cache(team_id)
 
-@job
+@job(coalesce=True)
 def invalidate_video_moderation_caches(team):
     """Invalidate the moderation status caches for all the given team's videos."""
-    for video_id in team.teamvideo_set.values_list('video__video_id', flat=True):
-        invalidate_video_moderation(video_id)
+    invalidate_team_cache(team.id)
 
 @job
 def update_video_moderation(team):
@@ -43,12 +37,11 @@ def update_video_moderation(team):
     moderated_by = team if team.moderates_videos() else None
     Video.objects.filter(teamvideo__team=team).update(moderated_by=moderated_by)
 
-@job
+@job(coalesce=True)
 def invalidate_video_visibility_caches(team):
-    for video_id in team.teamvideo_set.values_list("video__video_id", flat=True):
-        invalidate_video_visibility(video_id)
+    invalidate_team_cache(team.id)
 
-@job
+@job(coalesce=True)
 def update_video_public_field(team_id):
     from teams.models import Team
 
@@ -132,7 +125,7 @@ def _notify_teams_of_new_videos(team_qs):
                                  context, fail_silently=not settings.DEBUG)
 
 
-@job
+@job(coalesce=True)
 def api_notify_on_subtitles_activity(team_pk, event_name, version_pk):
     from teams.models import TeamNotificationSetting
     from subtitles.models import SubtitleVersion
@@ -141,7 +134,7 @@ def api_notify_on_subtitles_activity(team_pk, event_name, version_pk):
             video_id=version.video.video_id,
             language_pk=version.subtitle_language.pk, version_pk=version_pk)
 
-@job
+@job(coalesce=True)
 def api_notify_on_language_activity(team_pk, event_name, language_pk):
     from teams.models import TeamNotificationSetting
     from subtitles.models import SubtitleLanguage
@@ -149,12 +142,12 @@ def api_notify_on_language_activity(team_pk, event_name, language_pk):
     TeamNotificationSetting.objects.notify_team(
         team_pk, event_name, language_pk=language_pk, video_id=language.video.video_id)
 
-@job
+@job(coalesce=True)
 def api_notify_on_video_activity(team_pk, event_name, video_id):
     from teams.models import TeamNotificationSetting
     TeamNotificationSetting.objects.notify_team(team_pk, event_name, video_id=video_id)
 
-@job
+@job(coalesce=True)
 def api_notify_on_application_activity(team_pk, event_name, application_pk):
     from teams.models import TeamNotificationSetting
     TeamNotificationSetting.objects.notify_team(
@@ -248,3 +241,47 @@ def add_team_videos(team_pk, user_pk, videos):
     send_templated_email(user, "Summary of videos added to team on Amara",
                          'teams/email_videos_added.html',
                          context, fail_silently=not settings.DEBUG)
+
+@job(queue='low', timeout=60*60*4)
+def export_team_subtitles(team_id, formats, project_id=None,
+                          include_merged_dfxp=False):
+    """Export the public subtitles for a team's videos as a ZIP archive
+
+    See subtitles.export.write_zip() for the archive layout.  The archive gets
+    saved to utils.privatestorage.  When running in the worker, we store the
+    progress in the job meta (current/total) and the storage path in
+    export_path once we're done.
+
+    Returns:
+        storage path of the archive
+    """
+    from subtitles import export
+    from teams.models import Team, TeamVideo
+    from utils import dates, privatestorage
+
+    team = Team.objects.get(id=team_id)
+    current_job = Job.get_current()
+    def progress_callback(current, total):
+        if current_job is not None:
+            current_job.update_meta({
+                'current': current,
+                'total': total,
+            })
+
+    team_videos = TeamVideo.objects.filter(team=team)
+    if project_id is not None:
+        team_videos = team_videos.filter(project_id=project_id)
+    video_ids = team_videos.order_by('video_id').values_list('video_id',
+                                                             flat=True)
+    filename = 'team-exports/{}/{}.zip'.format(
+        team.slug, dates.now().strftime('%Y%m%d-%H%M%S'))
+    with tempfile.TemporaryFile() as archive:
+        export.write_zip(archive, video_ids, formats, include_merged_dfxp,
+                         progress_callback)
+        archive.seek(0)
+        path = privatestorage.storage.save(filename, File(archive))
+    if current_job is not None:
+        current_job.update_meta({
+            'export_path': path,
+        })
+    return path
@@ -3,7 +3,9 @@ import collections
 from datetime import datetime, timedelta
 import itertools
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from teams.models import BillingRecord, BillingReport, BillToClient, Task
 from subtitles.pipeline import add_subtitles
@@ -46,6 +48,7 @@ def convert_rows_to_dicts(report_rows):
     Converts each row into a dict, with the keys being the keys from the
     header row.
     """
+    report_rows = list(report_rows)
     header_row = report_rows[0]
     rv = []
     for row in report_rows[1:]:
@@ -554,3 +557,39 @@ class ApprovalReportSubtitleWithNoTimingTest(SimpleApprovalTestCase):
             (None, 200, 'subtitle with no start time'),
             (300, 400, 'subtitle with timing'),
         ])
+
+class ApprovalReportQueryCountTest(SimpleApprovalTestCase):
+    # The number of queries to generate a report shouldn't depend on the
+    # number of tasks in it
+    def add_approved_task(self):
+        team_video = TeamVideoFactory(team=self.team)
+        approve_task = TaskFactory.create_approve(
+            team_video, 'en', self.admin, type='Subtitle')
+        approve_task.complete_approved(self.admin)
+
+    def count_queries(self, report_type):
+        report = BillingReport.objects.create(
+            start_date=self.date_maker.start_date(),
+            end_date=self.date_maker.end_date(),
+            type=report_type)
+        report.teams.add(self.team)
+        with CaptureQueriesContext(connection) as context:
+            rows = list(report.generate_rows())
+        return len(rows), len(context)
+
+    @test_utils.patch_for_test('teams.models.Task.now')
+    def check_query_count(self, mock_now, report_type):
+        mock_now.side_effect = self.date_maker.next_date
+        self.add_approved_task()
+        row_count, query_count = self.count_queries(report_type)
+        for i in xrange(5):
+            self.add_approved_task()
+        row_count2, query_count2 = self.count_queries(report_type)
+        self.assertTrue(row_count2 > row_count)
+        self.assertEquals(query_count2, query_count)
+
+    def test_approval(self):
+        self.check_query_count(BillingReport.TYPE_APPROVAL)
+
+    def test_approval_for_users(self):
+        self.check_query_count(BillingReport.TYPE_APPROVAL_FOR_USERS)
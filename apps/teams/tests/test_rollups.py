@@ -0,0 +1,151 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+import pytest
+
+from subtitles import pipeline
+from teams import bulk_actions, rollups
+from teams.models import (TeamDailyStats, TeamDailyLanguageStats,
+                          TeamDailyUserStats)
+from utils.factories import *
+from utils.test_utils import *
+
+@pytest.fixture
+def video(team):
+    return TeamVideoFactory(team=team).video
+
+def add_member(team, languages):
+    return TeamMemberFactory(team=team,
+                             user=UserFactory(languages=languages))
+
+def test_videos_added(team):
+    mock_now.set('2018-01-01T00:00:00')
+    TeamVideoFactory(team=team)
+    mock_now.set('2018-01-20T00:00:00')
+    TeamVideoFactory(team=team)
+    TeamVideoFactory(team=team)
+    mock_now.set('2018-02-10T00:00:00')
+    assert rollups.videos_added(team) == 3
+    assert team.videos_count_since(30) == 2
+
+def test_members_joined(team):
+    mock_now.set('2018-01-01T00:00:00')
+    add_member(team, ['en', 'fr'])
+    mock_now.set('2018-01-20T00:00:00')
+    add_member(team, ['en'])
+    mock_now.set('2018-02-10T00:00:00')
+    assert team.members_count_since(30) == 1
+    assert sorted(rollups.member_language_counts(team)) == [
+        ('en', 2), ('fr', 1),
+    ]
+    assert rollups.member_language_counts(team, since=30) == [
+        ('en', 1),
+    ]
+
+def test_member_left(team):
+    member = add_member(team, ['en', 'fr'])
+    add_member(team, ['en'])
+    rollups.record_member_left(member)
+    assert rollups.member_language_counts(team) == [('en', 1)]
+
+def test_subtitles(team, video):
+    user = UserFactory()
+    user2 = UserFactory()
+    mock_now.set('2018-01-01T00:00:00')
+    pipeline.add_subtitles(video, 'en', SubtitleSetFactory(), author=user)
+    pipeline.add_subtitles(video, 'en', SubtitleSetFactory(), author=user)
+    rollups.record_subtitles_published(team, 'en')
+    mock_now.set('2018-01-20T00:00:00')
+    pipeline.add_subtitles(video, 'fr', SubtitleSetFactory(), author=user2)
+    mock_now.set('2018-02-10T00:00:00')
+    assert sorted(rollups.subtitle_counts(team)) == [
+        ('en', 2, 1), ('fr', 1, 0),
+    ]
+    assert rollups.subtitle_counts(team, since=30) == [('fr', 1, 0)]
+    assert rollups.top_contributors(team) == [(user.id, 2), (user2.id, 1)]
+    assert rollups.top_contributors(team, since=30) == [(user2.id, 1)]
+
+def test_other_team_subtitles_not_counted(team):
+    video = TeamVideoFactory().video
+    pipeline.add_subtitles(video, 'en', SubtitleSetFactory())
+    assert rollups.subtitle_counts(team) == []
+
+def get_rows(team):
+    return (
+        sorted(TeamDailyStats.objects.filter(team=team)
+               .values_list('date', 'videos_added', 'members_joined')),
+        sorted(TeamDailyLanguageStats.objects.filter(team=team)
+               .values_list('date', 'language_code', 'subtitles_edited',
+                            'members_joined')),
+        sorted(TeamDailyUserStats.objects.filter(team=team)
+               .values_list('date', 'user_id', 'contributions')),
+    )
+
+def test_rebuild(team, video):
+    add_member(team, ['en', 'fr'])
+    user = add_member(team, ['en']).user
+    pipeline.add_subtitles(video, 'en', SubtitleSetFactory(), author=user)
+    pipeline.add_subtitles(video, 'en', SubtitleSetFactory(), author=user)
+    pipeline.add_subtitles(video, 'fr', SubtitleSetFactory(), author=user)
+    incremental_rows = get_rows(team)
+    rollups.rebuild(team)
+    assert get_rows(team) == incremental_rows
+
+def add_moved_video(team, user):
+    team_video = TeamVideoFactory(team=team)
+    pipeline.add_subtitles(team_video.video, 'en', SubtitleSetFactory(),
+                           author=user)
+    pipeline.add_subtitles(team_video.video, 'fr', SubtitleSetFactory(),
+                           author=user)
+    return team_video
+
+def check_counts(team, videos, subtitles, contributors):
+    assert rollups.videos_added(team) == videos
+    assert sorted(rollups.subtitle_counts(team)) == subtitles
+    assert rollups.top_contributors(team) == contributors
+
+def test_move_video(team):
+    other_team = TeamFactory()
+    user = UserFactory()
+    team_video = add_moved_video(team, user)
+    team_video.move_to(other_team)
+    check_counts(team, 0, [], [])
+    check_counts(other_team, 1, [('en', 1, 0), ('fr', 1, 0)], [(user.id, 2)])
+
+def test_bulk_move_videos(team):
+    other_team = TeamFactory()
+    user = UserFactory()
+    team_videos = [add_moved_video(team, user) for i in range(2)]
+    TeamVideoFactory(team=team)
+    bulk_actions.move_videos(team_videos, other_team)
+    check_counts(team, 1, [], [])
+    check_counts(other_team, 2, [('en', 2, 0), ('fr', 2, 0)], [(user.id, 4)])
+
+def test_remove_video(team):
+    user = UserFactory()
+    team_video = add_moved_video(team, user)
+    team_video.remove(user)
+    check_counts(team, 0, [], [])
+
+def test_move_matches_rebuild(team):
+    other_team = TeamFactory()
+    user = UserFactory()
+    add_moved_video(team, user).move_to(other_team)
+    incremental_rows = get_rows(other_team)
+    rollups.rebuild(other_team)
+    assert get_rows(other_team) == incremental_rows
@@ -25,6 +25,7 @@ import mock
 from nose.tools import *
 
 from caching.tests.utils import assert_invalidates_model_cache
+from teams import bulk_actions
 from teams.models import Project, TeamVideoMigration
 from utils import test_utils
 from utils.factories import *
@@ -84,6 +85,63 @@ class TeamMoveTest(TestCase):
         self.check_migration(migrations[2], datetime(2013, 01, 03),
                              self.team, self.team2, self.project2)
 
+class BulkMoveTest(TestCase):
+    def setUp(self):
+        self.team = TeamFactory()
+        self.team2 = TeamFactory()
+        self.project2 = Project.objects.create(team=self.team2,
+                                               name='project2')
+        self.team_videos = [
+            TeamVideoFactory(team=self.team) for i in range(3)
+        ]
+
+    def test_move(self):
+        moved, errors = bulk_actions.move_videos(self.team_videos,
+                                                 self.team2, self.project2)
+        assert_equal(moved, self.team_videos)
+        assert_equal(errors, [])
+        for team_video in self.team_videos:
+            team_video = test_utils.reload_obj(team_video)
+            assert_equal(team_video.team, self.team2)
+            assert_equal(team_video.project, self.project2)
+        assert_equal(
+            TeamVideoMigration.objects.filter(from_team=self.team,
+                                              to_team=self.team2).count(),
+            3)
+
+    def test_default_project(self):
+        bulk_actions.move_videos(self.team_videos, self.team2)
+        for team_video in self.team_videos:
+            assert_equal(test_utils.reload_obj(team_video).project,
+                         self.team2.default_project)
+
+    def test_deletes_tasks(self):
+        task = TaskFactory(team=self.team, team_video=self.team_videos[0])
+        bulk_actions.move_videos(self.team_videos, self.team2)
+        assert_true(test_utils.reload_obj(task).deleted)
+
+    def test_duplicate_url(self):
+        url = self.team_videos[0].video.get_video_url()
+        VideoFactory(team=self.team2, video_url__url=url)
+        moved, errors = bulk_actions.move_videos(self.team_videos,
+                                                 self.team2)
+        assert_equal(moved, self.team_videos[1:])
+        assert_equal([tv for (tv, e) in errors], self.team_videos[:1])
+        assert_equal(test_utils.reload_obj(self.team_videos[0]).team,
+                     self.team)
+
+    def test_same_as_move_to(self):
+        # Compare the bulk path to moving videos one at a time
+        team_video = TeamVideoFactory(team=self.team)
+        team_video.move_to(self.team2, self.project2)
+        bulk_actions.move_videos(self.team_videos, self.team2, self.project2)
+        def video_fields(tv):
+            video = test_utils.reload_obj(tv.video)
+            return (video.is_public, video.moderated_by_id)
+        for bulk_team_video in self.team_videos:
+            assert_equal(video_fields(bulk_team_video),
+                         video_fields(team_video))
+
 class AddPublicVideoTest(TestCase):
     def setUp(self):
         self.user = UserFactory()
@@ -35,9 +35,18 @@ class VideoImporter(object):
         self.checked_entries = 0
         self.last_link = ''
 
-    def import_videos(self, import_next=False):
+    def import_videos(self, import_next=False, content=None, headers=None):
+        """Import videos from the feed
+
+        :param import_next: also import videos from the "next" links
+        :param content: feed data, if we've already downloaded it
+        :param headers: HTTP response headers for content
+        """
         self._created_videos = []
-        feed_parser = FeedParser(self.url)
+        if content is None:
+            feed_parser = FeedParser(self.url)
+        else:
+            feed_parser = FeedParser.from_content(self.url, content, headers)
         # the link at the top of the feed should be the latest link
         try:
             self.last_link = feed_parser.feed.entries[0]['link']
@@ -68,6 +77,7 @@ class VideoImporter(object):
 
     def _create_videos(self, feed_parser):
         from videos.models import VideoUrl
+        from videos.types.youtube import YoutubeVideoType
 
         items = list(feed_parser.items(ignore_error=True))
 
@@ -80,6 +90,14 @@ class VideoImporter(object):
                             .filter(url__in=urls)
                             .values_list('url', flat=True))
 
+        # Fetch the YouTube metadata for all new videos with batched
+        # requests, rather than one request per video in Video.add()
+        YoutubeVideoType.prefetch_video_info([
+            vt for vt, info, entry in items
+            if isinstance(vt, YoutubeVideoType) and
+            vt.convert_to_video_url() not in existing_urls
+        ], self.user, self.team)
+
         for vt, info, entry in items:
             if vt and vt.convert_to_video_url() not in existing_urls:
                 self._create_video(vt, info, entry)
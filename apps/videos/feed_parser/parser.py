@@ -41,11 +41,27 @@ class FeedParser(object):
     See videos.tests.TestFeedParser for details.
     """
 
-    def __init__(self, feed_url):
+    def __init__(self, feed_url, feed=None):
         self.feed_url = feed_url
-        self.feed = feedparser.parse(feed_url)
+        if feed is None:
+            feed = feedparser.parse(feed_url)
+        self.feed = feed
         self.parser = None
 
+    @classmethod
+    def from_content(cls, feed_url, content, headers=None):
+        """Create a FeedParser for feed data that we've already downloaded
+
+        Args:
+            feed_url: URL the data came from, used to resolve relative links
+            content: feed data
+            headers: HTTP response headers
+        """
+        response_headers = dict(headers or {})
+        response_headers.setdefault('content-location', feed_url)
+        return cls(feed_url, feedparser.parse(
+            content, response_headers=response_headers))
+
     def items(self, reverse=False, until=False, since=False, ignore_error=False):
         """
         Iterator witch parse every entry and return VideoType instance if possible and
@@ -0,0 +1,196 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+"""videos.feedscheduler -- Schedule checks for video feeds and YouTube accounts
+
+The feedworker command uses this module to decide when to check each
+VideoFeed and YouTubeAccount.  Most feeds don't change between checks, so we
+try to make unchanged feeds as cheap as possible:
+
+  - We send conditional requests using the ETag and Last-Modified headers
+    from the last response.  A 304 response means there's nothing to do.
+  - We store a hash of the feed content, so that if the server ignores the
+    conditional headers we can still skip parsing a feed that hasn't changed.
+  - The interval between checks adapts to each task.  It's halved when a
+    check finds changes and multiplied by INTERVAL_BACKOFF when it doesn't,
+    staying between FEEDWORKER_MIN_INTERVAL and FEEDWORKER_MAX_INTERVAL.
+
+The schedule is stored in redis.  A sorted set maps task keys to the time they
+should next run and a hash for each task stores the state from its last run.
+Task keys look like "feed:<id>" or "youtube:<id>".
+"""
+
+import hashlib
+import logging
+import random
+import time
+import urlparse
+
+from django.conf import settings
+from django_redis import get_redis_connection
+import requests
+
+from externalsites.models import YouTubeAccount
+from videos.models import VideoFeed
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_KEY = 'feedworker-schedule'
+INTERVAL_BACKOFF = 1.5
+# (connect, read) timeouts for feed requests
+FETCH_TIMEOUT = (10, 60)
+# YouTube accounts get imported using the data API
+YOUTUBE_DOMAIN = 'www.googleapis.com'
+
+# Results from run_task()
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+NOT_MODIFIED = 'not-modified'
+ERROR = 'error'
+
+def _redis():
+    return get_redis_connection('storage')
+
+def state_key(task_key):
+    return 'feedworker-state:{}'.format(task_key)
+
+def current_tasks():
+    """Get the tasks that we should be running
+
+    Returns:
+        dict mapping task keys to the domain that the task fetches from
+    """
+    tasks = {}
+    for feed_id, url in VideoFeed.objects.values_list('id', 'url'):
+        tasks['feed:{}'.format(feed_id)] = urlparse.urlparse(url).netloc
+    account_ids = (YouTubeAccount.objects
+                   .accounts_to_import()
+                   .values_list('id', flat=True))
+    for account_id in account_ids:
+        tasks['youtube:{}'.format(account_id)] = YOUTUBE_DOMAIN
+    return tasks
+
+def sync(task_keys):
+    """Update the schedule to match the current tasks
+
+    New tasks get spread out randomly over FEEDWORKER_PASS_DURATION, so that
+    they don't all run at once when the schedule is empty.  Tasks that are no
+    longer in task_keys get removed.
+    """
+    redis = _redis()
+    task_keys = set(task_keys)
+    scheduled = set(redis.zrange(SCHEDULE_KEY, 0, -1))
+    now = time.time()
+    pipe = redis.pipeline()
+    for task_key in task_keys - scheduled:
+        run_at = now + random.uniform(0, settings.FEEDWORKER_PASS_DURATION)
+        pipe.zadd(SCHEDULE_KEY, **{task_key: run_at})
+    for task_key in scheduled - task_keys:
+        pipe.zrem(SCHEDULE_KEY, task_key)
+        pipe.delete(state_key(task_key))
+    pipe.execute()
+
+def due_tasks(now=None):
+    """Get the keys for tasks that should be run now, most overdue first."""
+    if now is None:
+        now = time.time()
+    return _redis().zrangebyscore(SCHEDULE_KEY, '-inf', now)
+
+def run_task(task_key):
+    """Run a task and schedule its next run
+
+    Returns:
+        CHANGED, UNCHANGED, NOT_MODIFIED, or ERROR
+    """
+    kind, obj_id = task_key.split(':', 1)
+    state = _redis().hgetall(state_key(task_key))
+    try:
+        if kind == 'feed':
+            result = update_video_feed(int(obj_id), state)
+        else:
+            result = update_youtube_account(int(obj_id))
+    except Exception:
+        logger.warn('Error running feedworker task %s', task_key,
+                    exc_info=True)
+        result = ERROR
+    reschedule(task_key, state, result)
+    return result
+
+def reschedule(task_key, state, result):
+    interval = float(state.get('interval') or
+                     settings.FEEDWORKER_PASS_DURATION)
+    if result == CHANGED:
+        interval /= 2
+    elif result != ERROR:
+        interval *= INTERVAL_BACKOFF
+    interval = min(max(interval, settings.FEEDWORKER_MIN_INTERVAL),
+                   settings.FEEDWORKER_MAX_INTERVAL)
+    state['interval'] = interval
+    pipe = _redis().pipeline()
+    pipe.hmset(state_key(task_key), state)
+    pipe.zadd(SCHEDULE_KEY, **{task_key: time.time() + interval})
+    pipe.execute()
+
+def update_video_feed(feed_id, state):
+    """Check a VideoFeed for new videos
+
+    state is the dict stored for the task.  We update its etag, modified and
+    content_hash values.
+    """
+    try:
+        feed = VideoFeed.objects.get(pk=feed_id)
+    except VideoFeed.DoesNotExist:
+        # sync() will remove the task
+        return UNCHANGED
+    headers = {}
+    if state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    if state.get('modified'):
+        headers['If-Modified-Since'] = state['modified']
+    response = requests.get(feed.url, headers=headers, timeout=FETCH_TIMEOUT)
+    if response.status_code == 304:
+        return NOT_MODIFIED
+    response.raise_for_status()
+    content_hash = hashlib.sha1(response.content).hexdigest()
+    if content_hash == state.get('content_hash'):
+        result = UNCHANGED
+    else:
+        new_videos = feed.update(content=response.content,
+                                 headers=response.headers)
+        logger.info('Updated %s (%s new videos)', feed, len(new_videos))
+        result = CHANGED
+    # Only update the state once the update succeeded, so that we retry the
+    # feed after errors
+    state.update({
+        'etag': response.headers.get('ETag', ''),
+        'modified': response.headers.get('Last-Modified', ''),
+        'content_hash': content_hash,
+    })
+    return result
+
+def update_youtube_account(account_id):
+    try:
+        account = YouTubeAccount.objects.get(id=account_id)
+    except YouTubeAccount.DoesNotExist:
+        return UNCHANGED
+    last_import_video_id = account.last_import_video_id
+    account.import_videos()
+    if account.last_import_video_id == last_import_video_id:
+        return UNCHANGED
+    logger.info('Imported %s', account)
+    return CHANGED
@@ -0,0 +1,62 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from videos.models import VideoUrl
+from videos.types import video_type_registrar
+
+class Command(BaseCommand):
+    help = ("Compare looking up video types by trying every type vs. using "
+            "the registrar's domain index.  URLs come from the VideoUrl "
+            "table.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('-c', '--count', default=10000, type=int,
+                            help='Number of URLs to look up')
+
+    def handle(self, **options):
+        urls = list(VideoUrl.objects
+                    .order_by('-id')
+                    .values_list('url', flat=True)
+                    [:options['count']])
+        self.stdout.write('urls: {}\n'.format(len(urls)))
+
+        def linear():
+            for url in urls:
+                for video_type in video_type_registrar.type_list:
+                    if video_type.matches_video_url(url):
+                        break
+
+        def indexed():
+            index = video_type_registrar.get_index()
+            for url in urls:
+                for video_type in index.candidates(url):
+                    if video_type.matches_video_url(url):
+                        break
+
+        # Note: we only call matches_video_url(), since creating the
+        # VideoType objects can make network requests.
+        for label, func in [('linear', linear), ('indexed', indexed)]:
+            start = time.time()
+            func()
+            elapsed = time.time() - start
+            self.stdout.write('{}: {:.3f}s ({:.1f}us/url)\n'.format(
+                label, elapsed, elapsed * 1000000 / max(len(urls), 1)))
@@ -17,111 +17,145 @@
 # along with this program.  If not, see
 # http://www.gnu.org/licenses/agpl-3.0.html.
 
-from optparse import make_option
+from collections import Counter
 import logging
-import multiprocessing
 import signal
 import sys
+import threading
 import time
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import connection
 
-from externalsites.models import YouTubeAccount
-from videos.models import VideoFeed
+from videos import feedscheduler
 
 logger = logging.getLogger(__name__)
 
+# How often to reload the list of feeds/accounts from the DB
+SYNC_INTERVAL = 5 * 60
+# Max time to wait between checking for due tasks
+POLL_INTERVAL = 5
+
 def commit():
     connection.cursor().execute('COMMIT')
 
 class Command(BaseCommand):
     """
     Long-running process that updates our video feeds
+
+    Tasks get run when videos.feedscheduler says they're due, in a thread for
+    each task.  We limit the total number of tasks running at once, as well
+    as the number for a single domain.
     """
 
     def add_arguments(self, parser):
-        parser.add_argument('-w', '--workers', default=4, type=int)
+        parser.add_argument('-w', '--workers', default=4, type=int,
+                            help='Max number of tasks to run at once')
+        parser.add_argument('--per-domain', type=int,
+                            default=settings.FEEDWORKER_DOMAIN_CONCURRENCY,
+                            help='Max number of tasks to run at once for a '
+                            'single domain')
 
     def handle(self, *args, **options):
-        self.pool = multiprocessing.Pool(options['workers'], init_worker)
+        self.max_workers = options['workers']
+        self.per_domain = options['per_domain']
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        # maps task keys to domains
+        self.domains = {}
+        self.running = {}
+        self.last_sync = None
+        self.current_pass = None
+        self.stopping = False
         signal.signal(signal.SIGINT, self.terminate)
         signal.signal(signal.SIGTERM, self.terminate)
         self.loop()
 
     def loop(self):
-        while True:
-            tasks = self.fetch_tasks()
-            while not tasks:
-                logger.info('no tasks to run, sleeping for 30 seconds')
-                time.sleep(30)
-                tasks = self.fetch_tasks()
-            seconds_per_task = (float(settings.FEEDWORKER_PASS_DURATION) /
-                                len(tasks))
-            for task in tasks:
-                task.schedule(self.pool)
-                time.sleep(seconds_per_task)
-
-    def fetch_tasks(self):
-        video_feeds = VideoFeed.objects.values_list('id', flat=True)
-        youtube_accounts = (YouTubeAccount.objects
-                            .accounts_to_import()
-                            .values_list('id', flat=True))
-        tasks = []
-        tasks.extend(
-            Task(update_video_feed, feed_id)
-            for feed_id in video_feeds
-        )
-        tasks.extend(
-            Task(update_youtube_account, account_id)
-            for account_id in youtube_accounts
-        )
-        commit()
-        return tasks
-
-    def terminate(self, signum, frame):
+        while not self.stopping:
+            if (self.last_sync is None or
+                    time.time() - self.last_sync > SYNC_INTERVAL):
+                self.sync()
+            with self.lock:
+                self.start_due_tasks()
+                if self.current_pass and not self.running:
+                    self.current_pass.report()
+                    self.current_pass = None
+            self.wakeup.wait(POLL_INTERVAL)
+            self.wakeup.clear()
         logger.info('terminating')
+        # Wait for the running tasks to finish
+        while self.running:
+            time.sleep(0.5)
         sys.stdout.flush()
-        self.pool.close()
-        self.pool.join()
         raise SystemExit(1)
 
-class Task(object):
-    """Container for a single task that we perform."""
-    def __init__(self, func, *args):
-        self.func = func
-        self.args = args
-
-    def schedule(self, pool):
-        pool.apply_async(self.func, args=self.args)
-
-def init_worker():
-    signal.signal(signal.SIGINT, signal.SIG_IGN)
-
-def update_video_feed(feed_id):
-    try:
-        video_feed = VideoFeed.objects.get(pk=feed_id)
-        video_feed.update()
-    except VideoFeed.DoesNotExist:
-        logger.info('update_video_feed: VideoFeed does not exist. '
-                    'ID: %s'.format(feed_id))
-    else:
-        logger.info('Updated {}'.format(video_feed))
-    commit()
-    sys.stdout.flush()
-
-def update_youtube_account(account_id):
-    try:
-        account = YouTubeAccount.objects.get(id=account_id)
-        account.import_videos()
-    except YouTubeAccount.DoesNotExist:
-        logger.info("update_youtube_account: "
-              "YouTubeAccount.DoesNotExist ({})".format(account_id))
-    else:
-        logger.info('Imported {}'.format(account))
-    commit()
-    sys.stdout.flush()
-
-if __name__ == "__main__":
-    main()
+    def sync(self):
+        self.domains = feedscheduler.current_tasks()
+        feedscheduler.sync(self.domains.keys())
+        commit()
+        self.last_sync = time.time()
+        if not self.domains:
+            logger.info('no tasks to run')
+
+    def start_due_tasks(self):
+        domain_counts = Counter(self.running.values())
+        for task_key in feedscheduler.due_tasks():
+            if len(self.running) >= self.max_workers:
+                break
+            if task_key in self.running or task_key not in self.domains:
+                continue
+            domain = self.domains[task_key]
+            if domain_counts[domain] >= self.per_domain:
+                continue
+            if self.current_pass is None:
+                self.current_pass = Pass()
+            self.running[task_key] = domain
+            domain_counts[domain] += 1
+            thread = threading.Thread(target=self.run_task, args=(task_key,))
+            thread.daemon = True
+            thread.start()
+
+    def run_task(self, task_key):
+        result = feedscheduler.ERROR
+        try:
+            result = feedscheduler.run_task(task_key)
+        except Exception:
+            logger.error('Error running %s', task_key, exc_info=True)
+        finally:
+            connection.close()
+            with self.lock:
+                del self.running[task_key]
+                if self.current_pass:
+                    self.current_pass.record(result)
+            self.wakeup.set()
+            sys.stdout.flush()
+
+    def terminate(self, signum, frame):
+        self.stopping = True
+        self.wakeup.set()
+
+class Pass(object):
+    """Tracks a pass of the feedworker
+
+    A pass starts when we run the first due task and ends when there are no
+    more tasks running.
+    """
+    def __init__(self):
+        self.start = time.time()
+        self.results = Counter()
+
+    def record(self, result):
+        self.results[result] += 1
+
+    def report(self):
+        logger.info(
+            'Pass complete: %s tasks in %.1f seconds (%s changed, '
+            '%s unchanged, %s not modified, %s errors)',
+            sum(self.results.values()), time.time() - self.start,
+            self.results[feedscheduler.CHANGED],
+            self.results[feedscheduler.UNCHANGED],
+            self.results[feedscheduler.NOT_MODIFIED],
+            self.results[feedscheduler.ERROR])
+        sys.stdout.flush()
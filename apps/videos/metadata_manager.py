@@ -16,58 +16,76 @@
 # along with this program.  If not, see
 # http://www.gnu.org/licenses/agpl-3.0.html.
 
+"""videos.metadata_manager -- Recalculate the derived fields for a video
+
+update_metadata() recalculates is_public, is_subtitled, was_subtitled,
+languages_count and complete_date.  It fetches all the data it needs with a
+single query for the video's languages, then writes the changed columns with
+a single UPDATE statement.
+"""
+
 from datetime import datetime
 
-def update_metadata(video_pk):
-    from videos.models import Video
-    video = Video.objects.get(pk=video_pk)
-    video.edited = datetime.now()
-    video.save()
-    _update_is_public(video)
-    _update_is_was_subtitled(video)
-    _update_languages_count(video)
-    _update_complete_date(video)
+def update_metadata(video_pk, update_search_index=False):
+    """Recalculate the derived fields for a video
+
+    Args:
+        video_pk: PK of the video to update
+        update_search_index: Also recalculate search_text
+    """
+    from videos.models import Video, MAX_SEACH_TEXT_LENGTH
+    video = Video.objects.select_related('teamvideo__team').get(pk=video_pk)
+    languages = list(video.newsubtitlelanguage_set.annotate_nonempty_tip())
+
+    changes = {
+        'edited': datetime.now(),
+    }
+    changes.update(_calc_is_public(video))
+    changes.update(_calc_is_was_subtitled(video, languages))
+    changes.update(_calc_languages_count(video, languages))
+    changes.update(_calc_complete_date(video, languages))
+    if update_search_index:
+        changes['search_text'] = video.calc_search_text(MAX_SEACH_TEXT_LENGTH)
+    # Only write the columns that changed
+    changes = dict((name, value) for name, value in changes.items()
+                   if name == 'edited' or getattr(video, name) != value)
+    Video.objects.filter(pk=video.pk).update(**changes)
     _invalidate_cache(video)
 
-def _update_is_was_subtitled(video):
-    from subtitles.models import SubtitleLanguage
+def _calc_is_was_subtitled(video, languages):
     language_code = video.primary_audio_language_code
-    has_version = (SubtitleLanguage.objects.having_nonempty_tip()
-                                           .filter(video=video, 
-                                                   language_code=language_code)
-                                           .exists())
-
+    has_version = any(l.has_nonempty_tip and l.language_code == language_code
+                      for l in languages)
     if not has_version:
-        if video.is_subtitled:
-            video.is_subtitled = False
-            video.save()
+        return {'is_subtitled': False}
     else:
-        if not video.is_subtitled or not video.was_subtitled:
-            video.is_subtitled = True
-            video.was_subtitled = True
-            video.save()
+        return {'is_subtitled': True, 'was_subtitled': True}
 
-def _update_languages_count(video):
-    video.languages_count = video.newsubtitlelanguage_set.having_nonempty_tip().count()
-    video.save()
+def _calc_languages_count(video, languages):
+    return {
+        'languages_count': len([l for l in languages if l.has_nonempty_tip]),
+    }
 
-def _update_complete_date(video):
-    is_complete = video.is_complete
+def _calc_complete_date(video, languages):
+    # Only check is_complete_and_synced() for languages marked complete, since
+    # it needs to load the subtitles
+    is_complete = any(l.is_complete_and_synced()
+                      for l in languages if l.subtitles_complete)
     if is_complete and video.complete_date is None:
-        video.complete_date = datetime.now()
-        video.save()
+        return {'complete_date': datetime.now()}
     elif not is_complete and video.complete_date is not None:
-        video.complete_date = None
-        video.save()
+        return {'complete_date': None}
+    else:
+        return {}
 
 def _invalidate_cache(video):
     from widget import video_cache
     video_cache.invalidate_cache(video.video_id)
+    video.cache.invalidate()
 
-def _update_is_public(video):
+def _calc_is_public(video):
     team_video = video.get_team_video()
     if team_video:
-        video.is_public = team_video.team.videos_public()
+        return {'is_public': team_video.team.videos_public()}
     else:
-        video.is_public = True
-    video.save()
+        return {'is_public': True}
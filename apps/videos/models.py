@@ -60,7 +60,7 @@ from utils import translation
 from utils.amazon import S3EnabledImageField
 from utils.panslugify import pan_slugify
 from utils.searching import get_terms
-from utils.subtitles import create_new_subtitles, dfxp_merge
+from utils.subtitles import create_new_subtitles
 from utils.text import fmt
 from utils.url_escape import url_escape
 from teams.moderation_const import MODERATION_STATUSES, UNMODERATED
@@ -1187,21 +1187,8 @@ class Video(models.Model):
 
     def get_merged_dfxp(self):
         """Get a DFXP file containing subtitles for all languages."""
-        self.prefetch_languages(with_public_tips=True)
-
-        subtitle_sets = []
-        for language in self.all_subtitle_languages():
-            tip = language.get_public_tip()
-            if tip is not None:
-                if language.is_primary_audio_language():
-                    subtitle_sets.insert(0, tip.get_subtitles())
-                else:
-                    subtitle_sets.append(tip.get_subtitles())
-
-        if len(subtitle_sets) > 0:
-            return dfxp_merge(subtitle_sets)
-        else:
-            return None
+        from subtitles import export
+        return export.get_merged_dfxp(self)
 
     def version(self, version_number=None, language=None, public_only=True):
         """Return the SubtitleVersion for this video matching the given criteria.
@@ -2389,10 +2376,16 @@ class VideoFeed(models.Model):
     def domain(self):
         return urlparse.urlparse(self.url).netloc
 
-    def update(self):
+    def update(self, content=None, headers=None):
+        """Import new videos from the feed
+
+        Pass content/headers if the feed has already been downloaded (see
+        videos.feedscheduler).
+        """
         importer = VideoImporter(self.url, self.user, self.team)
         new_videos = importer.import_videos(
-            import_next=self.last_update is None)
+            import_next=self.last_update is None, content=content,
+            headers=headers)
 
         self.last_update = VideoFeed.now()
         self.save()
@@ -2415,12 +2408,10 @@ class ImportedVideo(models.Model):
 
 class VideoTypeUrlPatternManager(models.Manager):
     def patterns_for_type(self, type):
-        cache_key = 'videotypepattern:{0}'.format(type)
-        patterns = cache.get(cache_key)
-        if patterns is None:
-            patterns = self.filter(type=type)
-            cache.set(cache_key, patterns)
-        return patterns
+        # Note: for matching URLs, use
+        # video_type_registrar.url_patterns_for_type(), which keeps the
+        # patterns in memory.
+        return self.filter(type=type)
 
 class VideoTypeUrlPattern(models.Model):
     type = models.CharField(max_length=2)
@@ -338,7 +338,7 @@ def _get_related_task(request):
 
 def activity(request, video_id):
     video = get_object_or_404(Video, video_id=video_id)
-    qs = ActivityRecord.objects.for_video(video)
+    qs = ActivityRecord.objects.for_video(video).with_related_objects()
 
     extra_context = {
         'video': video,
@@ -21,9 +21,10 @@ from django.db.models.signals import post_save, post_delete, m2m_changed
 
 from activity.models import ActivityRecord
 from subtitles.models import SubtitleLanguage, SubtitleVersion
-from videos.models import Video, VideoUrl
+from videos.models import Video, VideoUrl, VideoTypeUrlPattern
 from videos import signals
 from videos import tasks
+from videos import types
 
 @receiver(post_save, sender=SubtitleLanguage)
 @receiver(post_save, sender=SubtitleVersion)
@@ -47,6 +48,11 @@ def on_video_followers_changed(instance, reverse, **kwargs):
         for video in instance.followed_videos.all():
             video.cache.invalidate()
 
+@receiver(post_save, sender=VideoTypeUrlPattern)
+@receiver(post_delete, sender=VideoTypeUrlPattern)
+def on_video_type_url_pattern_change(sender, instance, **kwargs):
+    types.base.url_patterns_changed()
+
 @receiver(signals.video_added)
 def on_video_added(sender, video_url, **kwargs):
     tasks.save_thumbnail_in_s3.delay(sender.pk)
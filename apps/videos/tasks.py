@@ -31,6 +31,7 @@ from videos.models import (VideoFeed, Video, VIDEO_TYPE_YOUTUBE, VideoUrl)
 from subtitles.models import (
     SubtitleLanguage, SubtitleVersion
 )
+from subtitles import rendercache
 from auth.models import CustomUser as User
 from utils.taskqueue import job
 from videos.types import video_type_registrar
@@ -39,6 +40,9 @@ from videos.types import VideoTypeError
 
 logger = logging.getLogger(__name__)
 
+# Delay before updating video metadata after a change
+METADATA_UPDATE_DELAY = 10
+
 @job
 def cleanup():
     import datetime
@@ -74,13 +78,11 @@ def update_video_feed(video_feed_id):
             '**update_video_feed**. VideoFeed does not exist. ID: %s',
             video_feed_id)
 
-@job
+@job(coalesce=True)
 def video_changed_tasks(video_pk, new_version_id=None):
-    from videos import metadata_manager
-    from videos.models import Video
     from teams.models import TeamVideo, BillingRecord
 
-    metadata_manager.update_metadata(video_pk)
+    update_video_metadata.delay(video_pk)
     if new_version_id is not None:
         send_new_version_notification(new_version_id)
         try:
@@ -90,9 +92,35 @@ def video_changed_tasks(video_pk, new_version_id=None):
             logger.error("Could not add billing record", extra={
                 "version_pk": new_version_id,
                 "exception": str(e)})
+        warm_subtitle_render_cache(new_version_id)
+
+@job(debounce=METADATA_UPDATE_DELAY)
+def update_video_metadata(video_pk):
+    """Update the metadata and search index for a video
+
+    Edits often come in bursts, so this is debounced: it runs once,
+    METADATA_UPDATE_DELAY seconds after the last delay() call for a video.
+    """
+    from videos import metadata_manager
+    try:
+        metadata_manager.update_metadata(video_pk, update_search_index=True)
+    except Video.DoesNotExist:
+        # Video deleted before the job ran
+        pass
 
-    video = Video.objects.get(pk=video_pk)
-    video.update_search_index()
+def warm_subtitle_render_cache(version_id):
+    """Pre-render newly published subtitles in the commonly used formats."""
+    try:
+        version = SubtitleVersion.objects.get(pk=version_id)
+    except SubtitleVersion.DoesNotExist:
+        return
+    if not version.is_public():
+        return
+    formats = settings.SUBTITLE_RENDER_CACHE_WARM_FORMATS
+    # Warm both the API output and the download output, which passes the
+    # language code to babelsubs
+    rendercache.warm(version, formats)
+    rendercache.warm(version, formats, language=version.language_code)
 
 @job
 def subtitles_complete_changed(language_pk):
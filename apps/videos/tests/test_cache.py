@@ -17,11 +17,16 @@
 # http://www.gnu.org/licenses/agpl-3.0.html.
 
 from django.test import TestCase
+from nose.tools import *
+import mock
 
 from caching.tests.utils import assert_invalidates_model_cache
 from subtitles import pipeline
 from subtitles.models import SubtitleLanguage
+from utils import test_utils
 from utils.factories import *
+from videos.models import VideoUrl
+from widget import video_cache
 
 class VideoCacheInvalidationTest(TestCase):
     # test a bunch of actions that should invalidate the video cache
@@ -83,3 +88,61 @@ class VideoCacheInvalidationTest(TestCase):
         self.video.followers.add(user)
         with assert_invalidates_model_cache(self.video):
             self.video.followers.remove(user)
+
+class WidgetVideoCacheTest(TestCase):
+    def setUp(self):
+        test_utils.invalidate_widget_video_cache.run_original_for_test()
+        self.team = TeamFactory()
+        self.video = TeamVideoFactory(team=self.team).video
+        self.other_video = VideoFactory()
+
+    def change_urls(self, video):
+        # Use update() so that we don't trigger any invalidation
+        VideoUrl.objects.filter(video=video).update(
+            url='http://example.com/changed-{}.mp4'.format(video.id))
+
+    def check_invalidated(self, video, invalidated):
+        urls = video_cache.get_video_urls(video.video_id)
+        changed_url = 'http://example.com/changed-{}.mp4'.format(video.id)
+        assert_equal(urls == [changed_url], invalidated)
+
+    def test_invalidate_cache(self):
+        video_cache.get_video_urls(self.video.video_id)
+        video_cache.get_video_urls(self.other_video.video_id)
+        self.change_urls(self.video)
+        self.change_urls(self.other_video)
+        video_cache.invalidate_cache(self.video.video_id)
+        self.check_invalidated(self.video, True)
+        self.check_invalidated(self.other_video, False)
+
+    def test_invalidate_team_cache(self):
+        video_cache.get_video_urls(self.video.video_id)
+        video_cache.get_video_urls(self.other_video.video_id)
+        self.change_urls(self.video)
+        self.change_urls(self.other_video)
+        video_cache.invalidate_team_cache(self.team.id)
+        self.check_invalidated(self.video, True)
+        self.check_invalidated(self.other_video, False)
+
+    def test_video_id_lookup(self):
+        url = self.video.get_video_url()
+        assert_equal(video_cache.get_video_id(url), self.video.video_id)
+        with mock.patch('videos.models.Video.add') as mock_add:
+            assert_equal(video_cache.get_video_id(url), self.video.video_id)
+            assert_equal(mock_add.call_count, 0)
+            # invalidating the video should invalidate the URL lookup as well
+            video_cache.invalidate_cache(self.video.video_id)
+            mock_add.return_value = (self.video, None)
+            video_cache.get_video_id(url)
+            assert_equal(mock_add.call_count, 1)
+
+    def test_invalidation_cost(self):
+        # Invalidation should be a single cache operation, regardless of how
+        # many languages/urls/videos are involved.
+        for i in range(5):
+            VideoURLFactory(video=self.video)
+            TeamVideoFactory(team=self.team)
+        with mock.patch('widget.video_cache.cache') as mock_cache:
+            video_cache.invalidate_cache(self.video.video_id)
+            video_cache.invalidate_team_cache(self.team.id)
+        assert_equal(len(mock_cache.method_calls), 2)
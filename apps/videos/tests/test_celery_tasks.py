@@ -23,7 +23,11 @@ from BeautifulSoup import BeautifulSoup
 from babelsubs.storage import SubtitleSet
 from django.contrib.contenttypes.models import ContentType
 from django.core import mail
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from nose.tools import *
+import mock
 
 from auth.models import CustomUser as User
 from comments.forms import CommentForm
@@ -34,7 +38,9 @@ from subtitles.models import (
     SubtitleLanguage, SubtitleVersion
 )
 from subtitles import pipeline
+from utils import test_utils
 from utils.factories import *
+from videos import metadata_manager, tasks
 from videos.tasks import video_changed_tasks, send_change_title_email, send_new_version_notification
 
 class SendChangeTitleTaskTest(TestCase):
@@ -192,3 +198,40 @@ class TestVideoChangedEmailNotification(TestCase):
             self.assertEqual(old_version_changes, [u'2', u'', u''])
             self.assertEqual(new_version_changes, [u'2 changed',  u'new sub', u'no sync',])
 
+
+class UpdateMetadataTest(TestCase):
+    def setUp(self):
+        self.video = VideoFactory(primary_audio_language_code='en')
+
+    def test_update_metadata(self):
+        pipeline.add_subtitles(self.video, 'en', SubtitleSetFactory(),
+                               complete=True)
+        pipeline.add_subtitles(self.video, 'fr', SubtitleSetFactory())
+        pipeline.add_subtitles(self.video, 'de', SubtitleSetFactory(num_subs=0))
+        metadata_manager.update_metadata(self.video.pk)
+        video = Video.objects.get(pk=self.video.pk)
+        assert_equal(video.languages_count, 2)
+        assert_true(video.is_subtitled)
+        assert_true(video.was_subtitled)
+        assert_not_equal(video.complete_date, None)
+
+    def test_single_update(self):
+        pipeline.add_subtitles(self.video, 'en', SubtitleSetFactory())
+        with CaptureQueriesContext(connection) as context:
+            metadata_manager.update_metadata(self.video.pk)
+        updates = [q['sql'] for q in context.captured_queries
+                   if q['sql'].startswith('UPDATE')]
+        assert_equal(len(updates), 1)
+
+class VideoChangedTasksTest(TestCase):
+    def setUp(self):
+        test_utils.video_changed_tasks.run_original_for_test()
+        self.video = VideoFactory()
+
+    def test_schedules_metadata_update(self):
+        with mock.patch.object(tasks.update_video_metadata,
+                               'delay') as mock_delay:
+            video_changed_tasks(self.video.pk)
+        assert_equal(mock_delay.call_args, mock.call(self.video.pk))
+        assert_equal(tasks.update_video_metadata.job_options.debounce,
+                     tasks.METADATA_UPDATE_DELAY)
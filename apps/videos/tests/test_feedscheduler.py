@@ -0,0 +1,159 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django_redis import get_redis_connection
+from nose.tools import *
+import mock
+
+from utils import test_utils
+from utils.factories import *
+from videos import feedscheduler
+from videos.models import VideoFeed
+
+def make_response(status_code=200, content='feed-data', headers=None):
+    response = mock.Mock(status_code=status_code, content=content,
+                         headers=headers or {})
+    return response
+
+@override_settings(FEEDWORKER_PASS_DURATION=1000,
+                   FEEDWORKER_MIN_INTERVAL=100,
+                   FEEDWORKER_MAX_INTERVAL=3000)
+class FeedSchedulerTest(TestCase):
+    @test_utils.patch_for_test('videos.feedscheduler.requests')
+    @test_utils.patch_for_test('videos.models.VideoFeed.update')
+    @test_utils.patch_for_test('videos.feedscheduler.time')
+    def setUp(self, mock_time, mock_update, mock_requests):
+        mock_time.time.return_value = 10000
+        self.mock_update = mock_update
+        self.mock_update.return_value = []
+        self.mock_get = mock_requests.get
+        self.mock_get.return_value = make_response(headers={
+            'ETag': '"abc"',
+            'Last-Modified': 'Mon, 01 Jan 2018 00:00:00 GMT',
+        })
+        self.feed = VideoFeedFactory(url='http://example.com/feed.rss')
+        self.task_key = 'feed:{}'.format(self.feed.id)
+        self.redis = get_redis_connection('storage')
+
+    def run_task(self):
+        return feedscheduler.run_task(self.task_key)
+
+    def get_state(self):
+        return self.redis.hgetall(feedscheduler.state_key(self.task_key))
+
+    def get_interval(self):
+        return float(self.get_state()['interval'])
+
+    def test_current_tasks(self):
+        assert_equal(feedscheduler.current_tasks(), {
+            self.task_key: 'example.com',
+        })
+
+    def test_sync(self):
+        feedscheduler.sync([self.task_key, 'feed:other'])
+        score = self.redis.zscore(feedscheduler.SCHEDULE_KEY, self.task_key)
+        assert_true(10000 <= score <= 11000)
+        feedscheduler.sync([self.task_key])
+        assert_equal(self.redis.zrange(feedscheduler.SCHEDULE_KEY, 0, -1),
+                     [self.task_key])
+
+    def test_due_tasks(self):
+        feedscheduler.sync([self.task_key])
+        assert_equal(feedscheduler.due_tasks(now=9999), [])
+        assert_equal(feedscheduler.due_tasks(now=11001), [self.task_key])
+
+    def test_first_run(self):
+        assert_equal(self.run_task(), feedscheduler.CHANGED)
+        assert_equal(self.mock_get.call_args,
+                     mock.call(self.feed.url, headers={},
+                               timeout=feedscheduler.FETCH_TIMEOUT))
+        assert_equal(self.mock_update.call_args,
+                     mock.call(content='feed-data',
+                               headers=self.mock_get.return_value.headers))
+
+    def test_conditional_request(self):
+        self.run_task()
+        self.mock_get.return_value = make_response(304, '')
+        self.mock_update.reset_mock()
+        assert_equal(self.run_task(), feedscheduler.NOT_MODIFIED)
+        assert_equal(self.mock_get.call_args[1]['headers'], {
+            'If-None-Match': '"abc"',
+            'If-Modified-Since': 'Mon, 01 Jan 2018 00:00:00 GMT',
+        })
+        assert_false(self.mock_update.called)
+
+    def test_content_hash(self):
+        # If the server doesn't support conditional requests, we should still
+        # skip parsing the feed if the content is the same.
+        self.mock_get.return_value = make_response()
+        self.run_task()
+        self.mock_update.reset_mock()
+        assert_equal(self.run_task(), feedscheduler.UNCHANGED)
+        assert_false(self.mock_update.called)
+        self.mock_get.return_value = make_response(content='new-feed-data')
+        assert_equal(self.run_task(), feedscheduler.CHANGED)
+        assert_true(self.mock_update.called)
+
+    def test_retry_after_error(self):
+        self.mock_update.side_effect = ValueError()
+        assert_equal(self.run_task(), feedscheduler.ERROR)
+        # We shouldn't have stored the ETag/content hash, since we didn't
+        # finish importing the feed
+        self.mock_update.side_effect = None
+        self.mock_update.reset_mock()
+        assert_equal(self.run_task(), feedscheduler.CHANGED)
+        assert_equal(self.mock_get.call_args[1]['headers'], {})
+
+    def test_http_error(self):
+        response = make_response(500)
+        response.raise_for_status.side_effect = ValueError()
+        self.mock_get.return_value = response
+        assert_equal(self.run_task(), feedscheduler.ERROR)
+        assert_false(self.mock_update.called)
+
+    def test_adaptive_interval(self):
+        # changed: interval gets halved
+        self.run_task()
+        assert_equal(self.get_interval(), 500)
+        assert_equal(self.redis.zscore(feedscheduler.SCHEDULE_KEY,
+                                       self.task_key), 10500)
+        # unchanged: interval grows by INTERVAL_BACKOFF
+        self.run_task()
+        assert_equal(self.get_interval(), 750)
+        # the interval stays within the min/max
+        for i in range(10):
+            self.run_task()
+        assert_equal(self.get_interval(), 3000)
+        for i in range(10):
+            self.mock_get.return_value = make_response(
+                content='feed-data-{}'.format(i))
+            self.run_task()
+        assert_equal(self.get_interval(), 100)
+
+    def test_error_keeps_interval(self):
+        self.run_task()
+        self.mock_get.side_effect = ValueError()
+        assert_equal(self.run_task(), feedscheduler.ERROR)
+        assert_equal(self.get_interval(), 500)
+
+    def test_deleted_feed(self):
+        self.feed.delete()
+        assert_equal(self.run_task(), feedscheduler.UNCHANGED)
+        assert_false(self.mock_get.called)
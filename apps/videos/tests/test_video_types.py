@@ -30,7 +30,7 @@ from teams.models import Team, TeamVideo
 from subtitles import pipeline
 from subtitles.models import SubtitleLanguage, SubtitleVersion
 from utils.factories import UserFactory
-from videos.models import Video, VIDEO_TYPE_BRIGHTCOVE
+from videos.models import Video, VideoTypeUrlPattern, VIDEO_TYPE_BRIGHTCOVE
 from videos.types import video_type_registrar, VideoTypeError
 from videos.types.base import VideoType, VideoTypeRegistrar
 from videos.types.brightcove  import BrightcoveVideoType
@@ -245,6 +245,50 @@ class VideoTypeRegistrarTest(TestCase):
         self.assertRaises(VideoTypeError, video_type_registrar.video_type_for_url,
                           'http://youtube.com/v=100500')
 
+    def test_video_types_for_urls(self):
+        types = video_type_registrar.video_types_for_urls([
+            'http://youtube.com/v=UOtJUmiUZ08',
+            'some url',
+            'http://vimeo.com/12345',
+            'http://example.com/video.mp4',
+        ])
+        self.assertTrue(isinstance(types[0], YoutubeVideoType))
+        self.assertEqual(types[1], None)
+        self.assertTrue(isinstance(types[2], VimeoVideoType))
+        self.assertTrue(isinstance(types[3], HtmlFiveVideoType))
+
+    def test_registration_order(self):
+        # If multiple types match a URL, the first one registered should win,
+        # even if it's indexed by domain.
+        url = 'http://vimeo.com/12345/video.mp4'
+        self.assertTrue(VimeoVideoType.matches_video_url(url))
+        self.assertTrue(isinstance(
+            video_type_registrar.video_type_for_url(url), HtmlFiveVideoType))
+
+    def test_candidates(self):
+        index = video_type_registrar.get_index()
+        candidates = index.candidates('http://www.youtube.com/watch?v=abc')
+        self.assertIn(YoutubeVideoType, candidates)
+        self.assertIn(HtmlFiveVideoType, candidates)
+        self.assertNotIn(VimeoVideoType, candidates)
+        self.assertNotIn(DailymotionVideoType, candidates)
+        # We can't tell the domain, so we need to try all types
+        self.assertEqual(index.candidates('some url'),
+                         video_type_registrar.type_list)
+
+    @test_utils.patch_for_test('videos.types.brightcove.BrightcoveVideoType._resolve_url_redirects')
+    def test_url_patterns(self, resolve_url_redirects):
+        resolve_url_redirects.side_effect = lambda url: url
+        url = 'http://videos.example.com/player?bctid=5678'
+        self.assertEqual(video_type_registrar.video_type_for_url(url), None)
+        pattern = VideoTypeUrlPattern.objects.create(
+            type='C', url_pattern='http://videos.example.com/')
+        self.assertTrue(isinstance(
+            video_type_registrar.video_type_for_url(url),
+            BrightcoveVideoType))
+        pattern.delete()
+        self.assertEqual(video_type_registrar.video_type_for_url(url), None)
+
 class BrightcoveVideoTypeTest(TestCase):
     player_id = '1234'
     video_id = '5678'
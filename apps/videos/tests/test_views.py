@@ -27,8 +27,11 @@ from django.core import mail
 from django.core.cache import cache
 from django.urls import reverse
 from django.db.models import ObjectDoesNotExist
+from django.http import Http404
 from django.test import TestCase
+from nose.tools import *
 
+from activity.models import ActivityRecord
 from auth.models import CustomUser as User
 from subtitles import pipeline
 from teams.models import Task
@@ -183,3 +186,53 @@ class TestViews(WebUseTest):
 
     def test_policy_page(self):
         self._simple_test('policy_page')
+
+class ActivityTabTest(TestCase):
+    def setUp(self):
+        self.video = VideoFactory()
+        self.user = UserFactory()
+        ActivityRecord.objects.all().delete()
+        for i in range(20):
+            ActivityRecord.objects.create_for_video_title_edited(self.video,
+                                                                 self.user)
+        self.qs = ActivityRecord.objects.for_video(self.video)
+        self.records = list(self.qs.order_by('-created', '-id'))
+        assert_equal(len(self.records), 20)
+
+    def render_page(self, cursor=None):
+        return views.render_activity_page(self.video, self.qs, 'test-key',
+                                          cursor)
+
+    def row_count(self, html):
+        return len(BeautifulSoup(html).findAll('tr'))
+
+    def test_pages(self):
+        html, cursor = self.render_page()
+        assert_equal(self.row_count(html), views.ACTIVITY_PER_PAGE)
+        assert_equal(cursor, views._activity_cursor(self.records[7]))
+
+        html, cursor = self.render_page(cursor)
+        assert_equal(self.row_count(html), views.ACTIVITY_PER_PAGE)
+        assert_equal(cursor, views._activity_cursor(self.records[15]))
+
+        html, cursor = self.render_page(cursor)
+        assert_equal(self.row_count(html), 4)
+        assert_equal(cursor, None)
+
+    def test_cache(self):
+        first_page = self.render_page()
+        with self.assertNumQueries(0):
+            assert_equal(self.render_page(), first_page)
+
+    def test_new_record_invalidates_cache(self):
+        html, cursor = self.render_page()
+        ActivityRecord.objects.create_for_video_title_edited(self.video,
+                                                             self.user)
+        # Use a new Video object, like we would for the next request
+        self.video = test_utils.reload_obj(self.video)
+        html, cursor = self.render_page()
+        assert_equal(cursor, views._activity_cursor(self.records[6]))
+
+    def test_invalid_cursor(self):
+        with assert_raises(Http404):
+            self.render_page('invalid')
@@ -17,10 +17,11 @@
 # http://www.gnu.org/licenses/agpl-3.0.html.
 
 from urlparse import urlparse
-import subprocess, sys, uuid, os
+import subprocess, sys, time, uuid, os
 import requests
 import logging
 
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.conf import settings
 
@@ -32,6 +33,11 @@ class VideoType(object):
 
     abbreviation = None
     name = None    
+    # Domains that matches_video_url() can match.  URLs match a domain if
+    # their hostname ends with it.  None means that we can match any domain.
+    # VideoTypeRegistrar uses this to avoid calling matches_video_url() for
+    # URLs that can't match.
+    url_domains = None
 
     CAN_IMPORT_SUBTITLES = False
 
@@ -148,14 +154,78 @@ class VideoType(object):
     def format_url(cls, url):
         return url.strip()
     
+# Cache key that changes when VideoTypeUrlPattern rows change
+URL_PATTERN_GENERATION_KEY = 'videotypepattern-generation'
+
+def url_patterns_changed():
+    """Call this when VideoTypeUrlPattern rows are added/changed/deleted."""
+    from videos.types import video_type_registrar
+    cache.set(URL_PATTERN_GENERATION_KEY, uuid.uuid4().hex, None)
+    video_type_registrar.invalidate_index()
+
+def _url_hostname(url):
+    try:
+        return urlparse(url.strip()).hostname
+    except ValueError:
+        return None
+
+class VideoTypeIndex(object):
+    """Maps URLs to the video types that could match them
+
+    We index video types by their url_domains, plus the hostnames of any
+    VideoTypeUrlPattern rows for them.  Looking up a URL means a dict lookup
+    for each suffix of its hostname.  The candidates are returned in
+    registration order, so that the first match wins just like it would if
+    we tried every type.
+    """
+    def __init__(self, type_list, url_patterns):
+        self.type_list = type_list
+        self.url_patterns = url_patterns
+        self.any_domain = []
+        self.domain_map = {}
+        for position, video_type in enumerate(type_list):
+            if video_type.url_domains is None:
+                self.any_domain.append(position)
+                continue
+            domains = list(video_type.url_domains)
+            for pattern in url_patterns.get(video_type.abbreviation, []):
+                hostname = _url_hostname(pattern)
+                if hostname:
+                    domains.append(hostname)
+            for domain in domains:
+                self.domain_map.setdefault(domain.lower(), []).append(
+                    position)
+        self._candidate_cache = {}
+
+    def candidates(self, url):
+        """Get the video types that could match a URL."""
+        hostname = _url_hostname(url)
+        if not hostname:
+            return self.type_list
+        try:
+            return self._candidate_cache[hostname]
+        except KeyError:
+            pass
+        positions = set(self.any_domain)
+        for i in xrange(len(hostname)):
+            positions.update(self.domain_map.get(hostname[i:], ()))
+        candidates = [self.type_list[i] for i in sorted(positions)]
+        if len(self._candidate_cache) < 10000:
+            self._candidate_cache[hostname] = candidates
+        return candidates
+
 class VideoTypeRegistrar(dict):
     
     domains = []
+    # How often to check if another process changed the VideoTypeUrlPattern
+    # table
+    INDEX_CHECK_INTERVAL = 30
     
     def __init__(self, *args, **kwargs):
         super(VideoTypeRegistrar, self).__init__(*args, **kwargs)
         self.choices = []
         self.type_list = []
+        self._index = None
         
     def register(self, video_type):
         self[video_type.abbreviation] = video_type
@@ -163,11 +233,54 @@ class VideoTypeRegistrar(dict):
         self.choices.append((video_type.abbreviation, video_type.name))
         domain = getattr(video_type, 'site', None)
         domain and self.domains.append(domain)
+        self.invalidate_index()
         
     def video_type_for_url(self, url):
-        for video_type in self.type_list:
+        return self._match(self.get_index(), url)
+
+    def video_types_for_urls(self, urls):
+        """Find the video types for a list of URLs
+
+        Returns:
+            list of VideoType objects, or None for URLs that don't match any
+            type
+        """
+        index = self.get_index()
+        return [self._match(index, url) for url in urls]
+
+    def url_patterns_for_type(self, abbreviation):
+        """Get the VideoTypeUrlPattern.url_pattern values for a type."""
+        return self.get_index().url_patterns.get(abbreviation, [])
+
+    def _match(self, index, url):
+        for video_type in index.candidates(url):
             if video_type.matches_video_url(url):
                 return video_type(url)
+
+    def get_index(self):
+        if (self._index is not None and
+                time.time() < self._index_checked_at +
+                self.INDEX_CHECK_INTERVAL):
+            return self._index
+        generation = cache.get(URL_PATTERN_GENERATION_KEY)
+        if (self._index is None or
+                generation != self._index_generation):
+            self._index = VideoTypeIndex(self.type_list,
+                                         self._fetch_url_patterns())
+            self._index_generation = generation
+        self._index_checked_at = time.time()
+        return self._index
+
+    def invalidate_index(self):
+        self._index = None
+
+    def _fetch_url_patterns(self):
+        from videos.models import VideoTypeUrlPattern
+        url_patterns = {}
+        for type, url_pattern in VideoTypeUrlPattern.objects.values_list(
+                'type', 'url_pattern'):
+            url_patterns.setdefault(type, []).append(url_pattern)
+        return url_patterns
             
 class VideoTypeError(Exception):
     pass
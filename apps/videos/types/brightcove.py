@@ -58,9 +58,9 @@ class OldStyleBrightcoveVideoMatcher(object):
         for r in self.REGEXES:
             if bool(r.match(url)):
                 return True
-        from videos.models import VideoTypeUrlPattern
-        for pattern in VideoTypeUrlPattern.objects.patterns_for_type('C'):
-            if url.find(pattern.url_pattern) == 0 and url.find('bctid') > 0:
+        from videos.types import video_type_registrar
+        for url_pattern in video_type_registrar.url_patterns_for_type('C'):
+            if url.find(url_pattern) == 0 and url.find('bctid') > 0:
                 return True
         return False
 
@@ -117,6 +117,7 @@ class BrightcoveVideoType(VideoType):
     abbreviation = 'C'
     name = 'Brightcove'
     site = 'brightcove.com'
+    url_domains = ['brightcove.com', 'bcove.me', 'akamaihd.net']
 
     def __init__(self, url):
         self.url = self._resolve_url_redirects(url)
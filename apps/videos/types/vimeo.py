@@ -33,6 +33,7 @@ class VimeoVideoType(VideoType):
     abbreviation = 'V'
     name = 'Vimeo.com'   
     site = 'vimeo.com'
+    url_domains = ['vimeo.com']
     
     def __init__(self, url):
         self.url = url
@@ -37,6 +37,7 @@ class YoutubeVideoType(VideoType):
     abbreviation = 'Y'
     name = 'Youtube'
     site = 'youtube.com'
+    url_domains = ['youtube.com', 'youtu.be']
 
     # changing this will cause havock, let's talks about this first
     URL_TEMPLATE = 'http://www.youtube.com/watch?v=%s'
@@ -69,15 +70,40 @@ class YoutubeVideoType(VideoType):
         else:
             return google.get_direct_url_to_video(self.video_id)
 
+    @classmethod
+    def _accounts_for(cls, user, team):
+        if team:
+            return externalsites.models.YouTubeAccount.objects.for_team_or_synced_with_team(team)
+        elif user:
+            return externalsites.models.YouTubeAccount.objects.for_owner(user)
+        else:
+            return externalsites.models.YouTubeAccount.objects.none()
+
+    @classmethod
+    def prefetch_video_info(cls, video_types, user=None, team=None):
+        """Fetch the video info for several videos at once
+
+        This uses batched videos.list requests rather than one request per
+        video.  The results get stored on each YoutubeVideoType so that
+        get_video_info() doesn't need to make another request.  Videos that
+        we don't get results for are left alone and will use the normal,
+        one-at-a-time, code path.
+        """
+        to_fetch = [vt for vt in video_types
+                    if not hasattr(vt, '_video_info')]
+        if not to_fetch:
+            return
+        accounts = cls._accounts_for(user, team)[:cls.MAX_ACCOUNTS_TO_TRY]
+        video_infos = google.get_video_infos(
+            set(vt.video_id for vt in to_fetch), accounts)
+        for vt in to_fetch:
+            if vt.video_id in video_infos:
+                vt._video_info = video_infos[vt.video_id]
+
     def get_video_info(self, video, user, team, video_url):
         incomplete = False
         if not hasattr(self, '_video_info'):
-            if team:
-                accounts = externalsites.models.YouTubeAccount.objects.for_team_or_synced_with_team(team)
-            elif user:
-                accounts = externalsites.models.YouTubeAccount.objects.for_owner(user)
-            else:
-                accounts = externalsites.models.YouTubeAccount.objects.none()
+            accounts = self._accounts_for(user, team)
             try:
                 self._video_info = google.get_video_info(self.video_id, accounts[:YoutubeVideoType.MAX_ACCOUNTS_TO_TRY])
             except google.APIError:
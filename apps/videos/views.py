@@ -36,14 +36,16 @@ from videos.templatetags.paginator import paginate
 from django.urls import reverse
 from django.db import IntegrityError
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import Q, Sum
 from django.http import (HttpResponse, Http404, HttpResponseRedirect,
                          HttpResponseForbidden)
 from django.shortcuts import (render, get_object_or_404, redirect)
 from django.template import RequestContext
+from django.template.loader import render_to_string
 from django.utils.encoding import force_unicode
 from django.utils.http import urlquote_plus
-from django.utils.translation import ugettext, ugettext_lazy as _
+from django.utils.translation import (ugettext, ugettext_lazy as _,
+                                      get_language)
 from django.views.decorators.http import require_POST
 
 import widget
@@ -102,6 +104,8 @@ import teams.permissions
 
 VIDEO_IN_ROW = 6
 ACTIVITY_PER_PAGE = 8
+ACTIVITY_CACHE_TIMEOUT = 60 * 60
+ACTIVITY_CURSOR_FORMAT = '%Y%m%d%H%M%S%f'
 
 rpc_router = RpcRouter('videos:rpc_router', {
     'VideosApi': VideosApiClass()
@@ -317,20 +321,15 @@ def video(request, video_id, video_url=None, title=None):
         allow_delete = allow_make_primary = False
 
     customization = behaviors.video_page_customize(request, video)
-    all_activities = ActivityRecord.objects.for_video(
-        video, customization.team)
+    activity_qs = ActivityRecord.objects.for_video(video, customization.team)
+    activity_cache_key = 'video-activity:{}'.format(
+        customization.team.id if customization.team else '')
 
-    if request.is_ajax() and request.GET.get('show-all', None):
-        response_renderer = AJAXResponseRenderer(request)
-        response_renderer.replace(
-            '#video_activity', "future/videos/tabs/activity.html", {
-                'activity': all_activities,
-            },
-        )
-        return response_renderer.render()
-
-    activity = all_activities[:ACTIVITY_PER_PAGE]
-    show_all = False if len(activity) >= len(all_activities) else True
+    if request.is_ajax() and 'activity-before' in request.GET:
+        return activity_more_response(request, video, activity_qs,
+                                      activity_cache_key)
+    activity_html, activity_next = render_activity_page(
+        video, activity_qs, activity_cache_key)
 
     sanity_check_video_urls(request, video)
 
@@ -346,9 +345,9 @@ def video(request, video_id, video_url=None, title=None):
         'comment_form': comment_form,
         'create_url_form': create_url_form,
         'comments': Comment.get_for_object(video),
-        'activity': activity,
+        'activity_html': activity_html,
+        'activity_next': activity_next,
         'activity_count': 1,
-        'show_all': show_all,
         'metadata': video.get_metadata().convert_for_display(),
         'custom_sidebar': customization.sidebar,
         'header': customization.header,
@@ -361,6 +360,72 @@ def video(request, video_id, video_url=None, title=None):
                              else len(request.user.get_languages()) == 0),
     })
 
+def render_activity_page(video, qs, cache_key, cursor=None):
+    """Render a page of records for the activity tab
+
+    We only fetch one record past the end of the page to check if there are
+    more, and use keyset pagination on (created, id) for the pages after
+    that.  The rendered HTML is stored in the video's cache group, which gets
+    invalidated when a new record is saved for the video.
+
+    Args:
+        video: Video the activity is for
+        qs: ActivityRecord queryset to display
+        cache_key: unique key for qs
+        cursor: cursor from a previous page to start after
+
+    Returns:
+        (html, next_cursor) tuple.  next_cursor will be None if this is the
+        last page.
+    """
+    if cursor:
+        created, record_id = _parse_activity_cursor(cursor)
+        qs = qs.filter(Q(created__lt=created) |
+                       Q(created=created, id__lt=record_id))
+    key = '{}:{}:{}'.format(cache_key, cursor or '', get_language())
+    cached = video.cache.get(key)
+    if cached is not None:
+        return cached
+    records = list(qs.order_by('-created', '-id')
+                   .with_related_objects()[:ACTIVITY_PER_PAGE+1])
+    if len(records) > ACTIVITY_PER_PAGE:
+        records = records[:ACTIVITY_PER_PAGE]
+        next_cursor = _activity_cursor(records[-1])
+    else:
+        next_cursor = None
+    html = render_to_string('future/videos/tabs/activity-records.html', {
+        'activity': records,
+    })
+    video.cache.set(key, (html, next_cursor), ACTIVITY_CACHE_TIMEOUT)
+    return html, next_cursor
+
+def activity_more_response(request, video, qs, cache_key):
+    """Handle the "load more" link for the activity tab."""
+    cursor = request.GET['activity-before']
+    activity_html, activity_next = render_activity_page(video, qs,
+                                                        cache_key, cursor)
+    response_renderer = AJAXResponseRenderer(request)
+    response_renderer.replace(
+        '#activity-more-{}'.format(cursor),
+        "future/videos/tabs/activity.html", {
+            'activity_html': activity_html,
+            'activity_next': activity_next,
+        },
+    )
+    return response_renderer.render()
+
+def _activity_cursor(record):
+    return '{}-{}'.format(record.created.strftime(ACTIVITY_CURSOR_FORMAT),
+                          record.id)
+
+def _parse_activity_cursor(cursor):
+    try:
+        created, record_id = cursor.split('-')
+        return (datetime.datetime.strptime(created, ACTIVITY_CURSOR_FORMAT),
+                int(record_id))
+    except ValueError:
+        raise Http404()
+
 def create_subtitles(request, video_id):
     try:
         video = Video.cache.get_instance_by_video_id(video_id, 'video-page')
@@ -526,7 +591,7 @@ def _get_related_task(request):
 
 def activity(request, video_id):
     video = get_object_or_404(Video, video_id=video_id)
-    qs = ActivityRecord.objects.for_video(video)
+    qs = ActivityRecord.objects.for_video(video).with_related_objects()
 
     extra_context = {
         'video': video,
@@ -623,17 +688,14 @@ def subtitles(request, video_id, lang, lang_id, version_id=None):
         comment_form = None
 
     customization = behaviors.subtitles_page_customize(request, video, subtitle_language)
-    all_activities = (ActivityRecord.objects.for_video(video, customization.team)
-                .filter(language_code=lang))
+    activity_qs = (ActivityRecord.objects.for_video(video, customization.team)
+                   .filter(language_code=lang))
+    activity_cache_key = 'subtitles-activity:{}:{}'.format(
+        customization.team.id if customization.team else '', lang)
 
-    if request.is_ajax() and request.GET.get('show-all', None):
-        response_renderer = AJAXResponseRenderer(request)
-        response_renderer.replace(
-            '#subtitles_activity', "future/videos/tabs/activity.html", {
-                'activity': all_activities,
-            },
-        )
-        return response_renderer.render()
+    if request.is_ajax() and 'activity-before' in request.GET:
+        return activity_more_response(request, video, activity_qs,
+                                      activity_cache_key)
 
     if request.is_ajax() and request.GET.get('update-sync-history', None):
         response_renderer = AJAXResponseRenderer(request)
@@ -646,8 +708,8 @@ def subtitles(request, video_id, lang, lang_id, version_id=None):
     all_subtitle_versions = subtitle_language.versions_for_user(
             request.user).order_by('-version_number')
     team_video = video.get_team_video()
-    activity = all_activities[:ACTIVITY_PER_PAGE]
-    show_all = False if len(activity) >= len(all_activities) else True
+    activity_html, activity_next = render_activity_page(
+        video, activity_qs, activity_cache_key)
     context = {
         'video': video,
         'team_video': team_video,
@@ -663,9 +725,9 @@ def subtitles(request, video_id, lang, lang_id, version_id=None):
         'has_private_version': any(v.is_private() for v in
                                    all_subtitle_versions),
         'downloadable_formats': downloadable_formats(request.user),
-        'activity': activity,
+        'activity_html': activity_html,
+        'activity_next': activity_next,
         'activity_count': 1,
-        'show_all': show_all,
         'comments': comments,
         'comment_form': comment_form,
         'enable_edit_in_admin': request.user.is_superuser,
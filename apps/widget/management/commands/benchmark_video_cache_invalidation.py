@@ -0,0 +1,119 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from teams.models import Team
+from videos.models import Video
+from widget import video_cache
+
+class CountingCache(object):
+    """Wraps the cache and counts the calls that hit it."""
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = 0
+
+    def __getattr__(self, name):
+        method = getattr(self.cache, name)
+        def wrapper(*args, **kwargs):
+            self.calls += 1
+            return method(*args, **kwargs)
+        return wrapper
+
+class Command(BaseCommand):
+    help = ("Compare the cost of invalidating the widget video cache for "
+            "all videos in a team using per-key deletes (the old way) vs. "
+            "the team generation key.  Note: this really invalidates the "
+            "caches for the team.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('team', help='Team slug')
+        parser.add_argument('-c', '--count', default=1000, type=int,
+                            help='Max number of videos for the per-key run')
+
+    def handle(self, **options):
+        try:
+            team = Team.objects.get(slug=options['team'])
+        except Team.DoesNotExist:
+            raise CommandError('Team not found: {}'.format(options['team']))
+        video_ids = list(team.teamvideo_set
+                         .values_list('video__video_id', flat=True)
+                         [:options['count']])
+        self.stdout.write('videos: {}\n'.format(len(video_ids)))
+
+        counting_cache = CountingCache(cache)
+        def per_key():
+            for video_id in video_ids:
+                self.delete_keys(counting_cache, video_id)
+
+        def per_video():
+            for video_id in video_ids:
+                video_cache.invalidate_cache(video_id)
+
+        def per_team():
+            video_cache.invalidate_team_cache(team.id)
+
+        for label, func in [('per-key', per_key),
+                            ('per-video', per_video),
+                            ('per-team', per_team)]:
+            counting_cache.calls = 0
+            video_cache.cache = counting_cache
+            start = time.time()
+            try:
+                func()
+            finally:
+                video_cache.cache = cache
+            elapsed = time.time() - start
+            self.stdout.write('{}: {:.3f}s, {} cache calls\n'.format(
+                label, elapsed, counting_cache.calls))
+
+    def delete_keys(self, cache, video_id):
+        # This is what video_cache.invalidate_cache() did before we switched
+        # to namespace versions
+        cache.delete(video_cache._video_urls_key(video_id))
+        try:
+            video = Video.objects.get(video_id=video_id)
+            for l in video.newsubtitlelanguage_set.all():
+                cache.delete(video_cache._subtitles_dict_key(video_id, l.pk))
+        except Video.DoesNotExist:
+            pass
+        for language in settings.ALL_LANGUAGES:
+            cache.delete(video_cache._subtitle_language_pk_key(
+                video_id, language[0]))
+        cache.delete(video_cache._subtitle_language_pk_key(video_id, None))
+        cache.delete(video_cache._subtitles_dict_key(video_id, None))
+        cache.delete(video_cache._subtitles_count_key(video_id))
+        cache.delete(video_cache._video_languages_key(video_id))
+        cache.delete(video_cache._video_languages_verbose_key(video_id))
+        cache.delete(video_cache._video_is_moderated_key(video_id))
+        cache.delete(video_cache._video_visibility_policy_key(video_id))
+        cache.delete(video_cache._video_filename_key(video_id))
+        try:
+            video = Video.objects.get(video_id=video_id)
+            for url in video.videourl_set.all():
+                cache.delete(video_cache._video_id_key(url.url))
+            team_video = video.get_team_video()
+            if team_video:
+                cache.delete(video_cache._video_completed_languages(
+                    team_video.id))
+        except Video.DoesNotExist:
+            pass
@@ -15,6 +15,25 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see
 # http://www.gnu.org/licenses/agpl-3.0.html.
+"""widget.video_cache -- Cache values for the widget and video pages
+
+Most values here are associated with a single video.  Rather than deleting
+each key when a video changes, we use a version key like
+caching.cachegroup.CacheGroup does:
+
+  - Each video has a version value, which is a random code plus the id of the
+    video's team (or None).
+  - Each team has a generation value, which is also a random code.
+  - Cache values are stored packed together with the namespace (the video's
+    version code + the team's generation) that was current when we started
+    calculating them.  If the namespace doesn't match when we read the value
+    back, then we treat it as a cache miss.
+
+This means invalidate_cache() only needs to delete the video's version key and
+invalidate_team_cache() only needs to set a new generation for the team, no
+matter how many keys/languages/videos are involved.
+"""
+
 import datetime
 import hashlib
 
@@ -24,12 +43,90 @@ from django.utils.translation import (
     ugettext_lazy as _
 )
 
+from utils import codes
 from videos.types import video_type_registrar
 from videos.types.base import VideoTypeError
 import unilangs
 
 TIMEOUT = 60 * 60 * 24 * 5 # 5 days
 
+# Namespace handling
+def _version_key(video_id):
+    return 'widget_video_version_{0}'.format(video_id)
+
+def _team_generation_key(team_id):
+    return 'widget_team_generation_{0}'.format(team_id)
+
+def _get_or_add(key, make_value):
+    value = cache.get(key)
+    if value is None:
+        value = make_value()
+        if not cache.add(key, value, TIMEOUT):
+            # Another process set the value before us
+            value = cache.get(key) or value
+    return value
+
+def _make_version(video_id):
+    from teams.models import TeamVideo
+    team_id = (TeamVideo.objects
+               .filter(video__video_id=video_id)
+               .values_list('team_id', flat=True)
+               .first())
+    return (codes.make_code(), team_id)
+
+def _namespace(video_id, version=None):
+    """Get the current namespace for a video's cache values
+
+    Args:
+        video_id: video_id of the video
+        version: value of the video's version key, if we've already fetched
+            it.
+    """
+    if version is None:
+        version = _get_or_add(_version_key(video_id),
+                              lambda: _make_version(video_id))
+    code, team_id = version
+    if team_id is None:
+        return code
+    generation = _get_or_add(_team_generation_key(team_id), codes.make_code)
+    return '{0}:{1}'.format(code, generation)
+
+def _get(video_id, cache_key):
+    """Get a cached value for a video
+
+    Returns:
+        (namespace, value) tuple.  value will be None if the key isn't set or
+        it was stored with a different namespace.  Pass namespace to _set()
+        when storing the new value.
+    """
+    version_key = _version_key(video_id)
+    values = cache.get_many([version_key, cache_key])
+    namespace = _namespace(video_id, values.get(version_key))
+    packed = values.get(cache_key)
+    if packed is not None and packed[0] == namespace:
+        return namespace, packed[1]
+    else:
+        return namespace, None
+
+def _set(cache_key, namespace, value, timeout=TIMEOUT):
+    cache.set(cache_key, (namespace, value), timeout)
+
+def _get_linked(cache_key):
+    """Get a value stored with _set_linked()
+
+    Use this for values that are associated with a video, but where we can't
+    calculate the video_id before looking up the value.
+    """
+    packed = cache.get(cache_key)
+    if packed is None:
+        return None
+    video_id, namespace, value = packed
+    if namespace != _namespace(video_id):
+        return None
+    return value
+
+def _set_linked(cache_key, video_id, value):
+    cache.set(cache_key, (video_id, _namespace(video_id), value), TIMEOUT)
 
 def get_video_id(video_url, public_only=False, referer=None):
     """
@@ -37,7 +134,7 @@ def get_video_id(video_url, public_only=False, referer=None):
     If public only is
     """
     cache_key = _video_id_key(video_url)
-    value = cache.get(cache_key)
+    value = _get_linked(cache_key)
     if bool(value):
         return value
     else:
@@ -49,12 +146,12 @@ def get_video_id(video_url, public_only=False, referer=None):
 
         video_id = video.video_id
 
-        cache.set(cache_key, video_id, TIMEOUT)
+        _set_linked(cache_key, video_id, video_id)
         return video_id
 
 def associate_extra_url(video_url, video_id):
     cache_key = _video_id_key(video_url)
-    value = cache.get(cache_key)
+    value = _get_linked(cache_key)
     if value is None:
         from videos.models import VideoUrl, Video
         vt = video_type_registrar.video_type_for_url(video_url)
@@ -64,45 +161,17 @@ def associate_extra_url(video_url, video_id):
                 'video': Video.objects.get(video_id=video_id),
                 'type': vt.abbreviation,
                 'videoid': video_id })
-        cache.set(cache_key, video_url.videoid, TIMEOUT)
+        _set_linked(cache_key, video_url.videoid, video_url.videoid)
 
 
 # Invalidation
 def invalidate_cache(video_id):
-    cache.delete(_video_urls_key(video_id))
+    """Invalidate all cached values for a video."""
+    cache.delete(_version_key(video_id))
 
-    try:
-        from videos.models import Video
-        video = Video.objects.get(video_id=video_id)
-        for l in video.newsubtitlelanguage_set.all():
-            cache.delete(_subtitles_dict_key(video_id, l.pk))
-    except Video.DoesNotExist:
-        pass
-
-    for language in settings.ALL_LANGUAGES:
-        cache.delete(_subtitle_language_pk_key(video_id, language[0]))
-
-    cache.delete(_subtitle_language_pk_key(video_id, None))
-    cache.delete(_subtitles_dict_key(video_id, None))
-    cache.delete(_subtitles_count_key(video_id))
-    cache.delete(_video_languages_key(video_id))
-    cache.delete(_video_languages_verbose_key(video_id))
-    cache.delete(_video_is_moderated_key(video_id))
-    cache.delete(_video_visibility_policy_key(video_id))
-    cache.delete(_video_filename_key(video_id))
-
-    from videos.models import Video
-    try:
-        video = Video.objects.get(video_id=video_id)
-        for url in video.videourl_set.all():
-            cache.delete(_video_id_key(url.url))
-
-        team_video = video.get_team_video()
-
-        if team_video:
-            cache.delete(_video_completed_languages(team_video.id))
-    except Video.DoesNotExist:
-        pass
+def invalidate_team_cache(team_id):
+    """Invalidate the cached values for all videos in a team."""
+    cache.set(_team_generation_key(team_id), codes.make_code(), TIMEOUT)
 
 def invalidate_video_id(video_url):
     cache.delete(_video_id_key(video_url))
@@ -159,26 +228,26 @@ def pk_for_default_language(video_id, language_code):
     # don't ask me why
     language_code = language_code or None
     cache_key = _subtitle_language_pk_key(video_id, language_code)
-    value = cache.get(cache_key)
+    namespace, value = _get(video_id, cache_key)
 
     if value is None:
         from videos.models import Video
         sl = Video.objects.get(video_id=video_id).subtitle_language(
             language_code)
         value = None if sl is None else sl.pk
-        cache.set(cache_key, value, TIMEOUT)
+        _set(cache_key, namespace, value)
 
     return value
 
 def get_video_urls(video_id):
     cache_key = _video_urls_key(video_id)
-    video_urls = cache.get(cache_key)
+    namespace, video_urls = _get(video_id, cache_key)
 
     if video_urls is None:
         from videos.models import Video
         video_urls = [vu.url for vu
                  in Video.objects.get(video_id=video_id).videourl_set.all()]
-        cache.set(cache_key, video_urls, TIMEOUT)
+        _set(cache_key, namespace, video_urls)
 
     return video_urls
 
@@ -186,7 +255,7 @@ def get_subtitles_dict(video_id, language_pk, version_number,
                        subtitles_dict_fn, is_remote=False):
 
     cache_key = _subtitles_dict_key(video_id, language_pk, version_number)
-    cached_value = cache.get(cache_key)
+    namespace, cached_value = _get(video_id, cache_key)
 
     if cached_value is None:
         from videos.models import Video
@@ -209,7 +278,7 @@ def get_subtitles_dict(video_id, language_pk, version_number,
             else:
                 cached_value = None
 
-            cache.set(cache_key, cached_value, TIMEOUT)
+            _set(cache_key, namespace, cached_value)
 
     return cached_value
 
@@ -217,7 +286,7 @@ def get_video_languages(video_id):
     from widget.rpc import language_summary
 
     cache_key = _video_languages_key(video_id)
-    value = cache.get(cache_key)
+    namespace, value = _get(video_id, cache_key)
 
     if value is None:
         from videos.models import Video
@@ -230,19 +299,23 @@ def get_video_languages(video_id):
             languages = languages.filter(language_code__in=team_video.team.get_readable_langs())
 
         value = [language_summary(l) for l in languages]
-        cache.set(cache_key, value, TIMEOUT)
+        _set(cache_key, namespace, value)
 
     return value
 
 def get_video_completed_languages(team_video_id):
     cache_key = _video_completed_languages(team_video_id)
-    languages = cache.get(cache_key)
+    languages = _get_linked(cache_key)
 
     if languages is None:
+        from teams.models import TeamVideo
         from videos.models import SubtitleLanguage
         languages = [sl.language for sl in list(SubtitleLanguage.objects.filter(video__teamvideo__id=team_video_id).all())]
 
-        cache.set(cache_key, languages, TIMEOUT)
+        video_id = (TeamVideo.objects.filter(id=team_video_id)
+                    .values_list('video__video_id', flat=True).first())
+        if video_id is not None:
+            _set_linked(cache_key, video_id, languages)
 
     # i18n is a pain in the ass
     return [(lang, _(unilangs.INTERNAL_NAMES[lang][0])) for lang in languages]
@@ -251,7 +324,7 @@ def get_video_languages_verbose(video_id, max_items=6):
     # FIXME: we should probably merge a better method with get_video_languages
     # maybe accepting a 'verbose' param?
     cache_key = _video_languages_verbose_key(video_id)
-    data = cache.get(cache_key)
+    namespace, data = _get(video_id, cache_key)
 
     if data is None:
         from videos.models import Video
@@ -279,37 +352,37 @@ def get_video_languages_verbose(video_id, max_items=6):
                     'is_complete': lang.is_complete,
                     'language_url': lang.get_absolute_url(),
                 })
-        cache.set(cache_key, data, TIMEOUT)
+        _set(cache_key, namespace, data)
 
     return data
 
 def get_is_moderated(video_id):
     cache_key = _video_is_moderated_key(video_id)
-    value = cache.get(cache_key)
+    namespace, value = _get(video_id, cache_key)
 
     if value is None:
         from videos.models import Video
         video = Video.objects.get(video_id=video_id)
         value = video.is_moderated
-        cache.set(cache_key, value, TIMEOUT)
+        _set(cache_key, namespace, value)
 
     return value
 
 def get_download_filename(video_id):
     cache_key = _video_filename_key(video_id)
-    value = cache.get(cache_key)
+    namespace, value = _get(video_id, cache_key)
 
     if value is None:
         from videos.models import Video
         video = Video.objects.get(video_id=video_id)
         value = video.get_download_filename()
-        cache.set(cache_key, value, TIMEOUT)
+        _set(cache_key, namespace, value)
 
     return value
 
 def get_visibility_policies(video_id):
     cache_key = _video_visibility_policy_key(video_id)
-    value = cache.get(cache_key)
+    namespace, value = _get(video_id, cache_key)
 
     if value is None:
         from videos.models import Video
@@ -334,7 +407,7 @@ def get_visibility_policies(video_id):
             "team_id": team_id
         }
 
-        cache.set(cache_key, value, TIMEOUT)
+        _set(cache_key, namespace, value)
 
     return value
 
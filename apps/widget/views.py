@@ -26,7 +26,8 @@ from django.conf import settings
 from django.contrib import messages
 from django.urls import reverse
 from django.db.models import ObjectDoesNotExist
-from django.http import HttpResponse, Http404, HttpResponseServerError, HttpResponseRedirect
+from django.http import (HttpResponse, Http404, HttpResponseServerError,
+                         HttpResponseRedirect, HttpResponseNotModified)
 from django.shortcuts import (render, render, redirect,
                               get_object_or_404)
 from django.template import RequestContext
@@ -40,6 +41,7 @@ from django.views.decorators.clickjacking import xframe_options_exempt
 import widget
 from auth.models import CustomUser
 from teams.models import Task
+from subtitles import rendercache
 from teams.permissions import get_member
 from utils import DEFAULT_PROTOCOL
 from utils.decorators import staff_member_required
@@ -276,11 +278,18 @@ def download_subtitles(request, format):
         raise Http404
     if not format in babelsubs.get_available_formats():
         raise HttpResponseServerError("Format not found")
-    
-    subs_text = babelsubs.to(version.get_subtitles(), format, language=version.language_code)
+
+    etag = rendercache.etag(version, format, language=version.language_code)
+    if rendercache.not_modified(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    subs_text = rendercache.render(version, format,
+                                   language=version.language_code)
     # since this is a downlaod, we can afford not to escape tags, specially true
     # since speaker change is denoted by '>>' and that would get entirely stripped out
     response = HttpResponse(subs_text, content_type="text/plain")
+    response['ETag'] = etag
     original_filename = '%s.%s' % (video.lang_filename(language.language_code), format)
 
     if not 'HTTP_USER_AGENT' in request.META or u'WebKit' in request.META['HTTP_USER_AGENT']:
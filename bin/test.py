@@ -90,7 +90,11 @@ class AmaraPlugin(object):
         MockRedis.persist = persist
 
     def pytest_runtest_teardown(self, item, nextitem):
+        from videos.types import video_type_registrar
         self.patcher.reset_mocks()
+        # The DB rollback doesn't send signals for VideoTypeUrlPattern
+        # changes, so make sure that the registrar reloads them
+        video_type_registrar.invalidate_index()
         get_redis_connection("default").flushdb()
         get_redis_connection("storage").flushdb()
 
@@ -252,8 +252,14 @@ RQ_QUEUES = {
 }
 RUN_JOBS_EAGERLY = False
 
-# feedworker management command setup
+# feedworker management command setup.  Each feed starts out being checked
+# every PASS_DURATION seconds, then the interval adapts to how often it
+# changes, staying between MIN_INTERVAL and MAX_INTERVAL.
 FEEDWORKER_PASS_DURATION=3600
+FEEDWORKER_MIN_INTERVAL = 15 * 60
+FEEDWORKER_MAX_INTERVAL = 24 * 60 * 60
+# Max number of feeds to check at once for a single domain
+FEEDWORKER_DOMAIN_CONCURRENCY = 2
 
 REST_FRAMEWORK = {
     'DEFAULT_PARSER_CLASSES': (
@@ -396,6 +402,9 @@ DEFAULT_BUCKET = ''
 AWS_USER_DATA_BUCKET_NAME  = ''
 STATIC_MEDIA_USES_S3 = USE_AMAZON_S3 = False
 STATIC_MEDIA_COMPRESSED = True
+# Directory created by the build_media command.  If set, static media gets
+# served from there instead of being built on demand.
+STATIC_MEDIA_BUILD_DIR = None
 STATIC_MEDIA_EXPERIMENTAL_EDITOR_BUCKET = 's3.staging.amara.org'
 
 # django-storages related settings
@@ -437,6 +446,25 @@ CACHES = {
     },
 }
 
+# In-process cache that sits in front of redis for CacheGroups with a cache
+# pattern.  SIZE is the max number of groups to keep per process (0 disables
+# it), TTL is how long to keep them in seconds.
+CACHE_GROUP_LOCAL_CACHE_SIZE = 0
+CACHE_GROUP_LOCAL_CACHE_TTL = 60
+
+# Rendered subtitles are stored in the redis storage cache, unless this is set
+# to a directory path, in which case they are stored as files there.
+SUBTITLE_RENDER_CACHE_DIR = None
+SUBTITLE_RENDER_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+# Formats to pre-render when a new public version is added
+SUBTITLE_RENDER_CACHE_WARM_FORMATS = ['dfxp', 'srt', 'vtt']
+
+# Timeouts for team notification HTTP requests (connect, read) in seconds
+NOTIFICATION_TIMEOUT = (5, 30)
+
+# How long to cache successful API key authentications for, in seconds
+API_AUTH_CACHE_TIMEOUT = 5 * 60
+
 
 #for unisubs.example.com
 RECAPTCHA_PUBLIC = '6LdoScUSAAAAANmmrD7ALuV6Gqncu0iJk7ks7jZ0'
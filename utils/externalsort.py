@@ -0,0 +1,78 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+"""utils.externalsort -- Sort large iterables with bounded memory
+
+external_sort() works like sorted(), but only keeps chunk_size items in memory
+at once.  Each chunk gets sorted and written to a temporary file, then the
+chunks are merged together.  Like sorted(), the sort is stable.
+"""
+
+import cPickle as pickle
+import heapq
+import itertools
+import tempfile
+
+def external_sort(iterable, key, chunk_size=10000):
+    """Sort items from iterable
+
+    Args:
+        iterable: items to sort.  They must be picklable.
+        key: function that returns the sort key for an item
+        chunk_size: max number of items to keep in memory at once
+
+    Returns: generator that yields the items in sorted order
+    """
+    runs = []
+    counter = itertools.count()
+    iterator = iter(iterable)
+    while True:
+        # Include a counter in the sort key to make the sort stable and to
+        # avoid comparing the items themselves.
+        chunk = [(key(item), counter.next(), item)
+                 for item in itertools.islice(iterator, chunk_size)]
+        if not chunk:
+            break
+        chunk.sort()
+        if not runs and len(chunk) < chunk_size:
+            # Everything fit in one chunk, no need for temp files
+            return (item for (k, i, item) in chunk)
+        runs.append(_write_run(chunk))
+    return _merge_runs(runs)
+
+def _write_run(chunk):
+    f = tempfile.TemporaryFile()
+    pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+    for entry in chunk:
+        pickler.dump(entry)
+        # Don't let the pickler memoize every entry that we write
+        pickler.clear_memo()
+    f.seek(0)
+    return f
+
+def _read_run(f):
+    unpickler = pickle.Unpickler(f)
+    try:
+        while True:
+            yield unpickler.load()
+    except EOFError:
+        f.close()
+
+def _merge_runs(runs):
+    for k, i, item in heapq.merge(*[_read_run(f) for f in runs]):
+        yield item
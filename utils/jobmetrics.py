@@ -0,0 +1,245 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+"""
+jobmetrics -- Track how long task queue jobs take
+
+utils.taskqueue calls record() after each job runs in the worker.  For each
+job function we track:
+
+  - latency: time from when the job was enqueued until it started
+  - runtime: time it took to run the job
+  - queries: number of DB queries the job ran
+  - outcome: number of successful/failed runs
+
+The times and query counts get stored as histograms with fixed buckets.  We
+store one redis hash per hour and expire them after RETENTION_HOURS, so the
+memory used only depends on the number of job functions.
+
+Use get_report() to calculate percentiles over the last few hours and
+queue_depths() to see how many jobs are waiting.  The job_metrics command and
+the staff job metrics page display those.
+"""
+
+from bisect import bisect_left
+from collections import namedtuple
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django_redis import get_redis_connection
+import django_rq
+
+RETENTION_HOURS = 48
+
+INF = float('inf')
+# Bucket upper bounds
+TIME_BUCKETS = [
+    0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800,
+    3600, INF,
+]
+QUERY_BUCKETS = [
+    0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, INF,
+]
+BUCKETS = {
+    'latency': TIME_BUCKETS,
+    'runtime': TIME_BUCKETS,
+    'queries': QUERY_BUCKETS,
+}
+PERCENTILES = (50, 95, 99)
+
+def _redis():
+    return get_redis_connection('storage')
+
+def _hour_key(hour):
+    return 'jobmetrics:{}'.format(hour)
+
+def _current_hour():
+    return int(time.time() // 3600)
+
+def record(name, latency, runtime, queries, success):
+    """Record metrics for a job run
+
+    Args:
+        name: job function name
+        latency: seconds between enqueueing and starting the job, or None if
+            we don't know it
+        runtime: seconds it took to run the job
+        queries: number of DB queries the job ran
+        success: did the job complete without an exception?
+    """
+    key = _hour_key(_current_hour())
+    pipe = _redis().pipeline()
+    values = {
+        'latency': latency,
+        'runtime': runtime,
+        'queries': queries,
+    }
+    for metric, value in values.items():
+        if value is not None:
+            bucket = bisect_left(BUCKETS[metric], value)
+            pipe.hincrby(key, '{}|{}|{}'.format(name, metric, bucket), 1)
+    outcome = 'success' if success else 'failure'
+    pipe.hincrby(key, '{}|outcome|{}'.format(name, outcome), 1)
+    pipe.expire(key, RETENTION_HOURS * 3600)
+    pipe.execute()
+
+class QueryCounter(object):
+    """Count the queries run on a DB connection
+
+    Use this as a context manager, then read the count attribute.  This is a
+    lightweight version of django.test.utils.CaptureQueriesContext: we wrap
+    the cursors to increment a counter rather than turning on the debug
+    cursor and storing the SQL for each query.
+    """
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.count = 0
+
+    def __enter__(self):
+        connection = connections[self.using]
+        # Remember the cursor attribute that we're replacing, in case we're
+        # nested inside another counter
+        self.previous_cursor = connection.__dict__.get('cursor')
+        original_cursor = connection.cursor
+        def cursor(*args, **kwargs):
+            return _CountingCursor(original_cursor(*args, **kwargs), self)
+        connection.cursor = cursor
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        connection = connections[self.using]
+        if self.previous_cursor is None:
+            del connection.cursor
+        else:
+            connection.cursor = self.previous_cursor
+
+class _CountingCursor(object):
+    def __init__(self, cursor, counter):
+        self.cursor = cursor
+        self.counter = counter
+
+    def execute(self, *args, **kwargs):
+        self.counter.count += 1
+        return self.cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self.counter.count += 1
+        return self.cursor.executemany(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.cursor.__exit__(exc_type, exc_value, traceback)
+
+class Histogram(object):
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def percentile(self, p):
+        """Calculate a percentile
+
+        Returns:
+            Upper bound of the bucket that contains the percentile, or None if
+            there's no data.
+        """
+        total = self.total
+        if not total:
+            return None
+        threshold = total * p / 100.0
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return bound
+        return self.bounds[-1]
+
+    def format_percentile(self, p, unit=''):
+        value = self.percentile(p)
+        if value is None:
+            return '-'
+        elif value == INF:
+            return '>{:g}{}'.format(self.bounds[-2], unit)
+        else:
+            return '<={:g}{}'.format(value, unit)
+
+JobReport = namedtuple('JobReport',
+                       'name successes failures latency runtime queries')
+
+def get_report(hours=24):
+    """Calculate metrics for each job function
+
+    Args:
+        hours: number of hours to include (including the current one)
+
+    Returns:
+        list of JobReport tuples, sorted by name.  latency, runtime and
+        queries are Histograms.
+    """
+    hours = min(hours, RETENTION_HOURS)
+    current = _current_hour()
+    pipe = _redis().pipeline()
+    for hour in range(current - hours + 1, current + 1):
+        pipe.hgetall(_hour_key(hour))
+    data = {}
+    for hour_data in pipe.execute():
+        for field, count in hour_data.items():
+            name, metric, bucket = field.split('|')
+            job_data = data.setdefault(name, {
+                'success': 0,
+                'failure': 0,
+                'latency': Histogram(TIME_BUCKETS),
+                'runtime': Histogram(TIME_BUCKETS),
+                'queries': Histogram(QUERY_BUCKETS),
+            })
+            if metric == 'outcome':
+                job_data[bucket] += int(count)
+            else:
+                job_data[metric].counts[int(bucket)] += int(count)
+    return [
+        JobReport(name, d['success'], d['failure'], d['latency'],
+                  d['runtime'], d['queries'])
+        for name, d in sorted(data.items())
+    ]
+
+def queue_depths():
+    """Get the number of jobs waiting
+
+    Returns:
+        list of (name, count) tuples for each queue in settings.RQ_QUEUES,
+        plus the scheduled and failed jobs.
+    """
+    depths = [
+        (name, django_rq.get_queue(name).count)
+        for name in sorted(settings.RQ_QUEUES)
+    ]
+    depths.append(('scheduled', django_rq.get_scheduler('default').count()))
+    depths.append(('failed', django_rq.get_failed_queue().count))
+    return depths
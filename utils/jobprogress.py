@@ -54,7 +54,7 @@ def start(key):
     r = get_redis_connection('storage')
     pipe = r.pipeline()
     pipe.setnx(_make_key(key), _make_value(0, 0))
-    r.expire(_make_key(key), TIMEOUT)
+    pipe.expire(_make_key(key), TIMEOUT)
     rvs = pipe.execute()
     return bool(rvs[0])
 
@@ -0,0 +1,45 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from django.core.management.base import BaseCommand
+
+from utils import jobmetrics
+
+class Command(BaseCommand):
+    help = ("Print latency, runtime and DB query percentiles for each job "
+            "function, along with the current queue depths")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', default=24, type=int,
+                            help='Number of hours to include')
+
+    def handle(self, **options):
+        self.stdout.write('Queue depths:\n')
+        for name, count in jobmetrics.queue_depths():
+            self.stdout.write('  {}: {}\n'.format(name, count))
+        for report in jobmetrics.get_report(options['hours']):
+            self.stdout.write('\n{} ({} runs, {} failed)\n'.format(
+                report.name, report.successes + report.failures,
+                report.failures))
+            for label, histogram, unit in [
+                    ('latency', report.latency, 's'),
+                    ('runtime', report.runtime, 's'),
+                    ('queries', report.queries, '')]:
+                self.stdout.write('  {}: {}\n'.format(label, ', '.join(
+                    'p{}={}'.format(p, histogram.format_percentile(p, unit))
+                    for p in jobmetrics.PERCENTILES)))
@@ -0,0 +1,40 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from django.core.management.base import BaseCommand
+
+from utils import taskqueue
+
+class Command(BaseCommand):
+    help = ("Print the number of jobs enqueued, coalesced and executed for "
+            "each job function")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Reset the counters after printing them')
+
+    def handle(self, **options):
+        stats = taskqueue.get_stats()
+        if not stats:
+            self.stdout.write('No stats recorded\n')
+        for name, counts in sorted(stats.items()):
+            self.stdout.write(
+                '{}: {enqueued} enqueued, {coalesced} coalesced, '
+                '{executed} executed\n'.format(name, **counts))
+        if options['reset']:
+            taskqueue.reset_stats()
@@ -25,4 +25,4 @@ class Command(BaseCommand):
         scheduler = django_rq.get_scheduler('default')
         print 'scheduled tasks:'
         for job, dt in scheduler.get_jobs(with_times=True):
-            print '{}: {}'.format(dt.isoformat(), job.func)
+            print '{}: {}'.format(dt.isoformat(), job.description)
@@ -36,7 +36,7 @@ class Command(BaseCommand):
             print 'You have tasks in the failed queue:'
             print
         for job in failed_jobs[:MAX_JOBS]:
-            print job.func_name
+            print job.description
         if len(failed_jobs) > MAX_JOBS:
             print
             print '... {} more failed jobs'.format(
@@ -3,38 +3,81 @@ utils.taskqueue -- Code to handle tasks
 
 This module wraps the django_rq API.  We use this rather than django_rq
 directly to simplify the process of switching to another task framework.
+
+Coalescing jobs
+---------------
+
+Some jobs get scheduled many times with the same arguments in a short time
+(for example video_changed_tasks() when a video gets several edits in a
+row).  There are 2 options to avoid doing the same work over and over:
+
+  - @job(coalesce=True): If there's already a pending job with the same
+    arguments, then delay() doesn't enqueue a new one.
+  - @job(debounce=N): Wait N seconds before running the job.  If delay() is
+    called again before it runs, push the run time back so that it's N
+    seconds after the last call.
+
+In both cases, we store a key in redis for each function/arguments
+combination that has a pending job.  The key gets deleted right before the
+job starts, so calls made while it's running will schedule a new job.
+Arguments that are model instances are keyed by their PK.
+
+Coalesced delay() calls return None rather than a Job object.
+
+Stats
+-----
+
+We count the number of jobs enqueued, coalesced and executed for each job
+function.  Use get_stats() or the job_stats command to view them.  We also
+record timing and DB query metrics for each job run, see utils.jobmetrics.
 """
 
-from datetime import timedelta
+from datetime import datetime, timedelta
+import hashlib
+import json
+import time
 
 from django.conf import settings
+from django_redis import get_redis_connection
 
+from utils import jobmetrics
 import rq
 import django_rq
 
-def job(func=None, queue='default', timeout=None):
+# How long we keep pending keys before assuming the job was lost
+PENDING_TIMEOUT = 60 * 60 * 6
+STATS_KEY = 'taskqueue-stats'
+
+def job(func=None, queue='default', timeout=None, coalesce=False,
+        debounce=None):
     """
     Decorator to allow a function to be run as a job in the worker process
 
     This works like the celery @task decorator, and the rq @job decorator.
+
+    Args:
+        queue: name of the queue to run the job in
+        timeout: job timeout in seconds
+        coalesce: don't enqueue a job if there's already one pending with the
+            same arguments
+        debounce: wait this many seconds before running the job and push the
+            run time back if there's another call with the same arguments.
     """
     def wrapper(func):
+        options = JobOptions(job_name(func), queue, timeout, coalesce,
+                             debounce)
         def delay(*args, **kwargs):
             if settings.RUN_JOBS_EAGERLY:
                 return func(*args, **kwargs)
-            rq_job = django_rq.get_queue(queue).enqueue(
-                func, timeout=timeout, args=args, kwargs=kwargs)
-            return Job(rq_job)
+            return _enqueue(func, options, None, args, kwargs)
 
         def enqueue_in(timeout, *args, **kwargs):
             if settings.RUN_JOBS_EAGERLY:
                 return func(*args, **kwargs)
-            scheduler = django_rq.get_scheduler(queue)
-            rq_job = scheduler.enqueue_in(timedelta(seconds=timeout), func, *args,
-                                 **kwargs)
-            return Job(rq_job)
+            return _enqueue(func, options, timeout, args, kwargs)
         func.delay = delay
         func.enqueue_in = enqueue_in
+        func.job_options = options
         return func
 
     if func is None:
@@ -42,6 +85,136 @@ def job(func=None, queue='default', timeout=None):
     else:
         return wrapper(func)
 
+class JobOptions(object):
+    def __init__(self, name, queue, timeout, coalesce, debounce):
+        self.name = name
+        self.queue = queue
+        self.timeout = timeout
+        self.coalesce = coalesce
+        self.debounce = debounce
+
+def job_name(func):
+    return '{}.{}'.format(func.__module__, func.__name__)
+
+def _redis():
+    return get_redis_connection('default')
+
+def _enqueue(func, options, delay, args, kwargs):
+    pending_key = None
+    if options.debounce:
+        pending_key = _pending_key(options.name, args, kwargs)
+        delay = max(delay or 0, options.debounce)
+        if not _set_run_at(pending_key, time.time() + delay):
+            _record_stat(options.name, 'coalesced')
+            return None
+    elif options.coalesce:
+        pending_key = _pending_key(options.name, args, kwargs)
+        if not _redis().set(pending_key, 0, nx=True, ex=PENDING_TIMEOUT):
+            _record_stat(options.name, 'coalesced')
+            return None
+    _record_stat(options.name, 'enqueued')
+    return _schedule(func, options, delay, pending_key, args, kwargs)
+
+def _schedule(func, options, delay, pending_key, args, kwargs):
+    job_args = (func, pending_key, args, kwargs)
+    if delay is None:
+        rq_job = django_rq.get_queue(options.queue).enqueue(
+            _run_job, timeout=options.timeout, args=job_args,
+            description=_describe(options.name, args, kwargs))
+    else:
+        scheduler = django_rq.get_scheduler(options.queue)
+        rq_job = scheduler.enqueue_in(
+            timedelta(seconds=delay), _run_job, *job_args,
+            job_description=_describe(options.name, args, kwargs),
+            timeout=options.timeout)
+    return Job(rq_job)
+
+def _set_run_at(pending_key, run_at):
+    """Set the run time for a debounced job
+
+    Returns:
+        True if there wasn't a job pending and the caller should schedule
+        one.  False if we pushed back the run time for the pending job.
+    """
+    redis = _redis()
+    if redis.set(pending_key, run_at, nx=True, ex=PENDING_TIMEOUT):
+        return True
+    if redis.set(pending_key, run_at, xx=True, ex=PENDING_TIMEOUT):
+        return False
+    # The pending job started between our 2 calls, set the key again and
+    # schedule a new one
+    redis.set(pending_key, run_at, ex=PENDING_TIMEOUT)
+    return True
+
+def _run_job(func, pending_key, args, kwargs):
+    """Run a job function in the worker."""
+    options = func.job_options
+    if pending_key is not None:
+        redis = _redis()
+        if options.debounce:
+            run_at = redis.get(pending_key)
+            if run_at is not None and float(run_at) > time.time() + 1:
+                # delay() was called after we were scheduled, reschedule
+                # ourselves for the new run time.
+                _schedule(func, options, float(run_at) - time.time(),
+                          pending_key, args, kwargs)
+                return
+        redis.delete(pending_key)
+    _record_stat(options.name, 'executed')
+    rq_job = rq.get_current_job()
+    if rq_job is not None and rq_job.enqueued_at is not None:
+        latency = (datetime.utcnow() - rq_job.enqueued_at).total_seconds()
+    else:
+        latency = None
+    success = False
+    start = time.time()
+    with jobmetrics.QueryCounter() as queries:
+        try:
+            rv = func(*args, **kwargs)
+            success = True
+            return rv
+        finally:
+            jobmetrics.record(options.name, latency, time.time() - start,
+                              queries.count, success)
+
+def _pending_key(name, args, kwargs):
+    data = json.dumps([args, kwargs], sort_keys=True,
+                      default=_key_for_object)
+    return 'job-pending:{}:{}'.format(name, hashlib.sha1(data).hexdigest())
+
+def _key_for_object(obj):
+    if hasattr(obj, '_meta') and hasattr(obj, 'pk'):
+        return '{}:{}'.format(obj._meta.label, obj.pk)
+    return repr(obj)
+
+def _describe(name, args, kwargs):
+    arg_list = [repr(arg) for arg in args]
+    arg_list.extend('{}={!r}'.format(k, v) for k, v in sorted(kwargs.items()))
+    return '{}({})'.format(name, ', '.join(arg_list))
+
+def _record_stat(name, stat):
+    _redis().hincrby(STATS_KEY, '{}:{}'.format(name, stat), 1)
+
+def get_stats():
+    """Get job counts for each job function
+
+    Returns:
+        dict mapping function names to dicts with the enqueued, coalesced,
+        and executed counts
+    """
+    stats = {}
+    for field, count in _redis().hgetall(STATS_KEY).items():
+        name, stat = field.rsplit(':', 1)
+        stats.setdefault(name, {
+            'enqueued': 0,
+            'coalesced': 0,
+            'executed': 0,
+        })[stat] = int(count)
+    return stats
+
+def reset_stats():
+    _redis().delete(STATS_KEY)
+
 class Job(object):
     """
     Encapsulates a job in the task queue
@@ -58,7 +231,15 @@ class Job(object):
 
     @classmethod
     def get_current(cls):
-        return cls(rq.get_current_job())
+        """Get the job that's currently running
+
+        Returns None if we're not running inside a worker (for example when
+        RUN_JOBS_EAGERLY is set).
+        """
+        rq_job = rq.get_current_job()
+        if rq_job is None:
+            return None
+        return cls(rq_job)
 
     def get_meta(self):
         return self.rq_job.meta
@@ -110,9 +110,14 @@ test_drive_file_info = externalsites.google.DriveFileInfo(
     'http://example.com/view-link',
     'http://example.com/drive-file-thumb.png')
 youtube_get_video_info = mock.Mock(return_value=test_video_info)
+# By default, return no results so that the code falls back to
+# get_video_info()
+youtube_get_video_infos = mock.Mock(
+    side_effect=lambda video_ids, accounts=[]: {})
 youtube_get_drive_file_info = mock.Mock(return_value=test_drive_file_info)
 youtube_get_user_info = mock.Mock(return_value=test_video_info)
 youtube_get_new_access_token = mock.Mock(return_value='test-access-token')
+youtube_get_access_token = mock.Mock(return_value='test-access-token')
 youtube_revoke_auth_token = mock.Mock()
 youtube_update_video_description = mock.Mock()
 youtube_get_uploaded_video_ids = mock.Mock(return_value=[])
@@ -129,7 +134,7 @@ delete_subtitles = mock.Mock()
 update_all_subtitles = mock.Mock()
 fetch_subs_task = mock.Mock()
 import_videos_from_feed = mock.Mock()
-notifications_do_http_post = mock.Mock()
+notifications_deliver_notifications = mock.Mock()
 
 class MonkeyPatcher(object):
     """Replace a functions with mock objects for the tests.
@@ -139,6 +144,7 @@ class MonkeyPatcher(object):
         ('videos.tasks.save_thumbnail_in_s3', save_thumbnail_in_s3),
         ('videos.tasks.video_changed_tasks', video_changed_tasks),
         ('externalsites.google.get_video_info', youtube_get_video_info),
+        ('externalsites.google.get_video_infos', youtube_get_video_infos),
         ('externalsites.google.get_drive_file_info', youtube_get_drive_file_info),
         ('externalsites.google.get_youtube_user_info',
          youtube_get_user_info),
@@ -146,6 +152,8 @@ class MonkeyPatcher(object):
          youtube_get_uploaded_video_ids),
         ('externalsites.google.get_new_access_token',
          youtube_get_new_access_token),
+        ('externalsites.google.get_access_token',
+         youtube_get_access_token),
         ('externalsites.google.revoke_auth_token',
          youtube_revoke_auth_token),
         ('externalsites.google.update_video_description',
@@ -160,7 +168,8 @@ class MonkeyPatcher(object):
         ('externalsites.tasks.update_all_subtitles', update_all_subtitles),
         ('externalsites.tasks.fetch_subs', fetch_subs_task),
         ('videos.tasks.import_videos_from_feed', import_videos_from_feed),
-        ('notifications.handlers.do_http_post', notifications_do_http_post),
+        ('notifications.delivery.deliver_notifications',
+         notifications_deliver_notifications),
     ]
     @classmethod
     def register_patch(cls, spec, mock_obj):
@@ -0,0 +1,40 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from random import randint
+
+from django.test import TestCase
+
+from utils.externalsort import external_sort
+
+class ExternalSortTest(TestCase):
+    def check_sort(self, items, chunk_size):
+        key = lambda item: item[0]
+        self.assertEqual(list(external_sort(items, key, chunk_size)),
+                         sorted(items, key=key))
+
+    def test_sort(self):
+        items = [(randint(0, 10), i) for i in xrange(100)]
+        # single chunk
+        self.check_sort(items, 1000)
+        # multiple chunks, check that the sort is stable across chunks
+        self.check_sort(items, 7)
+        self.check_sort(items, 1)
+
+    def test_empty(self):
+        self.check_sort([], 10)
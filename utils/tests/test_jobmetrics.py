@@ -0,0 +1,80 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from django.db import connection
+from django.test import TestCase
+from nose.tools import *
+
+from utils import jobmetrics
+from videos.models import Video
+
+class HistogramTest(TestCase):
+    def test_percentile(self):
+        histogram = jobmetrics.Histogram([1, 2, 5, jobmetrics.INF])
+        histogram.counts = [90, 5, 4, 1]
+        assert_equal(histogram.percentile(50), 1)
+        assert_equal(histogram.percentile(95), 2)
+        assert_equal(histogram.percentile(99), 5)
+        assert_equal(histogram.percentile(100), jobmetrics.INF)
+
+    def test_empty(self):
+        histogram = jobmetrics.Histogram([1, 2, 5, jobmetrics.INF])
+        assert_equal(histogram.percentile(50), None)
+        assert_equal(histogram.format_percentile(50), '-')
+
+    def test_format_percentile(self):
+        histogram = jobmetrics.Histogram([1, 2, 5, jobmetrics.INF])
+        histogram.counts = [1, 0, 0, 1]
+        assert_equal(histogram.format_percentile(50, 's'), '<=1s')
+        assert_equal(histogram.format_percentile(99, 's'), '>5s')
+
+class RecordTest(TestCase):
+    def test_record(self):
+        jobmetrics.record('foo', 0.3, 2.0, 3, True)
+        jobmetrics.record('foo', None, 20.0, 40, False)
+        jobmetrics.record('bar', 1.0, 0.01, 0, True)
+        reports = jobmetrics.get_report(hours=1)
+        assert_equal([r.name for r in reports], ['bar', 'foo'])
+        foo = reports[1]
+        assert_equal((foo.successes, foo.failures), (1, 1))
+        assert_equal(foo.latency.total, 1)
+        assert_equal(foo.latency.percentile(50), 0.5)
+        assert_equal(foo.runtime.percentile(50), 2.5)
+        assert_equal(foo.runtime.percentile(99), 30)
+        assert_equal(foo.queries.percentile(99), 50)
+
+class QueryCounterTest(TestCase):
+    def test_count(self):
+        with jobmetrics.QueryCounter() as counter:
+            for i in range(3):
+                list(Video.objects.all())
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        assert_equal(counter.count, 4)
+        # After the block, we should stop counting
+        list(Video.objects.all())
+        assert_equal(counter.count, 4)
+
+    def test_nested(self):
+        with jobmetrics.QueryCounter() as outer:
+            list(Video.objects.all())
+            with jobmetrics.QueryCounter() as inner:
+                list(Video.objects.all())
+            list(Video.objects.all())
+        assert_equal(outer.count, 3)
+        assert_equal(inner.count, 1)
@@ -0,0 +1,180 @@
+# Amara, universalsubtitles.org
+#
+# Copyright (C) 2018 Participatory Culture Foundation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see
+# http://www.gnu.org/licenses/agpl-3.0.html.
+
+from datetime import timedelta
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from nose.tools import *
+import mock
+
+from utils import taskqueue
+from utils.factories import *
+from videos.models import Video
+
+def func(*args, **kwargs):
+    if args == ('error',):
+        raise ValueError()
+    func.calls.append((args, kwargs))
+func.calls = []
+
+plain_job = taskqueue.job(func=func)
+
+def query_func(count):
+    for i in range(count):
+        list(Video.objects.all())
+query_job = taskqueue.job(func=query_func)
+
+def timeout_func(*args, **kwargs):
+    func(*args, **kwargs)
+timeout_job = taskqueue.job(timeout=30)(timeout_func)
+
+def coalesced_func(*args, **kwargs):
+    func(*args, **kwargs)
+coalesced_job = taskqueue.job(coalesce=True)(coalesced_func)
+
+def debounced_func(*args, **kwargs):
+    func(*args, **kwargs)
+debounced_job = taskqueue.job(debounce=10)(debounced_func)
+
+# kwargs that rq-scheduler's enqueue_in() uses itself.  It forwards any
+# others to the job function.
+SCHEDULER_KWARGS = ('timeout', 'job_id', 'job_ttl', 'job_result_ttl',
+                    'job_description')
+
+@override_settings(RUN_JOBS_EAGERLY=False)
+class CoalesceTest(TestCase):
+    def setUp(self):
+        func.calls = []
+        taskqueue.reset_stats()
+        patcher = mock.patch('django_rq.get_queue')
+        self.queue = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('django_rq.get_scheduler')
+        self.scheduler = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('utils.taskqueue.time')
+        self.mock_time = patcher.start().time
+        self.mock_time.return_value = 1000
+        self.addCleanup(patcher.stop)
+
+    def run_job(self, rq_mock, call_index=-1):
+        call = rq_mock.call_args_list[call_index]
+        if 'args' in call[1]:
+            job_args = call[1]['args']
+            job_kwargs = {}
+        else:
+            # scheduler.enqueue_in(timedelta, _run_job, *args, **kwargs)
+            job_args = call[0][2:]
+            job_kwargs = {
+                name: value for name, value in call[1].items()
+                if name not in SCHEDULER_KWARGS
+            }
+        taskqueue._run_job(*job_args, **job_kwargs)
+
+    def test_no_coalescing(self):
+        plain_job.delay(1)
+        plain_job.delay(1)
+        assert_equal(self.queue.enqueue.call_count, 2)
+
+    def test_coalesce(self):
+        coalesced_job.delay(1)
+        coalesced_job.delay(1)
+        assert_equal(self.queue.enqueue.call_count, 1)
+        # different args should get a separate job
+        coalesced_job.delay(2)
+        assert_equal(self.queue.enqueue.call_count, 2)
+        # After the job starts, delay() should enqueue a new job
+        self.run_job(self.queue.enqueue, 0)
+        assert_equal(func.calls, [((1,), {})])
+        coalesced_job.delay(1)
+        assert_equal(self.queue.enqueue.call_count, 3)
+
+    def test_coalesce_model_instances(self):
+        video = VideoFactory()
+        coalesced_job.delay(video)
+        coalesced_job.delay(video.__class__.objects.get(pk=video.pk))
+        assert_equal(self.queue.enqueue.call_count, 1)
+
+    def test_debounce(self):
+        debounced_job.delay(1)
+        assert_equal(self.scheduler.enqueue_in.call_count, 1)
+        assert_equal(self.scheduler.enqueue_in.call_args[0][0],
+                     timedelta(seconds=10))
+        # A second call 5 seconds later should push the run time back
+        self.mock_time.return_value = 1005
+        debounced_job.delay(1)
+        assert_equal(self.scheduler.enqueue_in.call_count, 1)
+        # When the job runs at 1010, it should reschedule itself for 1015
+        self.mock_time.return_value = 1010
+        self.run_job(self.scheduler.enqueue_in)
+        assert_equal(func.calls, [])
+        assert_equal(self.scheduler.enqueue_in.call_count, 2)
+        assert_equal(self.scheduler.enqueue_in.call_args[0][0],
+                     timedelta(seconds=5))
+        self.mock_time.return_value = 1015
+        self.run_job(self.scheduler.enqueue_in)
+        assert_equal(func.calls, [((1,), {})])
+
+    def test_scheduled_job_options(self):
+        # Scheduled jobs should get the same description and timeout as
+        # enqueued ones
+        timeout_job.enqueue_in(60, 1, foo='bar')
+        call_kwargs = self.scheduler.enqueue_in.call_args[1]
+        assert_equal(call_kwargs['job_description'],
+                     "utils.tests.test_taskqueue.timeout_func(1, foo='bar')")
+        assert_equal(call_kwargs['timeout'], 30)
+        # We shouldn't pass any kwargs that rq-scheduler would forward to
+        # _run_job()
+        assert_equal(set(call_kwargs) - set(SCHEDULER_KWARGS), set())
+        self.run_job(self.scheduler.enqueue_in)
+        assert_equal(func.calls, [((1,), {'foo': 'bar'})])
+
+    def test_stats(self):
+        coalesced_job.delay(1)
+        coalesced_job.delay(1)
+        self.run_job(self.queue.enqueue)
+        assert_equal(taskqueue.get_stats(), {
+            'utils.tests.test_taskqueue.coalesced_func': {
+                'enqueued': 1,
+                'coalesced': 1,
+                'executed': 1,
+            }
+        })
+
+    def test_metrics(self):
+        plain_job.delay(1)
+        with mock.patch('utils.jobmetrics.record') as mock_record:
+            self.run_job(self.queue.enqueue)
+        assert_equal(mock_record.call_count, 1)
+        name, latency, runtime, queries, success = mock_record.call_args[0]
+        assert_equal(name, 'utils.tests.test_taskqueue.func')
+        assert_equal(success, True)
+
+    def test_metrics_query_count(self):
+        query_job.delay(3)
+        with mock.patch('utils.jobmetrics.record') as mock_record:
+            self.run_job(self.queue.enqueue)
+        assert_equal(mock_record.call_args[0][3], 3)
+
+    def test_metrics_for_failed_job(self):
+        plain_job.delay('error')
+        with mock.patch('utils.jobmetrics.record') as mock_record:
+            with assert_raises(ValueError):
+                self.run_job(self.queue.enqueue)
+        assert_equal(mock_record.call_args[0][4], False)